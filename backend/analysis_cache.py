@@ -0,0 +1,61 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import chess
+import chess.polyglot
+
+DEFAULT_CAPACITY = 100_000
+
+
+def position_key(board: chess.Board) -> int:
+    return chess.polyglot.zobrist_hash(board)
+
+
+class AnalysisCache:
+    """Thread-safe in-process LRU of engine results keyed by Zobrist hash.
+
+    One entry per position holding the deepest result seen; a lookup is a hit
+    when the stored search was at least as deep as the one requested.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        if capacity is None:
+            capacity = int(os.getenv("ANALYSIS_CACHE_SIZE", DEFAULT_CAPACITY))
+        self.capacity = capacity
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: int, depth: int) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < depth:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: int, depth: int, analysis: Dict):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > depth:
+                return
+            self._entries[key] = (depth, analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
@@ -1,30 +1,124 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, File, UploadFile
-from typing import Dict, Union
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, File, UploadFile, Header, Response
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
 import uuid
+import json
+import zlib
 import asyncio
 import shutil
+import tempfile
 import chess
-import chess.pgn
 import os
 import traceback
 import random
-
-from .pgnReview import PgnReviewer
-from .models import Mode, MoveRequest, StartGameRequest, AnalysisResponse, GameStateResponse, PgnReviewResponse
-from .engine import StockfishEngine
+import threading
+import time
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from .review_cache import ReviewCache, engine_tag, review_key
+from .models import Mode, MoveRequest, StartGameRequest, AnalysisResponse, GameStateResponse, GameStateDelta, PgnReviewResponse, ReviewJobResponse, BatchEvaluateRequest, ExplorerResponse, PositionSearchResponse
+from .engine import DEFAULT_DEPTH, DEFAULT_PROFILE, StockfishEngine
+from .engine_pool import EnginePool
+from .scheduler import EngineScheduler, Priority, ScheduledEngine
+from .quotas import EngineQuotas, client_id
+from .shared_cache import shared_analysis_cache
 from .chess_game import ChessGame
+from .wire import BINARY_SUBPROTOCOL, negotiate_subprotocol
+from .broadcast import AnalysisFrame, AnalysisHub
+from .openings import opening_positions
+from .explorer import OpeningExplorer
 from fastapi.middleware.cors import CORSMiddleware
-
-SESSIONS: Dict[str, Dict] = {}  # { session_id: { "game": ChessGame, "engine": StockfishEngine, "user_color": "white"/"black" } }
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import iterate_in_threadpool
+
+SESSIONS: Dict[str, Dict] = {}  # { session_id: { "game": ChessGame, "engine": ScheduledEngine, "user_color": "white"/"black", "hub": AnalysisHub } }
+
+ENGINE_KIND = os.getenv("NOCHESS_ENGINE", "stockfish").lower()  # "fake": in-process FakeEngine (load tests)
+# FakeEngine results must not be mixed with Stockfish ones in the host-wide shared cache
+SCHEDULER = EngineScheduler(shared_cache=False if ENGINE_KIND == "fake" else None)
+
+def _new_engine(profile: str):
+    if ENGINE_KIND == "fake":
+        from .fake_engine import FakeEngine
+        return FakeEngine(profile=profile)
+    return StockfishEngine(profile=profile)
+
+# Engines for work not tied to a session (batch evaluation, cache warm-up)
+ENGINE_POOL = EnginePool(factory=lambda: _new_engine("review"))
+# Warm spare engines handed to new game sessions (replaced in the background)
+ENGINE_PREWARM = int(os.getenv("ENGINE_PREWARM", "1"))
+SESSION_ENGINES = EnginePool(size=max(1, ENGINE_PREWARM), profile=DEFAULT_PROFILE,
+                             factory=lambda: _new_engine(DEFAULT_PROFILE))
+PREWARM_CACHE_PLIES = int(os.getenv("PREWARM_CACHE_PLIES", "6"))  # 0 disables cache warm-up
+WARMUP: Dict = {"status": "ready", "engines": 0, "positions": 0, "error": None}
+BATCH_MAX_POSITIONS = int(os.getenv("BATCH_MAX_POSITIONS", "10000"))
+MAX_BATCH_DEPTH = 30
+REVIEW_CACHE = ReviewCache()
+EXPLORER_INDEX = os.getenv("EXPLORER_INDEX")  # built offline with `python main.py build-explorer`
+_EXPLORER: Optional[OpeningExplorer] = None
+POSITION_INDEX_DIR = os.getenv("POSITION_INDEX_DIR")  # reviewed games are archived and indexed here
+_POSITION_INDEX = None
+_POSITION_INDEX_LOCK = threading.Lock()
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))  # smaller JSON responses are sent uncompressed
+QUOTAS = EngineQuotas()
+SCHEDULER.on_search = QUOTAS.charge
+CLIENT_ID_HEADER = os.getenv("CLIENT_ID_HEADER")  # e.g. X-Forwarded-For, only behind a trusted proxy
+# New games, reviews and batches are refused while this many searches wait for a slot
+ADMISSION_MAX_BACKLOG = int(os.getenv("ADMISSION_MAX_BACKLOG", "0")) or SCHEDULER.slots * 16
+REVIEW_MAX_PLIES = int(os.getenv("REVIEW_MAX_PLIES", "0"))  # 0: unlimited
+REVIEW_QUEUE_PATH = os.getenv("REVIEW_QUEUE_PATH")  # enables /review_jobs, served by `python main.py review-worker`
+REVIEW_QUEUE_MAX = int(os.getenv("REVIEW_QUEUE_MAX", "1000"))  # queued jobs beyond this get 429
+REVIEW_QUEUE_MAX_PER_CLIENT = int(os.getenv("REVIEW_QUEUE_MAX_PER_CLIENT", "10"))  # queued or running, per client
+REVIEW_CHARGE_INTERVAL = 1.0  # seconds between collections of worker engine time for QUOTAS
+_REVIEW_QUEUE = None
+_REVIEW_CHARGES = {"last": 0.0}
+_REVIEW_CHARGES_LOCK = threading.Lock()
+TRACE_FILE = os.getenv("TRACE_FILE")  # opt-in request trace for `python main.py replay`
+
+def _analyze_moves(engine: ScheduledEngine, moves: List[str], priority: Priority = Priority.LIVE) -> Dict:
+    return engine.analyze_moves(moves, priority=priority)
+
+def _prewarm():
+    """Spawn spare engines and fill the analysis cache with opening positions."""
+    started = time.monotonic()
+    try:
+        if ENGINE_PREWARM > 0:
+            WARMUP["engines"] = SESSION_ENGINES.prewarm(ENGINE_PREWARM)
+        if PREWARM_CACHE_PLIES > 0:
+            positions = list(opening_positions(PREWARM_CACHE_PLIES))
+            ENGINE_POOL.prewarm()
+
+            def warm(board):
+                with ENGINE_POOL.acquire() as engine:
+                    SCHEDULER.analyze(engine, board, DEFAULT_DEPTH, Priority.BATCH, owner="prewarm")
+
+            with ThreadPoolExecutor(max_workers=ENGINE_POOL.size) as executor:
+                list(executor.map(warm, positions))
+            WARMUP["positions"] = len(positions)
+        WARMUP["status"] = "ready"
+        print(f"Engine warm-up finished in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        WARMUP["status"] = "failed"
+        WARMUP["error"] = str(e)
+        print(f"Engine warm-up failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if ENGINE_PREWARM > 0 or PREWARM_CACHE_PLIES > 0:
+        WARMUP["status"] = "warming"
+        # Runs in the background so /health can report progress
+        asyncio.get_running_loop().run_in_executor(None, _prewarm)
     try:
         yield
     finally:
         print("Shutting down and closing all Stockfish engines...")
         for session_id, session_data in list(SESSIONS.items()):
+            hub = session_data.get("hub")
+            if hub:
+                await hub.close()
             engine = session_data.get("engine")
             if engine:
                 try:
@@ -32,9 +126,18 @@ async def lifespan(app: FastAPI):
                     engine.quit()
                 except Exception:
                     pass
+        ENGINE_POOL.close()
+        SESSION_ENGINES.close()
+        if _POSITION_INDEX is not None:
+            _POSITION_INDEX.close()
 
 app = FastAPI(title="NoChess API", description="Terminal Chess to Web", version="0.1.0", lifespan=lifespan)
 
+if TRACE_FILE:
+    from .replay import TraceMiddleware, TraceRecorder
+    # Added first so it sits innermost and sees requests and responses uncompressed
+    app.add_middleware(TraceMiddleware, recorder=TraceRecorder(TRACE_FILE))
+
 origins = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -47,6 +150,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Streamed NDJSON sets its own Content-Encoding (see _ndjson_response) and passes through untouched
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
 
 def get_session_data(session_id: str) -> Dict:
     if session_id not in SESSIONS:
@@ -56,24 +161,98 @@ def get_session_data(session_id: str) -> Dict:
 def get_game(session_data: Dict = Depends(get_session_data)) -> ChessGame:
     return session_data["game"]
 
-def get_engine(session_data: Dict = Depends(get_session_data)) -> StockfishEngine:
+def get_engine(session_data: Dict = Depends(get_session_data)) -> ScheduledEngine:
     return session_data["engine"]
 
+def _client(conn: Union[Request, WebSocket]) -> str:
+    return client_id(conn.headers, conn.client.host if conn.client else None, CLIENT_ID_HEADER)
+
+def _too_many(retry_after: float, detail: str) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+def _charge_review_jobs():
+    """Charge engine time used by review workers to the clients that queued the jobs (at most once a second)."""
+    if not REVIEW_QUEUE_PATH or not QUOTAS.enabled:
+        return
+    now = time.monotonic()
+    if now - _REVIEW_CHARGES["last"] < REVIEW_CHARGE_INTERVAL or not _REVIEW_CHARGES_LOCK.acquire(blocking=False):
+        return
+    try:
+        _REVIEW_CHARGES["last"] = now
+        for client, ms in get_review_queue().take_engine_time().items():
+            QUOTAS.charge_client(client, ms / 1000)
+    except Exception as e:
+        print(f"Could not collect review worker engine time: {e}")
+    finally:
+        _REVIEW_CHARGES_LOCK.release()
+
+def admit_engine_work(request: Request) -> str:
+    """Client id of a request that will search; 429 while the client is over its engine-time quota."""
+    client = _client(request)
+    _charge_review_jobs()
+    admitted, retry_after = QUOTAS.check(client)
+    if not admitted:
+        raise _too_many(retry_after, "Engine-time quota exceeded")
+    return client
+
+def admit_new_work(client: str = Depends(admit_engine_work)) -> str:
+    """As admit_engine_work, and also 429 while the scheduler backlog is saturated.
+
+    Used for work that starts something new (games, reviews, batches) so
+    that games already in progress keep their latency under load.
+    """
+    if SCHEDULER.backlog() >= ADMISSION_MAX_BACKLOG:
+        raise _too_many(1, "Engine capacity saturated, try again shortly")
+    return client
+
+def get_explorer() -> OpeningExplorer:
+    global _EXPLORER
+    if _EXPLORER is None:
+        if not EXPLORER_INDEX or not os.path.exists(EXPLORER_INDEX):
+            raise HTTPException(status_code=503, detail="Opening explorer index is not configured")
+        _EXPLORER = OpeningExplorer(EXPLORER_INDEX)
+    return _EXPLORER
+
+def get_position_index():
+    """The PositionIndex under POSITION_INDEX_DIR, opened on first use; None when not configured."""
+    global _POSITION_INDEX
+    if _POSITION_INDEX is None and POSITION_INDEX_DIR:
+        with _POSITION_INDEX_LOCK:
+            if _POSITION_INDEX is None:
+                from .position_index import PositionIndex
+                _POSITION_INDEX = PositionIndex(POSITION_INDEX_DIR)
+    return _POSITION_INDEX
+
+def get_review_queue():
+    global _REVIEW_QUEUE
+    if not REVIEW_QUEUE_PATH:
+        raise HTTPException(status_code=503, detail="Review queue is not configured")
+    if _REVIEW_QUEUE is None:
+        from .job_queue import JobQueue
+        _REVIEW_QUEUE = JobQueue(REVIEW_QUEUE_PATH)
+    return _REVIEW_QUEUE
+
+def require_position_index():
+    index = get_position_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Position index is not configured")
+    return index
+
 @app.post("/start_game", response_model=GameStateResponse)
-def start_game(request: StartGameRequest):
+def start_game(request: StartGameRequest, client: str = Depends(admit_new_work)):
     session_id = str(uuid.uuid4())
+    QUOTAS.register(session_id, client)
     try:
         mode_str = request.mode.value if request.mode else "intermediate"
         print(f"Attempting to start Stockfish with mode: {mode_str}")
 
-        engine = StockfishEngine()  # no mode arg
+        engine = ScheduledEngine(SESSION_ENGINES.take(profile=mode_str), SCHEDULER, owner=session_id)
         game = ChessGame()
         print("Stockfish engine initialized successfully.")
 
         # Initial analysis
         moves = game.get_move_history_uci()
-        engine.set_position(moves)
-        analysis = engine.analyze_position()
+        analysis = _analyze_moves(engine, moves, Priority.INTERACTIVE)
         game.set_analysis(analysis)
 
         # Randomly assign user color; if user is black, AI (white) moves first
@@ -83,8 +262,7 @@ def start_game(request: StartGameRequest):
             if best_move and best_move != "(none)":
                 game.make_move(best_move)
                 moves = game.get_move_history_uci()
-                engine.set_position(moves)
-                analysis = engine.analyze_position()
+                analysis = _analyze_moves(engine, moves)
                 game.set_analysis(analysis)
 
         SESSIONS[session_id] = {"game": game, "engine": engine, "user_color": user_color}
@@ -95,17 +273,16 @@ def start_game(request: StartGameRequest):
         state["user_color"] = user_color
         return state
     except Exception as e:
+        QUOTAS.forget(session_id)
         print("\n--- ERROR IN /start_game ---")
         traceback.print_exc()
         print("--------------------------\n")
         raise HTTPException(status_code=500, detail=f"Failed to start game: {str(e)}")
 
-def _collect_state(session_id: str, game: ChessGame, engine: StockfishEngine, user_color: str) -> GameStateResponse:
+def _collect_state(session_id: str, game: ChessGame, engine: ScheduledEngine, user_color: str) -> GameStateResponse:
     status = game.game_status()
     try:
-        moves = game.get_move_history_uci()
-        engine.set_position(moves)
-        analysis = engine.analyze_position()
+        analysis = _refresh_analysis(game, engine)
     except Exception:
         analysis = None
 
@@ -125,31 +302,43 @@ def _collect_state(session_id: str, game: ChessGame, engine: StockfishEngine, us
         is_draw=status["is_draw"],
         draw_reason=status["draw_reason"],
         last_move=(game.last_move.uci() if game.last_move else None),
+        version=game.version,
     )
 
-def _engine_reply_if_needed(game: ChessGame, engine: StockfishEngine, user_color: str):
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def _engine_reply_if_needed(game: ChessGame, engine: ScheduledEngine, user_color: str):
     # If it's engine's turn, make one best-move reply
     if game.turn_color() != user_color and not game.board.is_game_over():
         moves = game.get_move_history_uci()
-        engine.set_position(moves)
-        analysis = engine.analyze_position()
+        analysis = _analyze_moves(engine, moves, Priority.INTERACTIVE)
+        game.set_analysis(analysis)  # kept in the per-ply history for undo and post-game review
         best_move = analysis.get("best_move")
         if best_move and best_move != "(none)":
             game.make_move(best_move)
             # Optional: refresh analysis after engine move (state collector will also do it)
             moves = game.get_move_history_uci()
-            engine.set_position(moves)
-            new_analysis = engine.analyze_position()
+            new_analysis = _analyze_moves(engine, moves)
             game.set_analysis(new_analysis)
 
 @app.post("/make_move/{session_id}", response_model=GameStateResponse)
-def make_move(session_id: str, req: MoveRequest):
+def make_move(session_id: str, req: MoveRequest, client: str = Depends(admit_engine_work)):
     if session_id not in SESSIONS:
         raise HTTPException(status_code=404, detail="Unknown session")
 
     ctx = SESSIONS[session_id]
     game: ChessGame = ctx["game"]
-    engine: StockfishEngine = ctx["engine"]
+    engine: ScheduledEngine = ctx["engine"]
     user_color: str = ctx["user_color"]
 
     if game.board.is_game_over():
@@ -166,42 +355,119 @@ def make_move(session_id: str, req: MoveRequest):
 
     return _collect_state(session_id, game, engine, user_color)
 
+@app.get("/state/{session_id}", response_model=GameStateResponse)
+def get_state(
+    session_id: str,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """Cheap polling endpoint: serves stored state without running the engine.
+
+    Returns 304 when the client's ETag (or `since`) is current, a compact
+    GameStateDelta when `since` is still within the current game, and the full
+    state otherwise.
+    """
+    session_data = get_session_data(session_id)
+    game: ChessGame = session_data["game"]
+    etag = _etag(game.version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(if_none_match, etag) or since == game.version:
+        return Response(status_code=304, headers=headers)
+
+    if since is not None:
+        delta = game.get_delta_json(since)
+        if delta is not None:
+            delta["session_id"] = session_id
+            body = GameStateDelta(**delta).model_dump(exclude_none=True)
+            return JSONResponse(body, headers=headers)
+
+    state = game.get_state_json()
+    state["session_id"] = session_id
+    state["user_color"] = session_data.get("user_color", "white")
+    return JSONResponse(GameStateResponse(**state).model_dump(), headers=headers)
+
 @app.get("/analyze/{session_id}", response_model=AnalysisResponse)
-def analyze(session_id: str, game: ChessGame = Depends(get_game), engine: StockfishEngine = Depends(get_engine)):
+def analyze(session_id: str, game: ChessGame = Depends(get_game), engine: ScheduledEngine = Depends(get_engine),
+            client: str = Depends(admit_engine_work)):
     try:
         moves = game.get_move_history_uci()
-        engine.set_position(moves)
-        analysis = engine.analyze_position()
+        analysis = _analyze_moves(engine, moves)
         return AnalysisResponse(**analysis)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.get("/explorer", response_model=ExplorerResponse)
+def explore_fen(fen: str = chess.STARTING_FEN, explorer: OpeningExplorer = Depends(get_explorer)):
+    try:
+        board = chess.Board(fen)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid FEN: {e}")
+    return explorer.lookup(board)
+
+@app.get("/explorer/{session_id}", response_model=ExplorerResponse)
+def explore_session(session_id: str, game: ChessGame = Depends(get_game), explorer: OpeningExplorer = Depends(get_explorer)):
+    return explorer.lookup(game.board)
+
+@app.get("/positions/search", response_model=PositionSearchResponse)
+def search_positions(fen: str, limit: int = 50, offset: int = 0, index=Depends(require_position_index)):
+    try:
+        board = chess.Board(fen)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid FEN: {e}")
+    if not 1 <= limit <= 500 or offset < 0:
+        raise HTTPException(status_code=422, detail="limit must be 1-500 and offset >= 0")
+    return index.search(board, limit=limit, offset=offset)
+
+@app.get("/positions/games/{game_id}")
+def archived_game(game_id: int, index=Depends(require_position_index)):
+    game = index.read_game(game_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return Response(content=str(game), media_type="application/x-chess-pgn")
+
+def _refresh_analysis(game: ChessGame, engine: ScheduledEngine) -> Dict:
+    moves = game.get_move_history_uci()
+    analysis = _analyze_moves(engine, moves)
+    # Don't attach an eval to the game if a move landed while we were searching
+    if game.get_move_history_uci() == moves:
+        game.set_analysis(analysis)
+    return analysis
+
+def _session_hub(session_data: Dict) -> AnalysisHub:
+    """One analysis producer per session, shared by every connected socket."""
+    hub = session_data.get("hub")
+    if hub is None:
+        game: ChessGame = session_data["game"]
+        engine: ScheduledEngine = session_data["engine"]
+        hub = AnalysisHub(lambda: asyncio.to_thread(_refresh_analysis, game, engine))
+        session_data["hub"] = hub
+    return hub
+
+async def _send_frame(websocket: WebSocket, subprotocol: Optional[str], frame: AnalysisFrame):
+    if subprotocol == BINARY_SUBPROTOCOL:
+        await websocket.send_bytes(frame.binary)
+    else:
+        await websocket.send_text(frame.text)
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    await websocket.accept()
+    subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    admitted, _ = QUOTAS.check(_client(websocket))
+    if not admitted:
+        await websocket.close(code=1013, reason="Engine-time quota exceeded")  # 1013: try again later
+        return
     try:
         session_data = get_session_data(session_id)
-        game: ChessGame = session_data["game"]
-        engine: StockfishEngine = session_data["engine"]
-
-        # Immediate snapshot
+        hub = _session_hub(session_data)
+        queue = hub.subscribe()
         try:
-            moves = game.get_move_history_uci()
-            engine.set_position(moves)
-            analysis = engine.analyze_position()
-            game.set_analysis(analysis)
-            await websocket.send_json(analysis)
-        except Exception as e:
-            print(f"Initial WS send error for session {session_id}: {e}")
-
-        # Periodic updates
-        while True:
-            moves = game.get_move_history_uci()
-            engine.set_position(moves)
-            analysis = engine.analyze_position()
-            game.set_analysis(analysis)
-            await websocket.send_json(analysis)
-            await asyncio.sleep(1.0)
+            while True:
+                frame = await queue.get()
+                await _send_frame(websocket, subprotocol, frame)
+        finally:
+            hub.unsubscribe(queue)
     except WebSocketDisconnect:
         print(f"Client disconnected from session {session_id}")
     except Exception as e:
@@ -209,34 +475,295 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         return
 
 @app.post("/review_pgn", response_model=PgnReviewResponse)
-def review_pgn(pgn_file: UploadFile = File(...), quick_mode: bool = False):
+def review_pgn(request: Request, pgn_file: UploadFile = File(...), quick_mode: bool = False, adaptive: bool = False,
+               time_budget: Optional[float] = None, stream: bool = False, client: str = Depends(admit_new_work)):
+    # PGN parsing and review are imported on first use to keep worker startup light
+    from .pgnReview import PgnReviewer, read_first_valid_game, review_variant
+    from .review_stats import game_stats
     file_path = f"/tmp/{pgn_file.filename}"
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(pgn_file.file, buffer)
     try:
-        with StockfishEngine() as engine:
-            reviewer = PgnReviewer(engine)
-            review_data = reviewer.perform_review(file_path, quick_mode=quick_mode)
-            with open(file_path) as pgn:
-                game = chess.pgn.read_game(pgn)
-                headers = game.headers if game else {}
+        game, moves = read_first_valid_game(file_path)
+        if REVIEW_MAX_PLIES and len(moves) > REVIEW_MAX_PLIES:
+            raise HTTPException(status_code=413, detail=f"At most {REVIEW_MAX_PLIES} moves per review")
+        headers = game.headers if game else {}
+        variant = review_variant(adaptive, time_budget)
+        cache_key = review_key(moves, 10 if quick_mode else 20, variant, engine_tag(ENGINE_KIND)) if moves else None
+        if stream:
+            return _ndjson_response(request, _review_lines(game, moves, quick_mode, adaptive, time_budget, cache_key,
+                                                           client))
+        review_data = REVIEW_CACHE.get(cache_key) if cache_key else None
+        if review_data is None:
+            review_owner = f"review:{uuid.uuid4()}"
+            QUOTAS.register(review_owner, client)
+            try:
+                with ScheduledEngine(_new_engine("review"), SCHEDULER, owner=review_owner,
+                                     priority=Priority.BATCH) as engine:
+                    reviewer = PgnReviewer(engine)
+                    review_data = reviewer.perform_review(file_path, quick_mode=quick_mode, adaptive=adaptive,
+                                                          time_budget=time_budget)
+            finally:
+                QUOTAS.forget(review_owner)
+            if cache_key and review_data:
+                REVIEW_CACHE.put(cache_key, review_data)
+        position_index = get_position_index()
+        if position_index is not None and game is not None and review_data:
+            position_index.add_game(game)
         return {
             "review_data": review_data,
+            "stats": game_stats(review_data) if review_data else None,
             "event": headers.get("Event", "Unknown Event"),
             "white": headers.get("White", "Unknown Player"),
             "black": headers.get("Black", "Unknown Player"),
             "result": headers.get("Result", "*"),
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to review PGN: {str(e)}")
     finally:
         if os.path.exists(file_path):
             os.remove(file_path)
 
+@app.post("/review_jobs", response_model=ReviewJobResponse, status_code=202)
+def submit_review_job(pgn_file: UploadFile = File(...), quick_mode: bool = False, adaptive: bool = False,
+                      time_budget: Optional[float] = None, client: str = Depends(admit_engine_work),
+                      queue=Depends(get_review_queue)):
+    """Queue a PGN review for the worker processes; poll GET /review_jobs/{job_id} for the result."""
+    from .pgnReview import read_first_valid_game
+    from .review_worker import review_job
+    if queue.stats()["queued"] >= REVIEW_QUEUE_MAX:
+        raise _too_many(30, "Review queue is full")
+    if queue.active(client) >= REVIEW_QUEUE_MAX_PER_CLIENT:
+        raise _too_many(30, "Too many review jobs pending for this client")
+    fd, file_path = tempfile.mkstemp(suffix=".pgn")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            shutil.copyfileobj(pgn_file.file, buffer)
+        game, moves = read_first_valid_game(file_path)
+    finally:
+        os.remove(file_path)
+    if not moves:
+        raise HTTPException(status_code=422, detail="No valid game with moves in the PGN")
+    if REVIEW_MAX_PLIES and len(moves) > REVIEW_MAX_PLIES:
+        raise HTTPException(status_code=413, detail=f"At most {REVIEW_MAX_PLIES} moves per review")
+    job_id = queue.submit(review_job(game, moves, quick_mode, adaptive, time_budget, client), client=client)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/review_jobs/{job_id}", response_model=ReviewJobResponse)
+def review_job_status(job_id: int, queue=Depends(get_review_queue)):
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Review job not found")
+    return {"job_id": job["id"], "status": job["status"], "attempts": job["attempts"], "error": job["error"],
+            "result": job["result"]}
+
+def _ndjson_line(record: Dict) -> str:
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+def _review_lines(game, moves: List[chess.Move], quick_mode: bool, adaptive: bool, time_budget: Optional[float],
+                  cache_key: Optional[str], client: str) -> Iterator[str]:
+    """NDJSON review: a "game" line, one "move" line per ReviewMove as it is computed, then "summary" (or "error")."""
+    from .pgnReview import PgnReviewer
+    from .review_stats import game_stats
+    headers = game.headers if game else {}
+    yield _ndjson_line({
+        "type": "game",
+        "event": headers.get("Event", "Unknown Event"),
+        "white": headers.get("White", "Unknown Player"),
+        "black": headers.get("Black", "Unknown Player"),
+        "result": headers.get("Result", "*"),
+        "moves": len(moves),
+    })
+    review_data = REVIEW_CACHE.get(cache_key) if cache_key else None
+    cached = review_data is not None
+    if cached:
+        for entry in review_data:
+            yield _ndjson_line({"type": "move", **entry})
+    else:
+        review_data = []
+        review_owner = f"review:{uuid.uuid4()}"
+        QUOTAS.register(review_owner, client)
+        try:
+            with ScheduledEngine(_new_engine("review"), SCHEDULER, owner=review_owner, priority=Priority.BATCH) as engine:
+                reviewer = PgnReviewer(engine, quick_mode=quick_mode, headless=True)
+                if adaptive:  # two-pass: entries are only final once both passes are done
+                    entries = reviewer.review_moves_adaptive(moves, time_budget=time_budget)
+                else:
+                    entries = reviewer.iter_review_moves(moves)
+                for entry in entries:
+                    review_data.append(entry)
+                    yield _ndjson_line({"type": "move", **entry})
+        except Exception as e:
+            yield _ndjson_line({"type": "error", "detail": f"Failed to review PGN: {e}"})
+            return
+        finally:
+            QUOTAS.forget(review_owner)
+        if cache_key and review_data:
+            REVIEW_CACHE.put(cache_key, review_data)
+    position_index = get_position_index()
+    if position_index is not None and game is not None and review_data:
+        position_index.add_game(game)
+    yield _ndjson_line({"type": "summary", "stats": game_stats(review_data) if review_data else None, "cached": cached})
+
+async def _gzip_lines(lines: AsyncIterable[str]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for line in lines:
+        # Sync flush: each line reaches the client now instead of waiting for the deflate buffer to fill
+        yield compressor.compress(line.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def _ndjson_response(request: Request, lines: Union[Iterable[str], AsyncIterable[str]]) -> StreamingResponse:
+    """Stream NDJSON lines, gzip-compressed line by line when the client accepts gzip."""
+    if not hasattr(lines, "__aiter__"):
+        lines = iterate_in_threadpool(iter(lines))  # sync generators do engine work; keep it off the event loop
+    if "gzip" not in request.headers.get("accept-encoding", "").lower():
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    return StreamingResponse(_gzip_lines(lines), media_type="application/x-ndjson",
+                             headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+
+def _evaluate_fen(fen: str, depth: int, owner: str) -> Dict:
+    try:
+        board = chess.Board(fen)
+    except ValueError as e:
+        return {"fen": fen, "error": f"Invalid FEN: {e}"}
+    if not board.is_valid():  # e.g. no king, or the side not to move in check: Stockfish crashes on these
+        return {"fen": fen, "error": "Illegal position"}
+    analysis = SCHEDULER.cached(board, depth)
+    if analysis is None:
+        with ENGINE_POOL.acquire() as engine:
+            analysis = SCHEDULER.analyze(engine, board, depth, Priority.BATCH, owner)
+    return {"fen": fen, "analysis": analysis}
+
+def _fen_from_ndjson(line: bytes) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return line.decode()  # tolerate bare FEN lines
+    return item.get("fen", "") if isinstance(item, dict) else str(item)
+
+async def _ndjson_fens(request: Request) -> List[str]:
+    # The body has to be drained before the response starts streaming:
+    # StreamingResponse listens on the same ASGI receive channel for disconnects.
+    fens = []
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            fen = _fen_from_ndjson(line)
+            if fen is not None:
+                fens.append(fen)
+        if len(fens) > BATCH_MAX_POSITIONS:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_POSITIONS} positions per batch")
+    fen = _fen_from_ndjson(buffer)
+    if fen is not None:
+        fens.append(fen)
+    return fens
+
+async def _stream_evaluations(fens: List[str], depth: int, ordered: bool, client: str) -> AsyncIterator[str]:
+    """Evaluate positions concurrently (bounded by the engine pool) and emit NDJSON lines."""
+    loop = asyncio.get_running_loop()
+    owner = f"batch:{uuid.uuid4()}"
+    QUOTAS.register(owner, client)
+    max_inflight = ENGINE_POOL.size * 2
+    pending: Dict[asyncio.Future, int] = {}
+    finished: Dict[int, Dict] = {}
+    next_index = 0
+
+    def ready_lines() -> List[str]:
+        nonlocal next_index
+        lines = []
+        if ordered:
+            while next_index in finished:
+                lines.append(json.dumps(finished.pop(next_index)) + "\n")
+                next_index += 1
+        else:
+            for index in sorted(finished):
+                lines.append(json.dumps(finished.pop(index)) + "\n")
+        return lines
+
+    async def collect(return_when):
+        done, _ = await asyncio.wait(list(pending), return_when=return_when)
+        for fut in done:
+            index = pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                # The 200 is already sent: report the failure on this position's line and keep streaming
+                print(f"Batch evaluation of {fens[index]!r} failed: {e}")
+                result = {"fen": fens[index], "error": f"Engine error: {e}"}
+            finished[index] = {"index": index, **result}
+
+    try:
+        for index, fen in enumerate(fens):
+            pending[loop.run_in_executor(None, _evaluate_fen, fen, depth, owner)] = index
+            if len(pending) >= max_inflight:
+                await collect(asyncio.FIRST_COMPLETED)
+                for line in ready_lines():
+                    yield line
+        while pending:
+            await collect(asyncio.FIRST_COMPLETED)
+            for line in ready_lines():
+                yield line
+    finally:
+        QUOTAS.forget(owner)
+
+@app.post("/evaluate_batch")
+async def evaluate_batch(request: Request, depth: int = 12, ordered: bool = True,
+                         client: str = Depends(admit_new_work)):
+    """Evaluate many FENs; responds with one NDJSON line per position.
+
+    Body is either JSON ({"fens": [...], "depth": 12, "ordered": true}) or an
+    NDJSON body (Content-Type: application/x-ndjson) of {"fen": ...} objects
+    or bare FEN strings, with depth/ordered taken from the query string.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        fens = await _ndjson_fens(request)
+    else:
+        try:
+            body = BatchEvaluateRequest(**(await request.json()))
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch request: {e}")
+        fens, depth, ordered = body.fens, body.depth, body.ordered
+    if len(fens) > BATCH_MAX_POSITIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_POSITIONS} positions per batch")
+    if not 1 <= depth <= MAX_BATCH_DEPTH:
+        raise HTTPException(status_code=422, detail=f"depth must be between 1 and {MAX_BATCH_DEPTH}")
+    return _ndjson_response(request, _stream_evaluations(fens, depth, ordered, client))
+
 @app.get("/")
 def read_root():
     return {"message": "NoChess API is running"}
 
+@app.get("/health")
+def health():
+    """Readiness probe: 503 until engine warm-up has finished."""
+    body = {
+        **WARMUP,
+        "sessions": len(SESSIONS),
+        "session_engines": SESSION_ENGINES.stats(),
+        "engine_pool": ENGINE_POOL.stats(),
+        "scheduler": SCHEDULER.stats(),
+        "quotas": QUOTAS.stats(),
+    }
+    if REVIEW_QUEUE_PATH:
+        body["review_queue"] = get_review_queue().stats()
+    shared = shared_analysis_cache()
+    if shared is not None:
+        body["shared_cache"] = shared.stats()
+    return JSONResponse(body, status_code=200 if WARMUP["status"] == "ready" else 503)
+
+@app.get("/usage")
+def usage(request: Request):
+    """Engine time used by the calling client, per session/review, and seconds until it is admitted again."""
+    return QUOTAS.usage(_client(request))
+
 @app.post("/resign/{session_id}", response_model=GameStateResponse)
 def resign(session_id: str):
     session_data = get_session_data(session_id)
@@ -248,15 +775,51 @@ def resign(session_id: str):
     state["user_color"] = user_color
     return state
 
+@app.post("/undo/{session_id}", response_model=GameStateResponse)
+def undo(session_id: str):
+    """Take back the user's last move (and the engine's reply to it); the stored analysis is restored, no search."""
+    session_data = get_session_data(session_id)
+    game: ChessGame = session_data["game"]
+    user_color: str = session_data.get("user_color", "white")
+    plies = 2 if game.turn_color() == user_color else 1
+    if not game.undo_move(plies):
+        raise HTTPException(status_code=400, detail="Nothing to undo")
+    state = game.get_state_json()
+    state["session_id"] = session_id
+    state["user_color"] = user_color
+    return state
+
+@app.get("/review/{session_id}", response_model=PgnReviewResponse)
+def review_session(session_id: str, client: str = Depends(admit_new_work)):
+    """Review the session's game from the analyses stored during play; only missing positions are searched."""
+    from .pgnReview import PgnReviewer
+    from .review_stats import game_stats
+    session_data = get_session_data(session_id)
+    game: ChessGame = session_data["game"]
+    user_color: str = session_data.get("user_color", "white")
+    moves = list(game.board.move_stack)
+    # Own facade: the session's shared one is also used by live requests
+    engine = ScheduledEngine(session_data["engine"].engine, SCHEDULER, owner=session_id, priority=Priority.BATCH)
+    reviewer = PgnReviewer(engine, review_depth=DEFAULT_DEPTH, headless=True)
+    review_data = reviewer.review_history(moves, game.analysis_history())
+    players = {user_color: "You", "black" if user_color == "white" else "white": "Stockfish"}
+    return {
+        "review_data": review_data,
+        "stats": game_stats(review_data) if review_data else None,
+        "event": "Live game",
+        "white": players["white"],
+        "black": players["black"],
+        "result": game.game_status()["result"] or "*",
+    }
+
 @app.post("/restart/{session_id}", response_model=GameStateResponse)
-def restart(session_id: str):
+def restart(session_id: str, client: str = Depends(admit_new_work)):
     session_data = get_session_data(session_id)
     game: ChessGame = session_data["game"]
-    engine: StockfishEngine = session_data["engine"]
+    engine: ScheduledEngine = session_data["engine"]
 
     game.restart()
-    engine.set_position([])
-    analysis = engine.analyze_position()
+    analysis = _analyze_moves(engine, [], Priority.INTERACTIVE)
     game.set_analysis(analysis)
 
     user_color = random.choice(["white", "black"])
@@ -265,8 +828,7 @@ def restart(session_id: str):
         if best_move and best_move != "(none)":
             game.make_move(best_move)
             moves = game.get_move_history_uci()
-            engine.set_position(moves)
-            analysis = engine.analyze_position()
+            analysis = _analyze_moves(engine, moves)
             game.set_analysis(analysis)
 
     session_data["user_color"] = user_color
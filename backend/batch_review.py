@@ -0,0 +1,191 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, List, Optional, TextIO, Tuple
+import chess
+import chess.pgn
+from .engine_pool import EnginePool
+from .pgnReview import PgnReviewer, collect_pgn_files, iter_games, review_variant
+from .review_cache import ReviewCache, engine_tag, review_key
+from .review_stats import PlayerStats, game_stats
+
+FORMATS = ("json", "csv", "pgn")
+CSV_FIELDS = ["file", "game", "white", "black", "move_number", "player", "move",
+              "pre_eval", "post_eval", "best_move", "pv", "comment"]
+
+# Comment prefix → PGN NAG ($1 = !, $2 = ?, $3 = !!, $4 = ??, $6 = ?!)
+_NAGS = {"Brilliant": 3, "Blunder": 4, "Mistake": 2, "Inaccuracy": 6}
+
+
+def format_for(output: Optional[str], fmt: Optional[str] = None) -> str:
+    """Explicit format, else inferred from the output file extension, else json."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(output or "")[1].lstrip(".").lower()
+    return ext if ext in FORMATS else "json"
+
+
+def _white_eval(entry: Dict) -> str:
+    """post_eval is relative to the side to move after the move; PGN %eval is White's view."""
+    post = entry["post_eval"]
+    score = -post["score"] if entry["player"] == "White" else post["score"]
+    return f"#{score}" if post["is_mate"] else f"{score / 100:.2f}"
+
+
+class JsonLinesWriter:
+    """One JSON object per reviewed game (NDJSON), streamable and appendable."""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write(self, path: str, index: int, game: chess.pgn.Game, review_data: List[Dict]):
+        record = {"file": path, "game": index, "headers": dict(game.headers),
+                  "stats": game_stats(review_data), "review_data": review_data}
+        self.out.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class CsvWriter:
+    """One row per reviewed move."""
+
+    def __init__(self, out: TextIO):
+        self.writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, path: str, index: int, game: chess.pgn.Game, review_data: List[Dict]):
+        for entry in review_data:
+            self.writer.writerow({
+                "file": path,
+                "game": index,
+                "white": game.headers.get("White", "?"),
+                "black": game.headers.get("Black", "?"),
+                "move_number": entry["move_number"],
+                "player": entry["player"],
+                "move": entry["move"],
+                "pre_eval": entry["pre_eval"]["formatted"],
+                "post_eval": entry["post_eval"]["formatted"],
+                "best_move": entry["best_move"],
+                "pv": entry["pv"],
+                "comment": entry["comment"],
+            })
+
+
+class PgnWriter:
+    """The original games with [%eval] comments, review comments and move NAGs."""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write(self, path: str, index: int, game: chess.pgn.Game, review_data: List[Dict]):
+        nodes = list(game.mainline())
+        for node, entry in zip(nodes, review_data):
+            node.comment = f"[%eval {_white_eval(entry)}] {entry['comment']}"
+            nag = _NAGS.get(entry["comment"].split(":", 1)[0])
+            if nag:
+                node.nags.add(nag)
+        print(game, file=self.out, end="\n\n")
+
+
+WRITERS = {"json": JsonLinesWriter, "csv": CsvWriter, "pgn": PgnWriter}
+
+
+class _Progress:
+    def __init__(self, stream: Optional[TextIO], total_files: int, interval: float = 1.0):
+        self.stream = stream
+        self.total_files = total_files
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    def update(self, summary: Dict, force: bool = False):
+        if self.stream is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = max(now - self.started, 1e-9)
+        self.stream.write(
+            f"files {summary['files']}/{self.total_files}  games {summary['games']}  moves {summary['moves']}"
+            f"  cached {summary['cached']}  errors {summary['errors']}  {summary['games'] / elapsed:.1f} games/s\n"
+        )
+        self.stream.flush()
+
+
+def review_archive(paths: Iterable[str], out: TextIO, fmt: str = "json", workers: int = 2, depth: int = 20,
+                   cache: Optional[ReviewCache] = None, progress: Optional[TextIO] = sys.stderr,
+                   factory: Optional[Callable] = None, position_index=None,
+                   adaptive: bool = False, time_budget: Optional[float] = None, engine_kind: str = "stockfish") -> Dict:
+    """Review every game in the given PGN files/directories with `workers` parallel engines.
+
+    Games are streamed from disk and reviewed concurrently (at most 2 x workers
+    in flight); results are written in input order. Games already in the review
+    cache at this depth and mode are not searched again. `adaptive` and
+    `time_budget` select PgnReviewer's two-pass review. With `position_index`, every
+    reviewed game is also archived and indexed for position search. Returns a
+    summary dict, including per-player ACPL/accuracy aggregates under "players".
+    """
+    files = collect_pgn_files(paths)
+    writer = WRITERS[fmt](out)
+    summary = {"files": 0, "games": 0, "moves": 0, "cached": 0, "errors": 0, "seconds": 0.0}
+    reporter = _Progress(progress, len(files))
+    players = PlayerStats()
+    variant = review_variant(adaptive, time_budget)
+    pool = EnginePool(size=workers, profile="review", factory=factory)
+
+    def review(moves: List[chess.Move]) -> Tuple[List[Dict], bool]:
+        key = review_key(moves, depth, variant, engine_tag(engine_kind))
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            return cached, True
+        with pool.acquire() as engine:
+            reviewer = PgnReviewer(engine, review_depth=depth, headless=True)
+            if adaptive:
+                review_data = reviewer.review_moves_adaptive(moves, time_budget=time_budget)
+            else:
+                review_data = reviewer.review_moves(moves)
+        if cache:
+            cache.put(key, review_data)
+        return review_data, False
+
+    def drain(window: Deque, keep: int):
+        while len(window) > keep:
+            path, index, game, future = window.popleft()
+            try:
+                review_data, was_cached = future.result()
+            except Exception as e:
+                summary["errors"] += 1
+                print(f"Review failed for {path} game {index}: {e}", file=sys.stderr)
+                continue
+            writer.write(path, index, game, review_data)
+            players.add_game(game.headers.get("White", "?"), game.headers.get("Black", "?"), review_data)
+            if position_index is not None:
+                position_index.add_game(game)
+            summary["games"] += 1
+            summary["moves"] += len(review_data)
+            summary["cached"] += was_cached
+            reporter.update(summary)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            window: Deque[Tuple[str, int, chess.pgn.Game, Future]] = deque()
+            for path in files:
+                try:
+                    for index, (game, moves) in enumerate(iter_games(path), start=1):
+                        window.append((path, index, game, executor.submit(review, moves)))
+                        drain(window, keep=2 * workers)
+                except (OSError, UnicodeError, ValueError) as e:
+                    summary["errors"] += 1
+                    print(f"Could not read {path}: {e}", file=sys.stderr)
+                summary["files"] += 1
+            drain(window, keep=0)
+    finally:
+        pool.close()
+    out.flush()
+    summary["seconds"] = round(time.monotonic() - reporter.started, 3)
+    reporter.update(summary, force=True)
+    summary["players"] = players.result()
+    return summary
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Optional, Set
+from .wire import encode_analysis
+
+
+class AnalysisFrame:
+    """One published analysis, encoded at most once per wire format."""
+
+    def __init__(self, analysis: Dict):
+        self.analysis = analysis
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json.dumps(self.analysis, separators=(",", ":"))
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = encode_analysis(self.analysis)
+        return self._binary
+
+
+class AnalysisHub:
+    """Fan out a single periodic analysis producer to many subscribers.
+
+    The producer task only runs while at least one subscriber is attached, so
+    extra tabs or spectators on a session cost no additional engine time. Each
+    subscriber has a bounded queue; when a slow consumer falls behind, its
+    oldest pending frame is dropped so it always catches up to the latest eval.
+    A new subscriber first gets the latest frame, which is forgotten when the
+    producer stops: moves made while nobody was subscribed would make it stale.
+    """
+
+    def __init__(self, analyze: Callable[[], Awaitable[Dict]], interval: float = 1.0, queue_size: int = 2):
+        self._analyze = analyze
+        self.interval = interval
+        self.queue_size = queue_size
+        self.latest: Optional[AnalysisFrame] = None
+        self.dropped = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.latest = None
+
+    def publish(self, analysis: Dict) -> AnalysisFrame:
+        frame = AnalysisFrame(analysis)
+        self.latest = frame
+        for queue in list(self._subscribers):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(frame)
+        return frame
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                self.publish(await self._analyze())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Analysis producer error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        task, self._task = self._task, None
+        self._subscribers.clear()
+        self.latest = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
@@ -7,9 +7,20 @@ class ChessGame:
         self.user_color_white = user_color_white
         self.last_move: Optional[chess.Move] = None
         self._analysis: Optional[Dict] = None
+        self._history: List[Optional[Dict]] = [None]  # analysis of the position after each ply (index 0: start)
         self._override_game_over: bool = False
         self._override_result: Optional[str] = None
         self._override_status: Optional[str] = None
+        # Monotonic state version: bumped on every mutation so clients can poll
+        # with ETags / `since` and receive 304s or deltas instead of full state.
+        self.version: int = 0
+        self._base_version: int = 0
+        self._move_versions: List[int] = []
+        self._analysis_version: int = 0
+
+    def _bump_version(self) -> int:
+        self.version += 1
+        return self.version
 
     def legal_moves_uci(self) -> List[str]:
         return [m.uci() for m in self.board.legal_moves]
@@ -23,16 +34,44 @@ class ChessGame:
             return False
         self.board.push(move)
         self.last_move = move
+        self._history.append(None)
+        self._move_versions.append(self._bump_version())
         return True
 
     def make_move(self, uci: str) -> bool:
         return self.apply_uci_move(uci)
 
+    def undo_move(self, plies: int = 1) -> bool:
+        """Take back `plies` moves. The analysis stored for the restored position becomes current, so no search is needed."""
+        if self._override_game_over or not 1 <= plies <= len(self.board.move_stack):
+            return False
+        for _ in range(plies):
+            self.board.pop()
+            self._history.pop()
+            self._move_versions.pop()
+        self.last_move = self.board.move_stack[-1] if self.board.move_stack else None
+        self._analysis = self._history[-1]
+        # Moves were removed: clients polling with `since` must refetch full state
+        self._base_version = self._bump_version()
+        self._analysis_version = self._base_version
+        return True
+
     def get_move_history_uci(self) -> List[str]:
         return [m.uci() for m in self.board.move_stack]
 
     def set_analysis(self, analysis: Dict):
+        self._history[-1] = analysis
+        if analysis == self._analysis:
+            return
         self._analysis = analysis
+        self._analysis_version = self._bump_version()
+
+    def get_analysis(self) -> Optional[Dict]:
+        return self._analysis
+
+    def analysis_history(self) -> List[Optional[Dict]]:
+        """Stored analysis per position, index = plies played (None where none was computed)."""
+        return list(self._history)
 
     def fen(self) -> str:
         return self.board.fen()
@@ -113,7 +152,38 @@ class ChessGame:
             "is_draw": status["is_draw"],
             "draw_reason": status["draw_reason"],
             "last_move": (self.last_move.uci() if self.last_move else None),
+            "version": self.version,
+        }
+
+    def get_delta_json(self, since: int) -> Optional[Dict]:
+        """Changes since `since`, or None if the client must refetch full state."""
+        if since < self._base_version or since > self.version:
+            return None
+        new_moves = [
+            m.uci() for m, v in zip(self.board.move_stack, self._move_versions) if v > since
+        ]
+        status = self.game_status()
+        delta = {
+            "version": self.version,
+            "since": since,
+            "moves": new_moves,
+            "fen": self.fen(),
+            "turn": self.turn_color(),
+            "game_over": status["game_over"],
+            "result": status["result"],
+            "status": status["status"],
+            "in_check": status["in_check"],
+            "in_checkmate": status["in_checkmate"],
+            "in_stalemate": status["in_stalemate"],
+            "is_draw": status["is_draw"],
+            "draw_reason": status["draw_reason"],
+            "last_move": (self.last_move.uci() if self.last_move else None),
         }
+        if new_moves:
+            delta["legal_moves"] = self.legal_moves_uci()
+        if self._analysis_version > since:
+            delta["analysis"] = self._analysis
+        return delta
 
     def resign(self, resigning_color: str):
         if self._override_game_over or self.board.is_game_over():
@@ -124,11 +194,15 @@ class ChessGame:
             self._override_result = "1-0"
         self._override_status = "Resignation"
         self._override_game_over = True
+        self._bump_version()
 
     def restart(self):
         self.board = chess.Board()
         self.last_move = None
         self._analysis = None
+        self._history = [None]
         self._override_game_over = False
         self._override_result = None
-        self._override_status = None
\ No newline at end of file
+        self._override_status = None
+        self._move_versions = []
+        self._base_version = self._bump_version()
\ No newline at end of file
@@ -1,16 +1,88 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set
 import os
+import threading
 import chess
 import chess.engine
+from .analysis_cache import position_key
+from .shared_cache import shared_analysis_cache
+
+# UCI resource profiles, one per difficulty mode plus one for PGN review.
+# Every value can be overridden per deployment with STOCKFISH_<OPTION> (all
+# profiles) or STOCKFISH_<PROFILE>_<OPTION> (one profile), e.g.
+# STOCKFISH_REVIEW_THREADS=4, STOCKFISH_HASH=256, STOCKFISH_EVALFILE=nn.nnue.
+# CPU pinning is configured the same way with a cpu list: STOCKFISH_CPUS=0-3
+# or STOCKFISH_REVIEW_CPUS=4-7,12.
+ENGINE_PROFILES: Dict[str, Dict[str, object]] = {
+    "beginner": {"Threads": 1, "Hash": 16},
+    "intermediate": {"Threads": 1, "Hash": 32},
+    "advanced": {"Threads": 2, "Hash": 64},
+    "review": {"Threads": 2, "Hash": 128},
+}
+DEFAULT_PROFILE = "intermediate"
+DEFAULT_DEPTH = 12
+# Watchdog: a search still running after SEARCH_TIMEOUT seconds is stopped; an
+# engine that hasn't answered `stop` STOP_GRACE seconds later is killed and respawned.
+SEARCH_TIMEOUT = float(os.getenv("ENGINE_SEARCH_TIMEOUT", "30"))
+STOP_GRACE = float(os.getenv("ENGINE_STOP_GRACE", "2"))
+
+_ENV_OPTIONS = {
+    "THREADS": ("Threads", int),
+    "HASH": ("Hash", int),
+    "MOVE_OVERHEAD": ("Move Overhead", int),
+    "EVALFILE": ("EvalFile", str),
+}
+
+
+def parse_cpu_list(spec: str) -> Set[int]:
+    """Parse a Linux-style cpu list ("0-3,6") into a set of cpu ids."""
+    cpus: Set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def resolve_profile(profile: Optional[str] = None) -> Dict:
+    """Return {"options": {...}, "cpus": set | None} for a named profile, env overrides applied."""
+    name = (profile or DEFAULT_PROFILE).lower()
+    options = dict(ENGINE_PROFILES.get(name, ENGINE_PROFILES[DEFAULT_PROFILE]))
+    prefix = f"STOCKFISH_{name.upper()}_"
+    for key, (option, cast) in _ENV_OPTIONS.items():
+        value = os.getenv(prefix + key, os.getenv(f"STOCKFISH_{key}"))
+        if value:
+            options[option] = cast(value)
+    cpu_spec = os.getenv(prefix + "CPUS", os.getenv("STOCKFISH_CPUS"))
+    return {"options": options, "cpus": parse_cpu_list(cpu_spec) if cpu_spec else None}
+
+
+class EngineUnresponsive(RuntimeError):
+    """The engine ignored `stop` after its search deadline and was killed."""
+
 
 class StockfishEngine:
-    def __init__(self, engine_path: Optional[str] = None, depth: int = 12):
+    def __init__(self, engine_path: Optional[str] = None, depth: int = DEFAULT_DEPTH, profile: Optional[str] = None,
+                 options: Optional[Dict[str, object]] = None, cpus: Optional[Iterable[int]] = None,
+                 search_timeout: Optional[float] = None, shared_cache=None):
         # Resolve engine binary path from env or default to 'stockfish' in PATH
         if engine_path is None:
             engine_path = os.getenv("STOCKFISH_PATH", "stockfish")
-        self.engine = chess.engine.SimpleEngine.popen_uci(engine_path)
+        self.engine_path = engine_path
+        self.cpus = set(cpus) if cpus is not None else resolve_profile(profile)["cpus"]
+        self.engine = self._spawn()
+        self.search_timeout = SEARCH_TIMEOUT if search_timeout is None else search_timeout
+        self.restarts = 0  # respawns after a hung or crashed engine
         self.board = chess.Board()
         self.depth_limit = chess.engine.Limit(depth=depth)
+        self._search: Optional[chess.engine.SimpleAnalysisResult] = None
+        # Host-wide results shared with other worker processes (ANALYSIS_SHM_MB)
+        self.shared_cache = shared_cache if shared_cache is not None else shared_analysis_cache()
+        self.apply_profile(profile, options, cpus)
 
     def __enter__(self):
         return self
@@ -18,16 +90,100 @@ class StockfishEngine:
     def __exit__(self, exc_type, exc, tb):
         self.quit()
 
+    def apply_profile(self, profile: Optional[str] = None, options: Optional[Dict[str, object]] = None,
+                      cpus: Optional[Iterable[int]] = None):
+        """Switch to a resource profile; cheap on a running engine (no respawn or NNUE reload)."""
+        resolved = resolve_profile(profile)
+        self.profile = profile or DEFAULT_PROFILE
+        self.options = {**resolved["options"], **(options or {})}
+        self.configure(self.options)
+        cpus = set(cpus) if cpus is not None else resolved["cpus"]
+        previous, self.cpus = self.cpus, cpus
+        if cpus:
+            self.pin_to_cpus(cpus)
+        elif previous and hasattr(os, "sched_getaffinity"):
+            self.pin_to_cpus(os.sched_getaffinity(0))  # unpinned profile: back to this process' cpus
+
+    def restart(self):
+        """Kill the engine process and start a fresh one with the same options and cpus."""
+        self._kill()
+        self.engine = self._spawn()
+        self.restarts += 1
+        self.configure(self.options)
+
+    def _spawn(self) -> chess.engine.SimpleEngine:
+        # Pinned before exec, so every thread the engine creates inherits the mask
+        cpus = self.cpus
+        if cpus and hasattr(os, "sched_setaffinity"):
+            return chess.engine.SimpleEngine.popen_uci(self.engine_path,
+                                                      preexec_fn=lambda: os.sched_setaffinity(0, cpus))
+        return chess.engine.SimpleEngine.popen_uci(self.engine_path)
+
+    def ping(self):
+        """Round-trip `isready`; returns once the engine has finished initialising."""
+        self.engine.ping()
+
+    def configure(self, options: Dict[str, object]):
+        """Apply UCI options the engine actually advertises; unknown ones are skipped."""
+        supported = {name.lower(): name for name in self.engine.options}
+        applicable = {}
+        for name, value in options.items():
+            if name.lower() in supported:
+                applicable[supported[name.lower()]] = value
+            else:
+                print(f"Engine does not support UCI option {name!r}; skipping")
+        if applicable:
+            self.engine.configure(applicable)
+
+    def pin_to_cpus(self, cpus: Iterable[int]) -> bool:
+        """Restrict the running engine to the given cpus (Linux only).
+
+        sched_setaffinity applies to one thread, so every thread of the
+        process is pinned; threads started later inherit the mask.
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            return False
+        try:
+            pid = self.engine.transport.get_pid()
+            try:
+                tids = [int(t) for t in os.listdir(f"/proc/{pid}/task")]
+            except OSError:
+                tids = [pid]
+            for tid in tids:
+                try:
+                    os.sched_setaffinity(tid, set(cpus))
+                except ProcessLookupError:  # the thread exited meanwhile
+                    pass
+            return True
+        except (OSError, AttributeError) as e:
+            print(f"Could not pin engine to cpus {sorted(cpus)}: {e}")
+            return False
+
     def set_position(self, uci_moves: List[str]):
         self.board = chess.Board()
         for u in uci_moves:
             self.board.push_uci(u)
 
+    def set_board(self, board: chess.Board):
+        self.board = board.copy()
+
     def set_depth(self, depth: int):
         self.depth_limit = chess.engine.Limit(depth=depth)
 
-    def analyze_position(self) -> Dict:
-        info = self.engine.analyse(self.board, self.depth_limit)
+    def analyze_position(self, depth: Optional[int] = None) -> Dict:
+        limit = chess.engine.Limit(depth=depth) if depth else self.depth_limit
+        key = position_key(self.board) if self.shared_cache is not None and limit.depth else None
+        if key is not None:
+            cached = self.shared_cache.get(key, limit.depth)
+            if cached is not None:
+                return cached
+        try:
+            info = self._search_with_deadline(limit)
+        except (EngineUnresponsive, chess.engine.EngineError, TimeoutError) as e:
+            # Hung or crashed: retry once on a fresh process; a second failure propagates
+            print(f"Engine failed ({e}); restarting and retrying the search")
+            self.restart()
+            info = self._search_with_deadline(limit)
         pov = info.get("score")
         pv = info.get("pv", [])
         rel = pov.relative if pov else None
@@ -37,16 +193,70 @@ class StockfishEngine:
         else:
             score_value = rel.cp if rel else 0
 
-        return {
+        result = {
             "score": int(score_value or 0),
             "is_mate": is_mate,
             "best_move": pv[0].uci() if pv else None,
             "pv": [m.uci() for m in pv],
             "depth": info.get("depth", None),
         }
+        if key is not None:
+            # Stored at the depth actually reached, so a stopped search can't pass for a full one
+            self.shared_cache.put(key, result)
+        return result
+
+    def _search_with_deadline(self, limit: chess.engine.Limit) -> Dict:
+        """Run one search; past `search_timeout` it is stopped, and past STOP_GRACE more the process is killed.
+
+        A search stopped in time returns its partial result, like one
+        preempted by the scheduler.
+        """
+        finished = threading.Event()
+        killed = threading.Event()
+
+        def expire():
+            self.stop()
+            if not finished.wait(STOP_GRACE):
+                killed.set()
+                self._kill()
+
+        watchdog = threading.Timer(self.search_timeout, expire)
+        watchdog.daemon = True
+        try:
+            with self.engine.analysis(self.board, limit) as search:
+                self._search = search
+                watchdog.start()
+                try:
+                    search.wait()
+                    info = search.info
+                finally:
+                    self._search = None
+        except chess.engine.EngineError:
+            if killed.is_set():
+                raise EngineUnresponsive(f"no answer to stop within {self.search_timeout + STOP_GRACE:.1f}s")
+            raise
+        finally:
+            finished.set()
+            watchdog.cancel()
+        return info
+
+    def _kill(self):
+        try:
+            self.engine.close()  # thread-safe; kills the process and fails any pending command
+        except Exception:
+            pass
+
+    def stop(self):
+        """Stop the running search (from another thread); it returns what it has so far."""
+        search = self._search
+        if search is not None:
+            try:
+                search.stop()
+            except Exception:
+                pass
 
     def quit(self):
         try:
             self.engine.quit()
         except Exception:
-            pass
\ No newline at end of file
+            pass
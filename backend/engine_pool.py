@@ -0,0 +1,116 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+from .engine import StockfishEngine
+
+
+class EnginePool:
+    """Reusable engine processes for work that isn't tied to a game session.
+
+    Engines are spawned lazily up to `size` and handed out one caller at a
+    time; callers block while all of them are busy. `prewarm` spawns them up
+    front, and `take` hands a warm engine over for good (to a game session)
+    while a replacement is spawned in the background.
+    """
+
+    def __init__(self, size: Optional[int] = None, profile: str = "review",
+                 factory: Optional[Callable[[], StockfishEngine]] = None):
+        if size is None:
+            size = int(os.getenv("ENGINE_POOL_SIZE", "2"))
+        self.size = max(1, size)
+        self.profile = profile
+        self._factory = factory or (lambda: StockfishEngine(profile=self.profile))
+        self._idle: List[StockfishEngine] = []
+        self._spawned = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.warm_target = 0
+
+    @contextmanager
+    def acquire(self):
+        engine = self._checkout()
+        try:
+            yield engine
+        finally:
+            self._checkin(engine)
+
+    def _checkout(self) -> StockfishEngine:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Engine pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._spawned < self.size:
+                    self._spawned += 1
+                    break
+                self._cond.wait()
+        try:
+            return self._factory()
+        except Exception:
+            with self._cond:
+                self._spawned -= 1
+                self._cond.notify()
+            raise
+
+    def _checkin(self, engine: StockfishEngine):
+        with self._cond:
+            if not self._closed:
+                self._idle.append(engine)
+                self._cond.notify()
+                return
+        engine.quit()
+
+    def prewarm(self, count: Optional[int] = None) -> int:
+        """Spawn and `isready`-probe engines until `count` exist; returns how many were started."""
+        count = self.size if count is None else min(count, self.size)
+        self.warm_target = max(self.warm_target, count)
+        started = 0
+        while True:
+            with self._cond:
+                if self._closed or self._spawned >= count:
+                    return started
+                self._spawned += 1
+            try:
+                engine = self._factory()
+                engine.ping()
+            except Exception:
+                with self._cond:
+                    self._spawned -= 1
+                    self._cond.notify()
+                raise
+            self._checkin(engine)
+            started += 1
+
+    def take(self, profile: Optional[str] = None) -> StockfishEngine:
+        """Remove an engine from the pool for exclusive long-term use."""
+        with self._cond:
+            engine = self._idle.pop() if self._idle else None
+            if engine is not None:
+                self._spawned -= 1
+        if engine is None:
+            engine = self._factory()
+        if profile and profile != getattr(engine, "profile", None):
+            engine.apply_profile(profile)
+        if self.warm_target:
+            threading.Thread(target=self._refill, daemon=True).start()
+        return engine
+
+    def _refill(self):
+        try:
+            self.prewarm(self.warm_target)
+        except Exception as e:
+            print(f"Engine pool refill failed: {e}")
+
+    def stats(self):
+        with self._cond:
+            return {"size": self.size, "spawned": self._spawned, "idle": len(self._idle), "warm_target": self.warm_target}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for engine in idle:
+            engine.quit()
@@ -0,0 +1,122 @@
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Optional, TextIO
+import chess
+from .analysis_cache import position_key
+from .record_file import ExternalSorter, RecordFile, write_records
+from .wire import pack_move, unpack_move
+
+EXPLORER_MAGIC = b"NCEXPL01"
+# zobrist key, packed move, white wins, draws, black wins, sum of evals (cp, White's view), eval count
+EXPLORER_RECORD = struct.Struct("<QHIIIqI")
+DEFAULT_MAX_PLIES = 30
+EVAL_CLAMP = 1000  # mate and larger scores count as +/-10 pawns in the average
+
+_RESULTS = {"1-0": (1, 0, 0), "1/2-1/2": (0, 1, 0), "0-1": (0, 0, 1)}
+
+
+def _combine(a, b):
+    return (a[0], a[1], a[2] + b[2], a[3] + b[3], a[4] + b[4], a[5] + b[5], a[6] + b[6])
+
+
+def build_explorer_index(paths: Iterable[str], out_path: str, max_plies: int = DEFAULT_MAX_PLIES,
+                         run_size: int = 500_000, progress: Optional[TextIO] = None) -> Dict:
+    """Stream PGN files/directories into an explorer index at `out_path`.
+
+    Each (position, move) pair from the first `max_plies` plies of every
+    decided game is counted with the game result and, when the PGN carries
+    [%eval] comments, the evaluation after the move. Counts are aggregated in
+    memory, spilled as sorted runs every `run_size` distinct pairs and merged
+    into one memory-mappable file.
+    """
+    from .pgnReview import collect_pgn_files, iter_games  # PGN parsing is only needed offline
+
+    summary = {"files": 0, "games": 0, "skipped": 0, "records": 0, "seconds": 0.0}
+    started = time.monotonic()
+    with ExternalSorter(EXPLORER_RECORD, key_fields=2, combine=_combine, run_size=run_size) as sorter:
+        counts: Dict = {}
+
+        def flush():
+            for (key, move), stats in counts.items():
+                sorter.add((key, move, *stats))
+            counts.clear()
+
+        for path in collect_pgn_files(paths):
+            summary["files"] += 1
+            try:
+                for game, moves in iter_games(path):
+                    result = _RESULTS.get(game.headers.get("Result", "*"))
+                    if result is None:
+                        summary["skipped"] += 1
+                        continue
+                    white, draw, black = result
+                    board = game.board()
+                    for ply, node in enumerate(game.mainline()):
+                        if ply >= max_plies:
+                            break
+                        entry = (position_key(board), pack_move(node.move.uci()))
+                        stats = counts.get(entry)
+                        if stats is None:
+                            stats = counts[entry] = [0, 0, 0, 0, 0]
+                        stats[0] += white
+                        stats[1] += draw
+                        stats[2] += black
+                        pov = node.eval()
+                        if pov is not None:
+                            score = pov.white().score(mate_score=EVAL_CLAMP)
+                            stats[3] += max(-EVAL_CLAMP, min(EVAL_CLAMP, score))
+                            stats[4] += 1
+                        board.push(node.move)
+                    summary["games"] += 1
+                    if len(counts) >= run_size:
+                        flush()
+            except (OSError, UnicodeError, ValueError) as e:
+                print(f"Could not read {path}: {e}", file=sys.stderr)
+            if progress is not None:
+                progress.write(f"{path}: {summary['games']} games indexed\n")
+        flush()
+        summary["records"] = write_records(out_path, sorter.merged(), EXPLORER_RECORD, EXPLORER_MAGIC)
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    return summary
+
+
+class OpeningExplorer:
+    """Read side of an explorer index: move statistics for a position, straight from the mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index = RecordFile(path, EXPLORER_RECORD, EXPLORER_MAGIC)
+
+    def lookup(self, board: chess.Board) -> Dict:
+        moves = []
+        totals = [0, 0, 0]
+        for _, packed, white, draws, black, eval_sum, eval_count in self.index.lookup(position_key(board)):
+            move = chess.Move.from_uci(unpack_move(packed))
+            if not board.is_legal(move):  # 64-bit hash collision with another position
+                continue
+            games = white + draws + black
+            totals[0] += white
+            totals[1] += draws
+            totals[2] += black
+            moves.append({
+                "uci": move.uci(),
+                "san": board.san(move),
+                "white": white,
+                "draws": draws,
+                "black": black,
+                "games": games,
+                "avg_eval": round(eval_sum / eval_count) if eval_count else None,
+            })
+        moves.sort(key=lambda m: m["games"], reverse=True)
+        return {
+            "fen": board.fen(),
+            "white": totals[0],
+            "draws": totals[1],
+            "black": totals[2],
+            "games": sum(totals),
+            "moves": moves,
+        }
+
+    def close(self):
+        self.index.close()
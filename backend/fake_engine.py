@@ -0,0 +1,96 @@
+import hashlib
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+import chess
+from .engine import DEFAULT_DEPTH, DEFAULT_PROFILE, resolve_profile
+
+_PIECE_CP = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 320, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+
+class FakeEngine:
+    """In-process stand-in for StockfishEngine: legal moves, material evals, no subprocess.
+
+    Used for load tests and machines without a Stockfish binary
+    (NOCHESS_ENGINE=fake). Results are deterministic per position; each
+    search sleeps `delay` seconds (FAKE_ENGINE_DELAY_MS) to emulate engine time.
+    """
+
+    def __init__(self, engine_path: Optional[str] = None, depth: int = DEFAULT_DEPTH, profile: Optional[str] = None,
+                 options: Optional[Dict[str, object]] = None, cpus: Optional[Iterable[int]] = None,
+                 delay: Optional[float] = None):
+        self.board = chess.Board()
+        self.depth = depth
+        self.delay = float(os.getenv("FAKE_ENGINE_DELAY_MS", "0")) / 1000 if delay is None else delay
+        self.apply_profile(profile, options, cpus)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
+
+    def apply_profile(self, profile: Optional[str] = None, options: Optional[Dict[str, object]] = None,
+                      cpus: Optional[Iterable[int]] = None):
+        self.profile = profile or DEFAULT_PROFILE
+        self.options = {**resolve_profile(profile)["options"], **(options or {})}
+
+    def ping(self):
+        pass
+
+    def configure(self, options: Dict[str, object]):
+        self.options.update(options)
+
+    def set_position(self, uci_moves: List[str]):
+        self.board = chess.Board()
+        for u in uci_moves:
+            self.board.push_uci(u)
+
+    def set_board(self, board: chess.Board):
+        self.board = board.copy()
+
+    def set_depth(self, depth: int):
+        self.depth = depth
+
+    def analyze_position(self, depth: Optional[int] = None) -> Dict:
+        if self.delay:
+            time.sleep(self.delay)
+        board = self.board
+        if board.is_checkmate():
+            return {"score": 0, "is_mate": True, "best_move": None, "pv": [], "depth": 0}
+        moves = list(board.legal_moves)
+        if not moves:
+            return {"score": 0, "is_mate": False, "best_move": None, "pv": [], "depth": 0}
+        best = max(moves, key=lambda m: (_capture_value(board, m), _tiebreak(board, m)))
+        board.push(best)
+        score = -_material(board)
+        board.pop()
+        return {"score": score, "is_mate": False, "best_move": best.uci(), "pv": [best.uci()],
+                "depth": depth or self.depth}
+
+    def stop(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+def _material(board: chess.Board) -> int:
+    """Material balance in centipawns for the side to move."""
+    score = 0
+    for piece in board.piece_map().values():
+        value = _PIECE_CP[piece.piece_type]
+        score += value if piece.color == board.turn else -value
+    return score
+
+
+def _capture_value(board: chess.Board, move: chess.Move) -> int:
+    if board.is_en_passant(move):
+        return _PIECE_CP[chess.PAWN]
+    captured = board.piece_type_at(move.to_square)
+    return _PIECE_CP[captured] if captured else 0
+
+
+def _tiebreak(board: chess.Board, move: chess.Move) -> bytes:
+    # Deterministic but position-dependent, so fake games don't all shuffle the same piece
+    return hashlib.blake2b(f"{board.board_fen()}{move.uci()}".encode(), digest_size=4).digest()
@@ -61,7 +61,8 @@ class GameRunner:
             return True
 
         elif user_input == "undo":
-            if self.game.undo_move():
+            # The stored analysis of the restored position is reused; search only if there is none
+            if self.game.undo_move() and self.game.get_analysis() is None:
                 moves = self.game.get_move_history_uci()
                 self.engine.set_position(moves)
                 analysis = self.engine.analyze_position()
@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_DELAY = 5.0  # seconds before a failed job is retried, doubled per attempt
+JOB_TTL = 7 * 24 * 3600  # finished jobs are purged after this many seconds
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    """Durable job queue in a local SQLite file, shared by API and worker processes.
+
+    Workers `claim` a job with a time-limited lease and renew it with
+    `heartbeat` while working. A job whose lease runs out (the worker crashed
+    or was killed) is handed to the next claimant; after `max_attempts`
+    claims it is marked failed. Every call uses a short-lived connection, so
+    any number of processes on one host can use the same file; it must be on
+    a local filesystem, since SQLite's locking is unreliable over network
+    mounts. Claims take SQLite's write lock (BEGIN IMMEDIATE), so a job is
+    never leased to two workers at once.
+
+    Jobs may name the `client` that submitted them. Workers report the engine
+    time each attempt used, and the API collects it with `take_engine_time`
+    to charge it to the client's quota.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.getenv("REVIEW_QUEUE_PATH") or os.path.join(tempfile.gettempdir(), "nochess-review-queue.sqlite3")
+        self.path = path
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # Not WAL: its index lives in shared memory, which fails on network filesystems
+            conn.execute("PRAGMA journal_mode=DELETE")
+            if not self._schema_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, status TEXT NOT NULL,"
+                    " attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,"
+                    " worker TEXT, lease_until REAL, available_at REAL NOT NULL,"
+                    " result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL,"
+                    " client TEXT, engine_ms REAL NOT NULL DEFAULT 0, charged_ms REAL NOT NULL DEFAULT 0)"
+                )
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for column, decl in (("client", "TEXT"), ("engine_ms", "REAL NOT NULL DEFAULT 0"),
+                                     ("charged_ms", "REAL NOT NULL DEFAULT 0")):
+                    if column not in columns:  # queue files created before per-client accounting
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_client ON jobs (client, status)")
+                self._schema_ready = True
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def submit(self, payload: Dict, max_attempts: int = DEFAULT_MAX_ATTEMPTS, client: Optional[str] = None) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (payload, status, max_attempts, available_at, created, updated, client)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (json.dumps(payload, separators=(",", ":")), QUEUED, max(1, max_attempts), now, now, now, client),
+            )
+            return cur.lastrowid
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        """Lease the oldest runnable job to `worker`: queued and due, or running with an expired lease."""
+        now = time.time()
+        with self._transaction() as conn:
+            # Expired leases that used up their attempts are failed rather than handed out again
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = COALESCE(error, 'Lease expired'), worker = NULL, updated = ?"
+                " WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (FAILED, now, RUNNING, now),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)"
+                " ORDER BY available_at, id LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ?"
+                " WHERE id = ?",
+                (RUNNING, worker, now + lease_seconds, now, row[0]),
+            )
+        return self.get(row[0])
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend the lease; False if the job is no longer leased to `worker` (it expired and was re-claimed)."""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND status = ? AND worker = ?",
+                (now + lease_seconds, now, job_id, RUNNING, worker),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: Dict, engine_ms: float = 0.0) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated = ?,"
+                " engine_ms = engine_ms + ? WHERE id = ? AND status = ? AND worker = ?",
+                (DONE, json.dumps(result, separators=(",", ":")), now, engine_ms, job_id, RUNNING, worker),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str, engine_ms: float = 0.0) -> bool:
+        """Record a failed attempt: re-queued with exponential backoff, or failed for good after max_attempts."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET engine_ms = engine_ms + ? WHERE id = ? AND status = ? AND worker = ?",
+                         (engine_ms, job_id, RUNNING, worker))
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND worker = ?",
+                (job_id, RUNNING, worker),
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if attempts >= max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, updated = ? WHERE id = ?",
+                    (FAILED, error, now, job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL, available_at = ?,"
+                    " updated = ? WHERE id = ?",
+                    (QUEUED, error, now + RETRY_DELAY * 2 ** (attempts - 1), now, job_id),
+                )
+        return True
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, payload, status, attempts, max_attempts, worker, error, result, created, updated"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "payload", "status", "attempts", "max_attempts", "worker", "error", "result", "created", "updated")
+        job = dict(zip(keys, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def purge(self, older_than: float = JOB_TTL) -> int:
+        """Delete finished (done or failed) jobs last updated more than `older_than` seconds ago."""
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                               (DONE, FAILED, time.time() - older_than))
+            return cur.rowcount
+
+    def active(self, client: str) -> int:
+        """Jobs of `client` that are queued or running."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE client = ? AND status IN (?, ?)",
+                                (client, QUEUED, RUNNING)).fetchone()[0]
+
+    def take_engine_time(self) -> Dict[str, float]:
+        """Engine milliseconds per client reported by workers since the last call, marked as charged."""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT client, SUM(engine_ms - charged_ms) FROM jobs"
+                " WHERE client IS NOT NULL AND engine_ms > charged_ms GROUP BY client"
+            ).fetchall()
+            conn.execute("UPDATE jobs SET charged_ms = engine_ms WHERE client IS NOT NULL AND engine_ms > charged_ms")
+        return dict(rows)
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
@@ -0,0 +1,196 @@
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+OPERATIONS = ("start_game", "make_move", "analyze", "ws")
+MODES = ("beginner", "intermediate", "advanced")
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(len(sorted_values) * q / 100))
+    return sorted_values[rank - 1]
+
+
+class LoadStats:
+    """Thread-safe latency and error recorder, one bucket per operation."""
+
+    def __init__(self, operations: Tuple[str, ...] = OPERATIONS):
+        self.operations = operations
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {op: [] for op in operations}
+        self._errors: Dict[str, int] = {op: 0 for op in operations}
+        self.error_samples: List[str] = []
+
+    def record(self, op: str, seconds: float, ok: bool, error: Optional[str] = None):
+        with self._lock:
+            self._latencies[op].append(seconds)
+            if not ok:
+                self._errors[op] += 1
+                if error and len(self.error_samples) < 10:
+                    self.error_samples.append(f"{op}: {error}")
+
+    def report(self, elapsed: float, players: int) -> Dict:
+        with self._lock:
+            ops = {}
+            total = errors = 0
+            for op in self.operations:
+                values = sorted(self._latencies[op])
+                if not values:
+                    continue
+                total += len(values)
+                errors += self._errors[op]
+                ops[op] = {
+                    "count": len(values),
+                    "errors": self._errors[op],
+                    "error_rate": round(self._errors[op] / len(values), 4),
+                    **{f"p{q}_ms": round(percentile(values, q) * 1000, 2) for q in (50, 95, 99)},
+                    "max_ms": round(values[-1] * 1000, 2),
+                }
+            return {
+                "players": players,
+                "seconds": round(elapsed, 3),
+                "requests": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "throughput_rps": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+                "ops": ops,
+                "error_samples": list(self.error_samples),
+            }
+
+
+class InProcessTarget:
+    """Drive an ASGI app in this process through Starlette's TestClient (lifespan included)."""
+
+    def __init__(self, app):
+        from fastapi.testclient import TestClient
+        self.client = TestClient(app)
+
+    def __enter__(self):
+        self.client.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.client.__exit__(exc_type, exc, tb)
+
+    def request(self, method: str, path: str, json: Optional[Dict] = None) -> Tuple[int, Dict]:
+        resp = self.client.request(method, path, json=json)
+        return resp.status_code, _json_or_text(resp)
+
+    def send(self, method: str, path: str, query: str, body: bytes, content_type: str) -> Tuple[int, Dict]:
+        """A raw request, as recorded in a trace (see backend.replay)."""
+        resp = self.client.request(method, f"{path}?{query}" if query else path, content=body or None,
+                                   headers={"Content-Type": content_type} if content_type else None)
+        return resp.status_code, _json_or_text(resp)
+
+    def first_frame(self, path: str, timeout: float) -> None:
+        with self.client.websocket_connect(path) as ws:
+            ws.receive()
+
+
+class HttpTarget:
+    """Drive a running server (e.g. a local uvicorn) over HTTP and WebSocket."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        import httpx
+        self.base_url = base_url.rstrip("/")
+        self.client = httpx.Client(base_url=self.base_url, timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.client.close()
+
+    def request(self, method: str, path: str, json: Optional[Dict] = None) -> Tuple[int, Dict]:
+        resp = self.client.request(method, path, json=json)
+        return resp.status_code, _json_or_text(resp)
+
+    def send(self, method: str, path: str, query: str, body: bytes, content_type: str) -> Tuple[int, Dict]:
+        """A raw request, as recorded in a trace (see backend.replay)."""
+        resp = self.client.request(method, f"{path}?{query}" if query else path, content=body or None,
+                                   headers={"Content-Type": content_type} if content_type else None)
+        return resp.status_code, _json_or_text(resp)
+
+    def first_frame(self, path: str, timeout: float) -> None:
+        from websockets.sync.client import connect  # installed with uvicorn[standard]
+        url = "ws" + self.base_url[len("http"):] + path
+        with connect(url, open_timeout=timeout) as ws:
+            ws.recv(timeout=timeout)
+
+
+def _json_or_text(resp):
+    try:
+        return resp.json()
+    except ValueError:
+        return {"detail": resp.text}
+
+
+def _timed(stats: LoadStats, op: str, call: Callable, *args) -> Tuple[bool, Optional[Dict]]:
+    started = time.perf_counter()
+    try:
+        result = call(*args)
+    except Exception as e:
+        stats.record(op, time.perf_counter() - started, False, f"{type(e).__name__}: {e}")
+        return False, None
+    elapsed = time.perf_counter() - started
+    if isinstance(result, tuple):
+        status, body = result
+        if status >= 400:
+            stats.record(op, elapsed, False, f"HTTP {status} {body.get('detail', '')}")
+            return False, body
+        stats.record(op, elapsed, True)
+        return True, body
+    stats.record(op, elapsed, True)
+    return True, None
+
+
+def play_game(target, stats: LoadStats, rng: random.Random, moves: int, use_ws: bool = True,
+              ws_timeout: float = 30.0):
+    """One simulated player: start a game, optionally watch it once over /ws, then move and analyze."""
+    ok, state = _timed(stats, "start_game", target.request, "POST", "/start_game", {"mode": rng.choice(MODES)})
+    if not ok:
+        return
+    session_id = state["session_id"]
+    if use_ws:
+        _timed(stats, "ws", target.first_frame, f"/ws/{session_id}", ws_timeout)
+    for _ in range(moves):
+        if state.get("game_over") or not state.get("legal_moves"):
+            break
+        ok, new_state = _timed(stats, "make_move", target.request, "POST", f"/make_move/{session_id}",
+                               {"move": rng.choice(state["legal_moves"])})
+        if not ok:
+            break
+        state = new_state
+        _timed(stats, "analyze", target.request, "GET", f"/analyze/{session_id}")
+
+
+def run_load(target, players: int = 10, moves: int = 10, use_ws: bool = True, seed: Optional[int] = None,
+             ws_timeout: float = 30.0) -> Dict:
+    """Run `players` concurrent simulated games against `target`; returns LoadStats.report()."""
+    stats = LoadStats()
+    seeds = random.Random(seed)
+    rngs = [random.Random(seeds.getrandbits(64)) for _ in range(players)]
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, players)) as executor:
+        for future in [executor.submit(play_game, target, stats, rng, moves, use_ws, ws_timeout) for rng in rngs]:
+            future.result()
+    return stats.report(time.monotonic() - started, players)
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"{report['players']} players, {report['requests']} requests in {report['seconds']:.2f}s: "
+        f"{report['throughput_rps']:.1f} req/s, error rate {report['error_rate']:.2%}",
+        f"{'operation':<16}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for op, row in report["ops"].items():
+        lines.append(f"{op:<16}{row['count']:>8}{row['errors']:>8}{row['p50_ms']:>10.1f}"
+                     f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    lines.extend(f"  {sample}" for sample in report["error_samples"])
+    return "\n".join(lines)
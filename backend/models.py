@@ -36,6 +36,68 @@ class GameStateResponse(BaseModel):
     is_draw: bool = False
     draw_reason: Optional[str] = None
     last_move: Optional[str] = None
+    version: Optional[int] = None     # monotonic state version (also sent as ETag)
+
+class GameStateDelta(BaseModel):
+    session_id: str
+    version: int
+    since: int
+    moves: List[str] = []              # UCI moves played after `since`
+    fen: str
+    turn: Literal["white", "black"]
+    legal_moves: Optional[List[str]] = None        # only when moves were played
+    analysis: Optional[AnalysisResponse] = None    # only when the eval changed
+    game_over: bool
+    result: Optional[str] = None
+    status: Optional[str] = None
+    in_check: bool = False
+    in_checkmate: bool = False
+    in_stalemate: bool = False
+    is_draw: bool = False
+    draw_reason: Optional[str] = None
+    last_move: Optional[str] = None
+
+class BatchEvaluateRequest(BaseModel):
+    fens: List[str]
+    depth: int = 12
+    ordered: bool = True   # False: stream results as they complete
+
+class BatchEvaluateResult(BaseModel):
+    index: int
+    fen: str
+    analysis: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+class ExplorerMove(BaseModel):
+    uci: str
+    san: str
+    white: int
+    draws: int
+    black: int
+    games: int
+    avg_eval: Optional[int] = None   # centipawns from White's view, when the indexed PGNs had [%eval]
+
+class ExplorerResponse(BaseModel):
+    fen: str
+    white: int
+    draws: int
+    black: int
+    games: int
+    moves: List[ExplorerMove]
+
+class PositionMatch(BaseModel):
+    game_id: int          # fetch the PGN with GET /positions/games/{game_id}
+    ply: int              # the position arose after this many half-moves
+    event: str
+    date: str
+    white: str
+    black: str
+    result: str
+
+class PositionSearchResponse(BaseModel):
+    fen: str
+    total: int            # all indexed games that reached the position
+    games: List[PositionMatch]
 
 class ReviewMove(BaseModel):
     move_number: int
@@ -47,9 +109,29 @@ class ReviewMove(BaseModel):
     pv: str
     comment: str
 
+class PlayerGameStats(BaseModel):
+    moves: int
+    acpl: Optional[float] = None        # average centipawn loss, mate scores clamped to ±1000
+    accuracy: Optional[float] = None    # mean per-move accuracy %, lichess win% formula
+    blunders: int
+    mistakes: int
+    inaccuracies: int
+
+class GameReviewStats(BaseModel):
+    white: PlayerGameStats
+    black: PlayerGameStats
+
 class PgnReviewResponse(BaseModel):
     review_data: List[ReviewMove]
+    stats: Optional[GameReviewStats] = None
     event: str
     white: str
     black: str
-    result: str
\ No newline at end of file
+    result: str
+
+class ReviewJobResponse(BaseModel):
+    job_id: int
+    status: Literal["queued", "running", "done", "failed"]
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[PgnReviewResponse] = None
@@ -0,0 +1,67 @@
+from typing import Iterator, List, Optional, Set, Tuple
+import chess
+from .analysis_cache import position_key
+
+# Main lines of the most played openings, used to pre-populate the analysis
+# cache at startup so early-game evals are served without a search.
+COMMON_OPENINGS: List[Tuple[str, List[str]]] = [
+    ("Ruy Lopez", ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6", "b5a4", "g8f6"]),
+    ("Italian Game", ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "f8c5", "c2c3", "g8f6"]),
+    ("Scotch Game", ["e2e4", "e7e5", "g1f3", "b8c6", "d2d4", "e5d4", "f3d4"]),
+    ("Petrov Defence", ["e2e4", "e7e5", "g1f3", "g8f6", "f3e5", "d7d6"]),
+    ("Sicilian Najdorf", ["e2e4", "c7c5", "g1f3", "d7d6", "d2d4", "c5d4", "f3d4", "g8f6", "b1c3", "a7a6"]),
+    ("Sicilian Alapin", ["e2e4", "c7c5", "c2c3", "d7d5", "e4d5", "d8d5"]),
+    ("French Defence", ["e2e4", "e7e6", "d2d4", "d7d5", "b1c3", "g8f6"]),
+    ("Caro-Kann Defence", ["e2e4", "c7c6", "d2d4", "d7d5", "b1c3", "d5e4", "c3e4"]),
+    ("Scandinavian Defence", ["e2e4", "d7d5", "e4d5", "d8d5", "b1c3", "d5a5"]),
+    ("Pirc Defence", ["e2e4", "d7d6", "d2d4", "g8f6", "b1c3", "g7g6"]),
+    ("Queen's Gambit Declined", ["d2d4", "d7d5", "c2c4", "e7e6", "b1c3", "g8f6", "c1g5", "f8e7"]),
+    ("Slav Defence", ["d2d4", "d7d5", "c2c4", "c7c6", "g1f3", "g8f6", "b1c3"]),
+    ("Queen's Gambit Accepted", ["d2d4", "d7d5", "c2c4", "d5c4", "g1f3", "g8f6"]),
+    ("London System", ["d2d4", "d7d5", "c1f4", "g8f6", "e2e3", "c7c5"]),
+    ("King's Indian Defence", ["d2d4", "g8f6", "c2c4", "g7g6", "b1c3", "f8g7", "e2e4", "d7d6"]),
+    ("Nimzo-Indian Defence", ["d2d4", "g8f6", "c2c4", "e7e6", "b1c3", "f8b4"]),
+    ("English Opening", ["c2c4", "e7e5", "b1c3", "g8f6", "g1f3", "b8c6"]),
+    ("Reti Opening", ["g1f3", "d7d5", "c2c4", "e7e6", "g2g3", "g8f6"]),
+]
+
+
+def opening_positions(max_plies: int) -> Iterator[chess.Board]:
+    """Yield each distinct position along COMMON_OPENINGS up to `max_plies`, start position first."""
+    seen = set()
+    for _, line in COMMON_OPENINGS:
+        board = chess.Board()
+        for ply in range(min(max_plies, len(line)) + 1):
+            if ply:
+                board.push_uci(line[ply - 1])
+            key = position_key(board)
+            if key not in seen:
+                seen.add(key)
+                yield board.copy(stack=False)
+
+
+_BOOK: Optional[Set[Tuple[int, str]]] = None
+
+
+def _book() -> Set[Tuple[int, str]]:
+    global _BOOK
+    if _BOOK is None:
+        book = set()
+        for _, line in COMMON_OPENINGS:
+            board = chess.Board()
+            for uci in line:
+                book.add((position_key(board), uci))
+                board.push_uci(uci)
+        _BOOK = book
+    return _BOOK
+
+
+def book_plies(moves: List[chess.Move]) -> int:
+    """Number of leading moves of a game that follow COMMON_OPENINGS (transpositions included)."""
+    book = _book()
+    board = chess.Board()
+    for ply, move in enumerate(moves):
+        if (position_key(board), move.uci()) not in book:
+            return ply
+        board.push(move)
+    return len(moves)
@@ -2,21 +2,113 @@ import chess
 import chess.pgn
 import os
 import sys
-from typing import List, Dict
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .openings import book_plies
 from .utils import format_score, format_pv
-from .ui.terminal_ui import TerminalUI
+
+# Adaptive review: positions are searched at ADAPTIVE_SHALLOW_DEPTH first, and
+# plies whose verdict could change at full depth are searched again.
+ADAPTIVE_SHALLOW_DEPTH = 8
+BOUNDARY_MARGIN = 0.25   # score_diff within 25% (min 10cp) of a 30/100/300 (or -100) comment boundary is ambiguous
+SWING_CP = 100           # eval swings this large are always verified at full depth
+
+# Positions the reviewer evaluates without a search of their own (PgnReviewer._position_kinds)
+BOOK, FORCED, MATE, TERMINAL = "book", "forced", "mate", "terminal"
+_KIND_COMMENTS = {
+    BOOK: "Book: Known opening theory.",
+    FORCED: "Forced: Only legal move.",
+    MATE: "Best: Delivers checkmate.",
+}
+
+def review_variant(adaptive: bool = False, time_budget: Optional[float] = None,
+                   shallow_depth: int = ADAPTIVE_SHALLOW_DEPTH, triage: bool = True) -> str:
+    """Review cache key suffix for a review mode ("" for the untriaged full-depth review)."""
+    variant = "/triage" if triage else ""
+    if not adaptive:
+        return variant
+    return f"{variant}/adaptive:{shallow_depth}:{time_budget if time_budget is not None else '-'}"
+
+def _terminal_analysis(board: chess.Board) -> Dict:
+    """Exact result of a finished game: mated (mate 0) or drawn."""
+    return {"score": 0, "is_mate": board.is_checkmate(), "best_move": None, "pv": [], "depth": 0}
+
+def _derived_analysis(kind: str, move: chess.Move, post: Dict) -> Dict:
+    """Pre-move analysis of a MATE or FORCED position, from the analysis after the move."""
+    if kind == MATE:
+        return {"score": 1, "is_mate": True, "best_move": move.uci(), "pv": [move.uci()], "depth": 0}
+    score = post["score"]
+    if post["is_mate"]:
+        score = -score if score > 0 else 1 - score  # mated in n after the move / mates in n+1
+    else:
+        score = -score
+    return {"score": score, "is_mate": post["is_mate"], "best_move": move.uci(),
+            "pv": [move.uci(), *post.get("pv", [])], "depth": post.get("depth", 0)}
+
+def _book_analysis(anchor: Dict, plies: int, move: Optional[chess.Move] = None) -> Dict:
+    """Eval of a book position `plies` before the first position out of book."""
+    if not plies:
+        return anchor
+    score = -anchor["score"] if plies % 2 else anchor["score"]
+    return {"score": score, "is_mate": anchor["is_mate"], "best_move": move.uci() if move else None,
+            "pv": [], "depth": anchor.get("depth", 0)}
+
+def collect_pgn_files(paths: Iterable[str]) -> List[str]:
+    """Expand files and directories (recursively, *.pgn) into a sorted file list."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(".pgn"))
+        else:
+            files.append(path)
+    return files
+
+def iter_games(pgn_filepath: str) -> Iterator[Tuple[chess.pgn.Game, List[chess.Move]]]:
+    """Stream (game, mainline moves) for every game in the file that has moves."""
+    with open(pgn_filepath, errors="replace") as f:
+        while True:
+            game_node = chess.pgn.read_game(f)
+            if game_node is None:
+                return
+            moves = list(game_node.mainline_moves())
+            if moves:
+                yield game_node, moves
+
+def read_first_valid_game(pgn_filepath: str):
+    """Return (game, mainline moves) for the first game in the file that has moves."""
+    try:
+        return next(iter_games(pgn_filepath), (None, []))
+    except Exception:
+        return None, []
 
 class PgnReviewer:
-    def __init__(self, engine, quick_mode: bool = False, review_depth: int = 20):
+    def __init__(self, engine, quick_mode: bool = False, review_depth: int = 20, headless: Optional[bool] = None,
+                 shallow_depth: int = ADAPTIVE_SHALLOW_DEPTH, triage: bool = True):
         self.engine = engine
         self.board = chess.Board()  # The board specifically for review purposes
-        self.ui = TerminalUI()      # Reuse shared UI for display
+        self._ui = None             # Terminal UI, created on first display
+        self.last_analysis: Optional[Dict] = None
         self.quick_mode = quick_mode
         self.review_depth = 10 if quick_mode else review_depth
+        self.shallow_depth = shallow_depth
+        self.triage = triage  # classify book/forced/mating/terminal positions instead of searching them
+        self.deep_plies = 0  # plies re-searched at full depth by the last adaptive review
 
         # Headless/server mode detection: no terminal → suppress clear/terminal UI
-        term = os.getenv("TERM", "")
-        self.headless = (not term or term == "dumb" or not sys.stdout.isatty())
+        if headless is None:
+            term = os.getenv("TERM", "")
+            headless = (not term or term == "dumb" or not sys.stdout.isatty())
+        self.headless = headless
+
+    @property
+    def ui(self):
+        # Imported lazily: API and headless reviews never draw to a terminal
+        if self._ui is None:
+            from .ui.terminal_ui import TerminalUI
+            self._ui = TerminalUI()
+        return self._ui
 
     def display_board_for_review(self, analysis: Dict):
         """
@@ -59,19 +151,245 @@ class PgnReviewer:
         return "Great: Solid move."
     
     def _read_first_valid_game(self, pgn_filepath: str):
-        try:
-            with open(pgn_filepath) as f:
-                while True:
-                    game_node = chess.pgn.read_game(f)
-                    if game_node is None:
-                        return None, []
-                    moves = list(game_node.mainline_moves())
-                    if moves:
-                        return game_node, moves
-        except Exception:
-            return None, []
+        return read_first_valid_game(pgn_filepath)
+
+    def review_moves(self, moves: List[chess.Move], pause: bool = False) -> List[Dict]:
+        """Review a mainline from the initial position; returns one entry per move."""
+        return list(self.iter_review_moves(moves, pause=pause))
+
+    def iter_review_moves(self, moves: List[chess.Move], pause: bool = False) -> Iterator[Dict]:
+        """Review a mainline from the initial position, yielding each move's entry as soon as it is known.
+
+        With `triage`, book moves, forced moves and mates are classified
+        without their own searches (see `_position_kinds`). Book entries are
+        yielded together once the first position out of book is searched.
+        """
+        kinds = self._position_kinds(moves)
+        book = kinds.count(BOOK)
+        uci = [m.uci() for m in moves]
+        ahead: Dict[int, Dict] = {}  # post-move analyses, some computed a ply early to derive a classified one
+
+        def position(i: int) -> Dict:
+            # A MATE or FORCED position is derived, once, from the first searched position after it,
+            # so the same eval serves as one ply's post-move and the next one's pre-move analysis
+            if i not in ahead:
+                if kinds[i] == MATE:
+                    ahead[i] = _derived_analysis(MATE, moves[i], {})
+                elif kinds[i] == FORCED:
+                    ahead[i] = _derived_analysis(FORCED, moves[i], position(i + 1))
+                else:
+                    ahead[i] = self._position_analysis(uci[:i], kinds[i], self.review_depth)
+            return ahead[i]
+
+        self.board = chess.Board()
+        self.last_analysis = None
+        for move in moves[:book]:
+            self.board.push(move)
+        for move_counter, move in enumerate(moves[book:], start=book + 1):
+            ply = move_counter - 1
+            # Avoid any terminal clearing in server/headless mode
+            pre_move_analysis = position(ply) if kinds[ply] else self._analyze(uci[:ply], self.review_depth)
+
+            current_player_name = "White" if self.board.turn == chess.WHITE else "Black"
+            self.board.push(move)
+
+            post_move_analysis = position(ply + 1)
+            ahead.pop(ply, None)
+            self.last_analysis = post_move_analysis
+
+            # Render only if not headless
+            self.display_board_for_review(post_move_analysis)
+
+            if ply == book and book:
+                yield from self._book_entries(moves[:book], pre_move_analysis)
+            yield self._review_entry(move_counter, move, current_player_name, pre_move_analysis,
+                                     post_move_analysis, kinds[ply])
+
+            if pause and not self.headless:
+                try:
+                    input("Press Enter to continue...")
+                except Exception:
+                    pass
+        if book and book == len(moves):  # the whole game is book
+            self.last_analysis = self._position_analysis(self.get_board_move_history_uci(), kinds[book], self.review_depth)
+            yield from self._book_entries(moves, self.last_analysis)
+
+    def _analyze(self, uci_moves: List[str], depth: int) -> Dict:
+        self.engine.set_position(uci_moves)
+        self.engine.set_depth(depth)
+        return self.engine.analyze_position()
+
+    def _position_analysis(self, uci_moves: List[str], kind: Optional[str], depth: int) -> Dict:
+        if kind == TERMINAL:
+            board = chess.Board()
+            for uci in uci_moves:
+                board.push_uci(uci)
+            return _terminal_analysis(board)
+        return self._analyze(uci_moves, depth)
+
+    def _position_kinds(self, moves: List[chess.Move]) -> List[Optional[str]]:
+        """How each position (0..len(moves)) can be evaluated without its own search.
+
+        BOOK: before the end of the opening book; every book position takes
+        its eval from the first position out of book. MATE: the played move
+        mates, so the eval is mate in 1. FORCED: the only legal move was
+        played, so the eval is that of the next position. TERMINAL: the game
+        is over (final position only). None: needs an engine search.
+        """
+        kinds: List[Optional[str]] = [None] * (len(moves) + 1)
+        if not self.triage:
+            return kinds
+        book = book_plies(moves)
+        board = chess.Board()
+        for ply, move in enumerate(moves):
+            if ply < book:
+                kinds[ply] = BOOK
+            elif board.legal_moves.count() == 1:
+                kinds[ply] = FORCED
+            board.push(move)
+            if ply >= book and board.is_checkmate():
+                kinds[ply] = MATE
+        if board.is_game_over():
+            kinds[-1] = TERMINAL
+        return kinds
+
+    def _book_entries(self, moves: List[chess.Move], anchor: Dict) -> List[Dict]:
+        """Entries for the book moves, with evals carried back from the first position out of book."""
+        entries = []
+        board = chess.Board()
+        for ply, move in enumerate(moves):
+            player = "White" if board.turn == chess.WHITE else "Black"
+            board.push(move)
+            pre = _book_analysis(anchor, len(moves) - ply, move)
+            post = _book_analysis(anchor, len(moves) - ply - 1)
+            entries.append(self._review_entry(ply + 1, move, player, pre, post, BOOK))
+        return entries
+
+    def review_moves_adaptive(self, moves: List[chess.Move], time_budget: Optional[float] = None) -> List[Dict]:
+        """Two-pass review: every position at shallow depth, then critical plies at full depth.
+
+        Each position is searched once in the first pass (a ply's post-move
+        position is the next ply's pre-move position). Plies with a large
+        swing, a mate score, or a score difference close to a comment
+        boundary are then re-searched at `review_depth`, biggest swings first,
+        while the engine time spent on the game stays within `time_budget`
+        seconds (unlimited when None). Positions that `_position_kinds`
+        classifies are never searched.
+        """
+        started = time.monotonic()
+        uci = [m.uci() for m in moves]
+        kinds = self._position_kinds(moves)
+        shallow_depth = min(self.shallow_depth, self.review_depth)
+        shallow = [self._position_analysis(uci[:i], kinds[i], shallow_depth) if kinds[i] in (None, TERMINAL) else None
+                   for i in range(len(moves) + 1)]
+        self._fill_derived(moves, shallow, kinds)
+
+        deep: Dict[int, Dict] = {}
+        deep_time = 0.0
+        self.deep_plies = 0
+        for ply in self._critical_plies(moves, shallow, kinds):
+            needed = [pos for pos in (ply, ply + 1) if kinds[pos] is None and pos not in deep]
+            if not needed:
+                continue
+            if time_budget is not None:
+                # Don't start a search that is expected to overrun the budget
+                per_search = deep_time / len(deep) if deep else 0.0
+                if time.monotonic() - started + per_search * len(needed) > time_budget:
+                    break
+            search_started = time.monotonic()
+            for pos in needed:
+                deep[pos] = self._analyze(uci[:pos], self.review_depth)
+            deep_time += time.monotonic() - search_started
+            self.deep_plies += 1
+
+        analyses = [deep.get(i, shallow[i]) for i in range(len(moves) + 1)]
+        self._fill_derived(moves, analyses, kinds)
+        return self._entries(moves, analyses, kinds)
+
+    def review_history(self, moves: List[chess.Move], analyses: List[Optional[Dict]]) -> List[Dict]:
+        """Review a game whose positions were already analysed, e.g. during live play.
+
+        `analyses[i]` is the stored analysis of the position after i moves,
+        or None. Only positions with no stored analysis that `_position_kinds`
+        can't classify are searched, at `review_depth`; `searched` counts them.
+        """
+        uci = [m.uci() for m in moves]
+        kinds = self._position_kinds(moves)
+        known = list(analyses[:len(moves) + 1]) + [None] * (len(moves) + 1 - len(analyses))
+        self.searched = 0
+        for i, analysis in enumerate(known):
+            if analysis is None and kinds[i] in (None, TERMINAL):
+                known[i] = self._position_analysis(uci[:i], kinds[i], self.review_depth)
+                self.searched += kinds[i] is None
+        self._fill_derived(moves, known, kinds, keep_known=True)
+        return self._entries(moves, known, kinds)
+
+    def _entries(self, moves: List[chess.Move], analyses: List[Dict], kinds: List[Optional[str]]) -> List[Dict]:
+        review_data = []
+        self.board = chess.Board()
+        for i, move in enumerate(moves):
+            player = "White" if self.board.turn == chess.WHITE else "Black"
+            self.board.push(move)
+            review_data.append(self._review_entry(i + 1, move, player, analyses[i], analyses[i + 1], kinds[i]))
+        self.last_analysis = analyses[-1]
+        return review_data
+
+    def _fill_derived(self, moves: List[chess.Move], analyses: List[Optional[Dict]], kinds: List[Optional[str]],
+                      keep_known: bool = False):
+        """Fill in the analyses of classified positions from the searched ones, last position first."""
+        book = kinds.count(BOOK)
+        for i in range(len(moves) - 1, -1, -1):
+            if keep_known and analyses[i] is not None:
+                continue
+            if kinds[i] in (MATE, FORCED):
+                analyses[i] = _derived_analysis(kinds[i], moves[i], analyses[i + 1])
+            elif kinds[i] == BOOK:
+                analyses[i] = _book_analysis(analyses[book], book - i, moves[i])
+
+    def _critical_plies(self, moves: List[chess.Move], analyses: List[Dict],
+                        kinds: Optional[List[Optional[str]]] = None) -> List[int]:
+        """Plies whose shallow verdict is uncertain, most important first."""
+        critical = []
+        for i, move in enumerate(moves):
+            if kinds and kinds[i] in (BOOK, MATE):
+                continue
+            pre, post = analyses[i], analyses[i + 1]
+            if pre.get("is_mate") or post.get("is_mate"):
+                critical.append((float("inf"), i))
+                continue
+            swing = abs(pre["score"] + post["score"])  # mover's eval before vs after (-post)
+            # Same score_diff _generate_comment classifies
+            score_diff = abs(pre["score"]) - abs(post["score"])
+            ambiguous = any(abs(score_diff - boundary) < max(10, abs(boundary) * BOUNDARY_MARGIN)
+                            for boundary in (30, 100, 300, -100))
+            if swing >= SWING_CP or (ambiguous and move.uci() != pre.get("best_move")):
+                critical.append((swing, i))
+        critical.sort(reverse=True)
+        return [i for _, i in critical]
+
+    def _review_entry(self, move_number: int, move: chess.Move, player: str, pre: Dict, post: Dict,
+                      kind: Optional[str] = None) -> Dict:
+        return {
+            "move_number": move_number,
+            "move": move.uci(),
+            "player": player,
+            "pre_eval": {
+                "score": pre['score'],
+                "is_mate": pre['is_mate'],
+                "formatted": format_score(pre['score'], pre['is_mate'])
+            },
+            "post_eval": {
+                "score": post['score'],
+                "is_mate": post['is_mate'],
+                "formatted": format_score(post['score'], post['is_mate'])
+            },
+            "best_move": pre['best_move'],
+            "pv": format_pv(pre['pv'][:4]),
+            "comment": _KIND_COMMENTS.get(kind) or self._generate_comment(pre, post, move.uci())
+        }
 
-    def perform_review(self, pgn_filepath: str, quick_mode: bool = False, pause: bool = False) -> List[Dict]:
+    def perform_review(self, pgn_filepath: str, quick_mode: bool = False, pause: bool = False,
+                       adaptive: bool = False, time_budget: Optional[float] = None) -> List[Dict]:
         self.review_depth = 10 if quick_mode else 20
         review_data = []
         try:
@@ -80,55 +398,14 @@ class PgnReviewer:
                 print(f"No valid chess game with moves found in {pgn_filepath}.")
                 return review_data
 
-            self.board = chess.Board()
-            move_counter = 1
-            for move in moves:
-                # Avoid any terminal clearing in server/headless mode
-                self.engine.set_position(self.get_board_move_history_uci())
-                self.engine.set_depth(self.review_depth)
-                pre_move_analysis = self.engine.analyze_position()
-
-                current_player_name = "White" if self.board.turn == chess.WHITE else "Black"
-                self.board.push(move)
-
-                self.engine.set_position(self.get_board_move_history_uci())
-                self.engine.set_depth(self.review_depth)
-                post_move_analysis = self.engine.analyze_position()
-
-                # Render only if not headless
-                self.display_board_for_review(post_move_analysis)
-
-                comment = self._generate_comment(pre_move_analysis, post_move_analysis, move.uci())
-
-                review_data.append({
-                    "move_number": move_counter,
-                    "move": move.uci(),
-                    "player": current_player_name,
-                    "pre_eval": {
-                        "score": pre_move_analysis['score'],
-                        "is_mate": pre_move_analysis['is_mate'],
-                        "formatted": format_score(pre_move_analysis['score'], pre_move_analysis['is_mate'])
-                    },
-                    "post_eval": {
-                        "score": post_move_analysis['score'],
-                        "is_mate": post_move_analysis['is_mate'],
-                        "formatted": format_score(post_move_analysis['score'], post_move_analysis['is_mate'])
-                    },
-                    "best_move": pre_move_analysis['best_move'],
-                    "pv": format_pv(pre_move_analysis['pv'][:4]),
-                    "comment": comment
-                })
-
-                if pause and not self.headless:
-                    try:
-                        input("Press Enter to continue...")
-                    except Exception:
-                        pass
-                move_counter += 1
+            if adaptive:
+                review_data = self.review_moves_adaptive(moves, time_budget=time_budget)
+            else:
+                review_data = self.review_moves(moves, pause=pause)
 
             print("\n--- End of Game Review ---")
             default_analysis = {"score": 0, "is_mate": False, "best_move": None, "pv": [], "depth": 0}
-            final_analysis = post_move_analysis if 'post_move_analysis' in locals() else default_analysis
+            final_analysis = self.last_analysis or default_analysis
 
             # Final render only if not headless
             self.display_board_for_review(final_analysis)
@@ -147,6 +424,6 @@ class PgnReviewer:
         if self.headless:
             return
         try:
-            os.system('clear')
+            self.ui.clear_screen()
         except Exception:
             pass
\ No newline at end of file
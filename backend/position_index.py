@@ -0,0 +1,283 @@
+import bisect
+import heapq
+import io
+import itertools
+import os
+import struct
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import chess
+import chess.pgn
+try:
+    import fcntl
+except ImportError:  # no inter-process locking on Windows: one writer process only
+    fcntl = None
+from .analysis_cache import position_key
+from .record_file import RecordFile, write_records
+
+POSITION_MAGIC = b"NCPOSI01"
+POSITION_RECORD = struct.Struct("<QQH")  # zobrist key, game id (byte offset in the archive), ply
+FLUSH_RECORDS = 50_000  # pending records kept in memory before a segment is written
+MAX_SEGMENTS = 8        # more than this and the smallest segments are merged
+MERGE_FANIN = 4
+
+_SUMMARY_HEADERS = ("Event", "Date", "White", "Black", "Result")
+
+
+class PositionIndex:
+    """Find archived games that reached a position, by Zobrist hash.
+
+    Layout of `directory`:
+      games.pgn       every ingested game, appended; a game's id is its byte offset
+      games.offsets   u64 offsets of all games, in ingest order
+      seg-NNNNNN.idx  immutable sorted segments of (key, game id, ply) records
+      indexed         number of games covered by the segments
+      lock            flock()ed by every process using the directory
+
+    New games are indexed in memory and flushed as a segment every
+    `flush_records` records; once there are more than MAX_SEGMENTS, the
+    smallest ones are merged. Games appended after the last flush are
+    re-indexed from the archive on open, so nothing is lost on a crash.
+
+    Several processes (e.g. uvicorn workers) may share a directory. Writes
+    hold an exclusive lock and queries a shared one; each first catches up
+    with what other processes appended, flushed or merged since (`_sync`).
+    A flush writes every game past `indexed`, whichever process added it.
+    """
+
+    def __init__(self, directory: str, flush_records: int = FLUSH_RECORDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_records = flush_records
+        self.archive_path = os.path.join(directory, "games.pgn")
+        self._offsets_path = os.path.join(directory, "games.offsets")
+        self._indexed_path = os.path.join(directory, "indexed")
+        self._lock = threading.RLock()
+        self._lock_file = open(os.path.join(directory, "lock"), "a")
+        self._archive = open(self.archive_path, "ab")
+        self._offsets_file = open(self._offsets_path, "ab")
+        self._offsets = array("Q")
+        self._offsets_bytes = 0
+        self.segments: List[RecordFile] = []
+        self._indexed = -1  # games covered by self.segments as of the last _sync
+        self._pending: Dict[int, List[Tuple[int, int]]] = {}
+        self._pending_count = 0
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _segment_names(self) -> List[str]:
+        return sorted(n for n in os.listdir(self.directory) if n.startswith("seg-") and n.endswith(".idx"))
+
+    def _sync(self):
+        """Catch up with other processes. Caller holds self._lock and the file lock."""
+        size = os.path.getsize(self._offsets_path) // 8 * 8
+        new_games = len(self._offsets)
+        if size > self._offsets_bytes:
+            with open(self._offsets_path, "rb") as f:
+                f.seek(self._offsets_bytes)
+                self._offsets.frombytes(f.read(size - self._offsets_bytes))
+            self._offsets_bytes = size
+        names = self._segment_names()
+        current = {os.path.basename(s.path): s for s in self.segments}
+        if names != sorted(current):
+            for name, segment in current.items():
+                if name not in names:  # merged away by another process
+                    segment.close()
+            self.segments = [current.get(n) or RecordFile(os.path.join(self.directory, n), POSITION_RECORD,
+                                                          POSITION_MAGIC) for n in names]
+        indexed = self._indexed_count()
+        if indexed != self._indexed:  # another process flushed: pending restarts from the new mark
+            self._indexed = indexed
+            self._pending = {}
+            self._pending_count = 0
+            new_games = indexed
+        for game_id in self._offsets[new_games:]:
+            game = self.read_game(game_id)
+            if game is not None:
+                self._index_keys(_position_keys(game.board(), list(game.mainline_moves())), game_id)
+
+    # --- ingest ---------------------------------------------------------
+
+    def add_game(self, game: chess.pgn.Game) -> Optional[int]:
+        """Append a game to the archive and index its positions; returns its id.
+
+        A game whose mainline is already archived is not added again; the
+        existing id is returned. Games without moves are ignored.
+        """
+        moves = list(game.mainline_moves())
+        if not moves:
+            return None
+        keys = _position_keys(game.board(), moves)
+        with self._lock, self._file_lock():
+            self._sync()
+            existing = self._find_duplicate(keys[-1], moves)
+            if existing is not None:
+                return existing
+            # The exclusive lock makes the end of the archive this game's offset in every process
+            game_id = self._archive.seek(0, os.SEEK_END)
+            self._archive.write(f"{game}\n\n".encode("utf-8"))
+            self._archive.flush()
+            self._offsets_file.write(struct.pack("<Q", game_id))
+            self._offsets_file.flush()
+            self._offsets.append(game_id)
+            self._offsets_bytes += 8
+            self._index_keys(keys, game_id)
+            if self._pending_count >= self.flush_records:
+                self._flush()
+            return game_id
+
+    def _index_keys(self, keys: List[int], game_id: int):
+        seen = set()
+        for ply, key in enumerate(keys):
+            if key in seen:  # repetitions: the first visit is enough
+                continue
+            seen.add(key)
+            self._pending.setdefault(key, []).append((game_id, ply))
+            self._pending_count += 1
+
+    def _find_duplicate(self, final_key: int, moves: List[chess.Move]) -> Optional[int]:
+        mainline = [m.uci() for m in moves]
+        for game_id, ply in self._iter_hits(final_key):
+            if ply <= len(moves):
+                stored = self.read_game(game_id)
+                if stored is not None and [m.uci() for m in stored.mainline_moves()] == mainline:
+                    return game_id
+        return None
+
+    def flush(self):
+        """Write pending records as a new segment and merge segments if there are too many."""
+        with self._lock, self._file_lock():
+            self._sync()
+            self._flush()
+
+    def _flush(self):
+        # Caller holds the exclusive file lock and has just synced
+        if self._pending:
+            records = sorted((key, game_id, ply) for key, hits in self._pending.items() for game_id, ply in hits)
+            self.segments.append(self._write_segment(records))
+            self._pending = {}
+            self._pending_count = 0
+        self._indexed = len(self._offsets)
+        self._write_indexed(self._indexed)
+        while len(self.segments) > MAX_SEGMENTS:
+            self._merge(sorted(self.segments, key=len)[:MERGE_FANIN])
+
+    def _write_segment(self, records) -> RecordFile:
+        names = self._segment_names()  # under the exclusive lock, so no other process picks the same number
+        number = int(names[-1][4:-4]) + 1 if names else 1
+        path = os.path.join(self.directory, f"seg-{number:06d}.idx")
+        write_records(path, records, POSITION_RECORD, POSITION_MAGIC)
+        return RecordFile(path, POSITION_RECORD, POSITION_MAGIC)
+
+    def _merge(self, segments: List[RecordFile]):
+        merged = self._write_segment(heapq.merge(*segments))
+        for segment in segments:
+            self.segments.remove(segment)
+            segment.close()
+            os.remove(segment.path)
+        self.segments.append(merged)
+
+    def _indexed_count(self) -> int:
+        try:
+            with open(self._indexed_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_indexed(self, count: int):
+        tmp = f"{self._indexed_path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(count))
+        os.replace(tmp, self._indexed_path)
+
+    # --- queries --------------------------------------------------------
+
+    def _count_hits(self, key: int) -> int:
+        return sum(hi - lo for lo, hi in (s.key_range(key) for s in self.segments)) + len(self._pending.get(key, ()))
+
+    def _iter_hits(self, key: int) -> Iterator[Tuple[int, int]]:
+        """(game id, ply) hits for `key`, oldest game first, merged lazily across segments."""
+        # Segment records are sorted by (key, game id, ply), so each key range is already in game order
+        runs = [((game_id, ply) for _, game_id, ply in s.iter_range(*s.key_range(key))) for s in self.segments]
+        runs.append(iter(sorted(self._pending.get(key, ()))))
+        return heapq.merge(*runs)
+
+    def lookup(self, board: chess.Board) -> List[Tuple[int, int]]:
+        """(game id, ply) for every archived game that reached this position, oldest game first."""
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+            return list(self._iter_hits(position_key(board)))
+
+    def search(self, board: chess.Board, limit: int = 50, offset: int = 0) -> Dict:
+        """One page of matching games with their headers, each verified by replaying to the ply."""
+        key = position_key(board)
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+            total = self._count_hits(key)
+            page = list(itertools.islice(self._iter_hits(key), offset, offset + limit))
+        target = board.epd()
+        games = []
+        for game_id, ply in page:
+            game = self.read_game(game_id)
+            if game is None:
+                continue
+            replay = game.board()
+            for move in list(game.mainline_moves())[:ply]:
+                replay.push(move)
+            if replay.epd() != target:  # 64-bit hash collision
+                continue
+            games.append({"game_id": game_id, "ply": ply,
+                          **{name.lower(): game.headers.get(name, "?") for name in _SUMMARY_HEADERS}})
+        return {"fen": board.fen(), "total": total, "games": games}
+
+    def has_game(self, game_id: int) -> bool:
+        i = bisect.bisect_left(self._offsets, game_id)
+        return i < len(self._offsets) and self._offsets[i] == game_id
+
+    def read_game(self, game_id: int) -> Optional[chess.pgn.Game]:
+        if not self.has_game(game_id):
+            return None
+        with open(self.archive_path, "rb") as f:
+            f.seek(game_id)
+            return chess.pgn.read_game(io.TextIOWrapper(f, encoding="utf-8", errors="replace"))
+
+    def stats(self) -> Dict:
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+            return {
+                "games": len(self._offsets),
+                "segments": len(self.segments),
+                "records": sum(len(s) for s in self.segments) + self._pending_count,
+                "pending": self._pending_count,
+            }
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            for segment in self.segments:
+                segment.close()
+            self._archive.close()
+            self._offsets_file.close()
+            self._lock_file.close()
+
+
+def _position_keys(board: chess.Board, moves: List[chess.Move]) -> List[int]:
+    """Zobrist key of the starting position (ply 0) and of the position after each move."""
+    keys = [position_key(board)]
+    for move in moves:
+        board.push(move)
+        keys.append(position_key(board))
+    return keys
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+# Engine-time quotas, in milliseconds of measured search time per client.
+# A client may burst up to QUOTA_BURST_MS and earns QUOTA_MS_PER_SEC back every
+# second; QUOTA_MS_PER_SEC=0 disables quotas.
+QUOTA_MS_PER_SEC = float(os.getenv("QUOTA_MS_PER_SEC", "2000"))
+QUOTA_BURST_MS = float(os.getenv("QUOTA_BURST_MS", "60000"))
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class TokenBucket:
+    """Token bucket that is charged after the fact and may go into debt.
+
+    Engine time is only known once a search finishes, so searches are
+    admitted while the balance is positive and their cost is deducted
+    afterwards; a client in debt waits until the refill covers it.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self.tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def charge(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def retry_after(self) -> float:
+        """Seconds until the balance is positive again; 0 if it already is."""
+        self._refill()
+        if self.tokens > 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class EngineQuotas:
+    """Per-client engine-time accounting and admission decisions.
+
+    Searches are attributed to scheduler owners (a session id, or a review or
+    batch id); `register` maps an owner to the client that created it.
+    `charge` is wired to EngineScheduler.on_search and debits the client's
+    bucket with the measured search time.
+    """
+
+    def __init__(self, rate_ms: float = QUOTA_MS_PER_SEC, burst_ms: float = QUOTA_BURST_MS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate_ms = rate_ms
+        self.burst_ms = burst_ms
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._owners: Dict[object, str] = {}
+        self.engine_ms: Dict[object, float] = {}   # per owner (session/review/batch)
+        self.client_ms: "OrderedDict[str, float]" = OrderedDict()  # per client, least recently charged first
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_ms > 0
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate_ms, self.burst_ms, self._clock)
+            while len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def register(self, owner, client: str):
+        with self._lock:
+            self._owners[owner] = client
+
+    def forget(self, owner):
+        with self._lock:
+            self._owners.pop(owner, None)
+            self.engine_ms.pop(owner, None)
+
+    def charge(self, owner, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            client = self._owners.get(owner)
+            if client is None:  # warm-up and other server-initiated searches
+                return
+            self.engine_ms[owner] = self.engine_ms.get(owner, 0.0) + ms
+            self._charge_client(client, ms)
+
+    def charge_client(self, client: str, seconds: float):
+        """Debit engine time spent outside this process (e.g. by review workers) to `client`."""
+        with self._lock:
+            self._charge_client(client, seconds * 1000)
+
+    def _charge_client(self, client: str, ms: float):
+        self.client_ms[client] = self.client_ms.get(client, 0.0) + ms
+        self.client_ms.move_to_end(client)
+        while len(self.client_ms) > MAX_TRACKED_CLIENTS:  # the longest idle clients go first
+            self.client_ms.popitem(last=False)
+        if self.enabled:
+            self._bucket(client).charge(ms)
+
+    def check(self, client: str) -> Tuple[bool, float]:
+        """(admitted, retry_after seconds) for a new engine-consuming request from `client`."""
+        if not self.enabled:
+            return True, 0.0
+        with self._lock:
+            wait = self._bucket(client).retry_after()
+            if wait > 0:
+                self.rejected += 1
+                return False, wait
+            return True, 0.0
+
+    def usage(self, client: str) -> Dict:
+        """Engine time used by a client, in total and per owner, and its current wait."""
+        with self._lock:
+            owners = {str(o): round(self.engine_ms.get(o, 0.0), 1) for o, c in self._owners.items() if c == client}
+            bucket = self._buckets.get(client)
+            return {
+                "client": client,
+                "engine_ms": round(self.client_ms.get(client, 0.0), 1),
+                "owners": owners,
+                "retry_after": round(bucket.retry_after(), 3) if bucket and self.enabled else 0.0,
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ms_per_sec": self.rate_ms,
+                "burst_ms": self.burst_ms,
+                "clients": len(self._buckets),
+                "throttled": sum(1 for b in self._buckets.values() if b.retry_after() > 0),
+                "rejected": self.rejected,
+            }
+
+
+def client_id(headers, host: Optional[str], header: Optional[str] = None) -> str:
+    """Client identity for quotas: a trusted header (e.g. X-Forwarded-For behind a proxy) or the peer address."""
+    if header:
+        value = headers.get(header)
+        if value:
+            return value.split(",")[0].strip()
+    return host or "unknown"
@@ -0,0 +1,168 @@
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import tempfile
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# File header: magic, record size, record count
+_HEADER = struct.Struct("<8sIQ")
+_KEY = struct.Struct("<Q")
+
+
+def write_records(path: str, records: Iterable[Tuple], record: struct.Struct, magic: bytes) -> int:
+    """Write records (already sorted by their leading u64 key) to `path` atomically; returns the count."""
+    tmp = f"{path}.tmp"
+    count = 0
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(magic, record.size, 0))
+        pack = record.pack
+        for fields in records:
+            f.write(pack(*fields))
+            count += 1
+        f.seek(0)
+        f.write(_HEADER.pack(magic, record.size, count))
+    os.replace(tmp, path)
+    return count
+
+
+class RecordFile:
+    """Read-only, memory-mapped array of fixed-size records sorted by a leading u64 key.
+
+    Lookups binary-search the mapping directly, so opening is O(1) and a query
+    touches ~log2(n) pages regardless of file size; pages are shared between
+    worker processes through the OS page cache.
+    """
+
+    def __init__(self, path: str, record: struct.Struct, magic: bytes):
+        self.path = path
+        self.record = record
+        self._file = open(path, "rb")
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path}: truncated header")
+            file_magic, size, count = _HEADER.unpack(header)
+            if file_magic != magic or size != record.size:
+                raise ValueError(f"{path}: not a {magic.rstrip(bytes(1)).decode()} file")
+            self.count = count
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _key_at(self, i: int) -> int:
+        return _KEY.unpack_from(self._map, _HEADER.size + i * self.record.size)[0]
+
+    def _bisect(self, key: int, lo: int = 0) -> int:
+        """Index of the first record whose key is >= `key`."""
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def key_range(self, key: int) -> Tuple[int, int]:
+        """[lo, hi) indices of the records whose leading key equals `key`."""
+        if not self.count:
+            return 0, 0
+        lo = self._bisect(key)
+        return lo, self._bisect(key + 1, lo) if key < 0xFFFFFFFFFFFFFFFF else self.count
+
+    def iter_range(self, lo: int, hi: int) -> Iterator[Tuple]:
+        unpack_from, size = self.record.unpack_from, self.record.size
+        for i in range(lo, hi):
+            yield unpack_from(self._map, _HEADER.size + i * size)
+
+    def lookup(self, key: int) -> List[Tuple]:
+        """All records whose leading key equals `key`, in file order."""
+        return list(self.iter_range(*self.key_range(key)))
+
+    def __iter__(self) -> Iterator[Tuple]:
+        unpack_from, size = self.record.unpack_from, self.record.size
+        for i in range(self.count):
+            yield unpack_from(self._map, _HEADER.size + i * size)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class ExternalSorter:
+    """Sort (and optionally combine) more records than fit in memory.
+
+    Records are buffered, written out as sorted runs of `run_size`, and merged
+    lazily by `merged()`. With `combine`, consecutive records sharing the
+    first `key_fields` fields are folded into one.
+    """
+
+    def __init__(self, record: struct.Struct, key_fields: int = 1, combine: Optional[Callable[[Tuple, Tuple], Tuple]] = None,
+                 run_size: int = 1_000_000, tmpdir: Optional[str] = None):
+        self.record = record
+        self.key_fields = key_fields
+        self.combine = combine
+        self.run_size = run_size
+        self._tmpdir = tempfile.TemporaryDirectory(dir=tmpdir, prefix="nochess-sort-")
+        self._buffer: List[Tuple] = []
+        self._runs: List[str] = []
+
+    def add(self, fields: Tuple):
+        self._buffer.append(fields)
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        path = os.path.join(self._tmpdir.name, f"run-{len(self._runs):05d}")
+        self._buffer.sort()
+        with open(path, "wb") as f:
+            f.writelines(self.record.pack(*fields) for fields in self._combined(self._buffer))
+        self._runs.append(path)
+        self._buffer = []
+
+    def _read_run(self, path: str) -> Iterator[Tuple]:
+        size, unpack = self.record.size, self.record.unpack
+        with open(path, "rb") as f:
+            while chunk := f.read(size * 4096):
+                for offset in range(0, len(chunk), size):
+                    yield unpack(chunk[offset:offset + size])
+
+    def _combined(self, records: Iterable[Tuple]) -> Iterator[Tuple]:
+        if self.combine is None:
+            yield from records
+            return
+        for _, group in itertools.groupby(records, key=lambda r: r[:self.key_fields]):
+            acc = next(group)
+            for other in group:
+                acc = self.combine(acc, other)
+            yield acc
+
+    def merged(self) -> Iterator[Tuple]:
+        """All added records in sorted order; spilled runs are merged on the fly."""
+        self._buffer.sort()
+        runs = [self._read_run(path) for path in self._runs]
+        return self._combined(heapq.merge(*runs, self._buffer))
+
+    def close(self):
+        self._buffer = []
+        self._tmpdir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
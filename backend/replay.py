@@ -0,0 +1,243 @@
+import json
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from .loadtest import LoadStats, _timed
+
+# First path segment of the requests worth replaying; everything else (state
+# polling, explorer, health, websockets) passes through unrecorded.
+TRACED_OPS = ("start_game", "make_move", "analyze", "undo", "restart", "resign", "review_pgn", "evaluate_batch")
+_STATEFUL_OPS = {"start_game", "make_move", "undo", "restart", "resign"}
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    """Append-only NDJSON trace: a header line, then one line per traced request.
+
+    Request bodies are stored verbatim (decoded as latin-1, so any bytes round
+    trip), which keeps PGN uploads replayable without re-encoding multipart.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._file = open(path, "a", buffering=1)
+        self._write({"trace": TRACE_VERSION, "started": time.time()})
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def offset(self) -> float:
+        return time.monotonic() - self._started
+
+    def record(self, event: Dict):
+        self._write(event)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class TraceMiddleware:
+    """ASGI middleware recording TRACED_OPS requests, timed until the last response byte."""
+
+    def __init__(self, app, recorder: TraceRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        parts = scope["path"].strip("/").split("/") if scope["type"] == "http" else []
+        if not parts or parts[0] not in TRACED_OPS:
+            await self.app(scope, receive, send)
+            return
+        op = parts[0]
+        offset = self.recorder.offset()
+        started = time.perf_counter()
+        body = bytearray()
+        response = bytearray()  # only kept for start_game, to learn the new session id
+        status = {"code": 0}
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request":
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_and_watch(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body" and op == "start_game":
+                response.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_and_watch)
+        finally:
+            session = parts[1] if len(parts) > 1 else None
+            if op == "start_game" and status["code"] == 200:
+                try:
+                    session = json.loads(bytes(response))["session_id"]
+                except (ValueError, KeyError, TypeError):
+                    session = None
+            headers = dict(scope.get("headers") or [])
+            self.recorder.record({
+                "t": round(offset, 4),
+                "op": op,
+                "method": scope["method"],
+                "session": session,
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "content_type": headers.get(b"content-type", b"").decode("latin-1"),
+                "body": bytes(body).decode("latin-1"),
+                "status": status["code"],
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+def load_trace(path: str) -> List[Dict]:
+    """Recorded events in order, header lines skipped (a trace file may hold several recordings)."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "trace" not in record:
+                events.append(record)
+    return events
+
+
+def _flows(events: List[Dict]) -> Tuple[List[List[Dict]], int]:
+    """Split a trace into independent flows: one per game session, one per sessionless request.
+
+    Sessions whose start_game wasn't recorded can't be re-created; their
+    events are dropped and counted.
+    """
+    flows: Dict[str, List[Dict]] = {}
+    skipped = 0
+    for i, event in enumerate(events):
+        session = event.get("session")
+        if session is None:
+            flows[f"#{i}"] = [event]
+        elif session in flows:
+            flows[session].append(event)
+        elif event["op"] == "start_game":
+            flows[session] = [event]
+        else:
+            skipped += 1
+    return list(flows.values()), skipped
+
+
+def replayable_move(recorded: str, state: Optional[Dict], salt: str) -> Tuple[str, bool]:
+    """The recorded move if it is legal in the replayed game, else a deterministic legal substitute.
+
+    Engine replies and the user's colour can differ between runs (another
+    engine, another build), so a recorded move may not fit the replayed
+    position. Substituting keeps the request mix and game length intact.
+    Returns (move, diverged).
+    """
+    legal = sorted(state.get("legal_moves") or []) if state else []
+    if not legal or recorded in legal:
+        return recorded, False
+    return legal[zlib.crc32(f"{salt}:{recorded}".encode()) % len(legal)], True
+
+
+def replay(events: List[Dict], target, speed: Optional[float] = None, max_flows: int = 256) -> Dict:
+    """Re-drive recorded events against `target` (see backend.loadtest targets).
+
+    Each flow runs in its own thread with its requests in recorded order.
+    With `speed`, requests are sent at their recorded offsets divided by
+    `speed` (1.0 = original pacing); without it, every flow goes as fast as
+    its responses allow. Returns a LoadStats report over TRACED_OPS plus the
+    number of substituted (`diverged`) moves and `skipped` events.
+    """
+    flows, skipped = _flows(events)
+    stats = LoadStats(TRACED_OPS)
+    counters = {"diverged": 0, "skipped": skipped}
+    lock = threading.Lock()
+    started = time.monotonic()
+
+    def count(key: str, n: int = 1):
+        with lock:
+            counters[key] += n
+
+    def run(flow: List[Dict]):
+        session = state = None
+        for i, event in enumerate(flow):
+            if speed:
+                delay = started + event["t"] / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            op = event["op"]
+            body = event.get("body", "")
+            path = f"/{op}"
+            if event.get("session") and op != "start_game":
+                if session is None:  # start_game failed in this run
+                    count("skipped", len(flow) - i)
+                    return
+                path = f"/{op}/{session}"
+            if op == "make_move" and body:
+                recorded = json.loads(body)
+                move, diverged = replayable_move(recorded.get("move", ""), state, f"{event.get('session')}:{i}")
+                if diverged:
+                    count("diverged")
+                    body = json.dumps({**recorded, "move": move})
+            ok, result = _timed(stats, op, target.send, event["method"], path, event.get("query", ""),
+                                body.encode("latin-1"), event.get("content_type", ""))
+            if ok and op in _STATEFUL_OPS and isinstance(result, dict):
+                state = result
+                if op == "start_game":
+                    session = result.get("session_id")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(flows), max_flows))) as executor:
+        for future in [executor.submit(run, flow) for flow in flows]:
+            future.result()
+    report = stats.report(time.monotonic() - started, len(flows))
+    report.update(counters)
+    return report
+
+
+def recorded_report(events: List[Dict]) -> Dict:
+    """The latencies observed while recording, as a LoadStats report (a baseline for `compare_reports`)."""
+    stats = LoadStats(TRACED_OPS)
+    for event in events:
+        status = event.get("status", 0)
+        stats.record(event["op"], event["ms"] / 1000, 0 < status < 400, f"HTTP {status}")
+    flows, _ = _flows(events)
+    elapsed = max((e["t"] + e["ms"] / 1000 for e in events), default=0.0) - min((e["t"] for e in events), default=0.0)
+    return stats.report(elapsed, len(flows))
+
+
+def compare_reports(baseline: Dict, candidate: Dict) -> Dict[str, Dict]:
+    """Per-operation percentile ratios candidate / baseline (> 1 is slower) for operations in both reports."""
+    comparison = {}
+    for op, row in candidate["ops"].items():
+        base = baseline["ops"].get(op)
+        if not base:
+            continue
+        comparison[op] = {"count": row["count"], "baseline_count": base["count"]}
+        for q in (50, 95, 99):
+            key = f"p{q}_ms"
+            comparison[op][key] = row[key]
+            comparison[op][f"baseline_{key}"] = base[key]
+            comparison[op][f"p{q}_ratio"] = round(row[key] / base[key], 3) if base[key] else None
+    return comparison
+
+
+def regressions(comparison: Dict[str, Dict], max_ratio: float, percentile: int = 95) -> List[str]:
+    key = f"p{percentile}_ratio"
+    return [op for op, row in comparison.items() if row[key] is not None and row[key] > max_ratio]
+
+
+def format_comparison(comparison: Dict[str, Dict]) -> str:
+    lines = [f"{'operation':<16}{'base p50':>10}{'p50':>10}{'base p95':>10}{'p95':>10}{'p95 x':>8}{'p99 x':>8}"]
+    for op, row in comparison.items():
+        ratios = [f"{row[k]:>8.2f}" if row[k] is not None else f"{'-':>8}" for k in ("p95_ratio", "p99_ratio")]
+        lines.append(f"{op:<16}{row['baseline_p50_ms']:>10.1f}{row['p50_ms']:>10.1f}"
+                     f"{row['baseline_p95_ms']:>10.1f}{row['p95_ms']:>10.1f}{ratios[0]}{ratios[1]}")
+    return "\n".join(lines)
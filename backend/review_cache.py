@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Union
+import chess
+
+DEFAULT_MAX_MB = 256
+
+
+def review_key(moves: Iterable[Union[chess.Move, str]], depth: int, variant: str = "", engine: str = "") -> str:
+    """Content address of a review: the mainline in UCI plus the review depth, mode and engine.
+
+    Headers, comments, variations and move-number formatting don't affect the
+    review, so re-uploads of the same game in any PGN dialect share a key.
+    `variant` distinguishes review modes (e.g. adaptive) that give different results,
+    and `engine` the engine kind and profile (see `engine_tag`), so that FakeEngine
+    reviews from load tests never answer for Stockfish ones.
+    """
+    uci = " ".join(m.uci() if isinstance(m, chess.Move) else str(m) for m in moves)
+    prefix = f"{engine}/" if engine else ""
+    return hashlib.sha256(f"{prefix}d{depth}{variant}:{uci}".encode()).hexdigest()
+
+
+def engine_tag(kind: str, profile: str = "review") -> str:
+    """`engine` argument of review_key for an engine kind ("stockfish" or "fake") and profile."""
+    return f"{kind.lower()}:{profile}"
+
+
+class ReviewCache:
+    """Completed PGN reviews on local disk (SQLite), evicted least-recently-used by total size."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        if path is None:
+            path = os.getenv("REVIEW_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "nochess-review-cache.sqlite3")
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("REVIEW_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = max_bytes > 0
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                if not self._schema_ready:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS reviews ("
+                        " key TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL,"
+                        " created REAL NOT NULL, last_access REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS reviews_lru ON reviews (last_access)")
+                    self._schema_ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        if not self.enabled:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT data FROM reviews WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE reviews SET last_access = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"Review cache read failed: {e}")
+            return None
+
+    def put(self, key: str, review_data: List[Dict]):
+        if not self.enabled:
+            return
+        data = json.dumps(review_data, separators=(",", ":"))
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO reviews (key, data, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), now, now),
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Review cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reviews").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM reviews ORDER BY last_access ASC"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM reviews WHERE key = ?", doomed)
+
+    def stats(self) -> Dict:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reviews").fetchone()
+        return {"enabled": True, "entries": count, "bytes": size, "max_bytes": self.max_bytes}
@@ -0,0 +1,133 @@
+from typing import Dict, List
+import numpy as np
+
+MATE_CP = 1000  # mate scores are clamped to +/-10 pawns so one missed mate doesn't swamp ACPL
+# Same thresholds PgnReviewer uses for its comments
+BLUNDER_CP = 300
+MISTAKE_CP = 100
+INACCURACY_CP = 30
+
+
+def _clamped(scores: np.ndarray, is_mate: np.ndarray) -> np.ndarray:
+    # Mate n > 0: side to move mates; n <= 0: side to move is mated
+    mate = np.where(scores > 0, MATE_CP, -MATE_CP)
+    return np.where(is_mate, mate, np.clip(scores, -MATE_CP, MATE_CP))
+
+
+def review_arrays(review_data: List[Dict]) -> Dict[str, np.ndarray]:
+    """Per-move arrays from PgnReviewer output, evals from the mover's point of view.
+
+    pre_eval is relative to the side to move before the move (the mover),
+    post_eval to the side to move after it (the opponent), so the mover's
+    eval after the move is -post.
+    """
+    n = len(review_data)
+    pre = np.fromiter((m["pre_eval"]["score"] for m in review_data), dtype=np.int64, count=n)
+    pre_mate = np.fromiter((m["pre_eval"]["is_mate"] for m in review_data), dtype=bool, count=n)
+    post = np.fromiter((m["post_eval"]["score"] for m in review_data), dtype=np.int64, count=n)
+    post_mate = np.fromiter((m["post_eval"]["is_mate"] for m in review_data), dtype=bool, count=n)
+    before = _clamped(pre, pre_mate)
+    after = -_clamped(post, post_mate)
+    return {
+        "before": before,
+        "after": after,
+        "loss": np.maximum(0, before - after),
+        "black": np.fromiter((m["player"] == "Black" for m in review_data), dtype=bool, count=n),
+    }
+
+
+def win_percent(cp: np.ndarray) -> np.ndarray:
+    """Winning chances (0-100) for a centipawn eval, lichess' logistic model."""
+    return 50 + 50 * (2 / (1 + np.exp(-0.00368208 * cp)) - 1)
+
+
+def move_accuracy(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """Per-move accuracy (0-100) from the drop in winning chances, lichess' formula."""
+    drop = np.maximum(0, win_percent(before) - win_percent(after))
+    return np.clip(103.1668 * np.exp(-0.04354 * drop) - 3.1669, 0, 100)
+
+
+def _summarize(loss: np.ndarray, accuracy: np.ndarray) -> Dict:
+    moves = int(loss.size)
+    return {
+        "moves": moves,
+        "acpl": round(float(loss.mean()), 1) if moves else None,
+        "accuracy": round(float(accuracy.mean()), 1) if moves else None,
+        "blunders": int(np.count_nonzero(loss > BLUNDER_CP)),
+        "mistakes": int(np.count_nonzero((loss > MISTAKE_CP) & (loss <= BLUNDER_CP))),
+        "inaccuracies": int(np.count_nonzero((loss > INACCURACY_CP) & (loss <= MISTAKE_CP))),
+    }
+
+
+def game_stats(review_data: List[Dict]) -> Dict[str, Dict]:
+    """ACPL, accuracy % and error counts for each side of one reviewed game."""
+    arrays = review_arrays(review_data)
+    accuracy = move_accuracy(arrays["before"], arrays["after"])
+    black = arrays["black"]
+    return {
+        "white": _summarize(arrays["loss"][~black], accuracy[~black]),
+        "black": _summarize(arrays["loss"][black], accuracy[black]),
+    }
+
+
+class PlayerStats:
+    """Aggregate per-player statistics over many reviewed games.
+
+    Games are reduced to per-move arrays as they are added; `result()` does
+    one concatenation and a handful of bincounts over all moves, so the cost
+    is independent of how the moves are spread across games and players.
+    """
+
+    def __init__(self):
+        self._players: Dict[str, int] = {}
+        self._games: List[int] = []
+        self._ids: List[np.ndarray] = []
+        self._loss: List[np.ndarray] = []
+        self._accuracy: List[np.ndarray] = []
+
+    def _player_id(self, name: str) -> int:
+        if name not in self._players:
+            self._players[name] = len(self._players)
+            self._games.append(0)
+        return self._players[name]
+
+    def add_game(self, white: str, black: str, review_data: List[Dict]):
+        ids = (self._player_id(white), self._player_id(black))
+        for pid in set(ids):
+            self._games[pid] += 1
+        if not review_data:
+            return
+        arrays = review_arrays(review_data)
+        self._ids.append(np.where(arrays["black"], ids[1], ids[0]))
+        self._loss.append(arrays["loss"])
+        self._accuracy.append(move_accuracy(arrays["before"], arrays["after"]))
+
+    def result(self) -> Dict[str, Dict]:
+        n = len(self._players)
+        if not n:
+            return {}
+        if self._ids:
+            ids = np.concatenate(self._ids)
+            loss = np.concatenate(self._loss)
+            accuracy = np.concatenate(self._accuracy)
+        else:
+            ids = loss = accuracy = np.zeros(0, dtype=np.int64)
+        moves = np.bincount(ids, minlength=n)
+        safe = np.maximum(moves, 1)
+        acpl = np.bincount(ids, weights=loss, minlength=n) / safe
+        acc = np.bincount(ids, weights=accuracy, minlength=n) / safe
+        blunders = np.bincount(ids, weights=loss > BLUNDER_CP, minlength=n)
+        mistakes = np.bincount(ids, weights=(loss > MISTAKE_CP) & (loss <= BLUNDER_CP), minlength=n)
+        inaccuracies = np.bincount(ids, weights=(loss > INACCURACY_CP) & (loss <= MISTAKE_CP), minlength=n)
+        return {
+            name: {
+                "games": self._games[i],
+                "moves": int(moves[i]),
+                "acpl": round(float(acpl[i]), 1) if moves[i] else None,
+                "accuracy": round(float(acc[i]), 1) if moves[i] else None,
+                "blunders": int(blunders[i]),
+                "mistakes": int(mistakes[i]),
+                "inaccuracies": int(inaccuracies[i]),
+            }
+            for name, i in self._players.items()
+        }
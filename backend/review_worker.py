@@ -0,0 +1,145 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+import chess
+from .job_queue import DEFAULT_LEASE_SECONDS, JobQueue
+from .review_cache import ReviewCache, engine_tag, review_key
+
+PURGE_INTERVAL = 3600.0
+
+
+def review_job(game, moves: List[chess.Move], quick_mode: bool = False, adaptive: bool = False,
+               time_budget: Optional[float] = None, client: Optional[str] = None) -> Dict:
+    """Queue payload for one game: everything a worker needs, with no file or PGN parsing left to do."""
+    headers = game.headers if game else {}
+    return {
+        "moves": [m.uci() for m in moves],
+        "event": headers.get("Event", "Unknown Event"),
+        "white": headers.get("White", "Unknown Player"),
+        "black": headers.get("Black", "Unknown Player"),
+        "result": headers.get("Result", "*"),
+        "quick_mode": quick_mode,
+        "adaptive": adaptive,
+        "time_budget": time_budget,
+        "client": client,  # whose engine-time quota the review is charged to
+    }
+
+
+def payload_cache_key(payload: Dict, engine_kind: str = "stockfish") -> str:
+    """Review cache key of a queued game when reviewed by an `engine_kind` worker."""
+    from .pgnReview import review_variant
+    return review_key(payload["moves"], 10 if payload["quick_mode"] else 20,
+                      review_variant(payload["adaptive"], payload["time_budget"]), engine_tag(engine_kind))
+
+
+def run_review_job(engine, payload: Dict, cache: Optional[ReviewCache] = None, engine_kind: str = "stockfish") -> Dict:
+    """Review a queued game with `engine`; returns a PgnReviewResponse body. Results go through `cache`."""
+    from .pgnReview import PgnReviewer
+    from .review_stats import game_stats
+    key = payload_cache_key(payload, engine_kind)
+    review_data = cache.get(key) if cache else None
+    if review_data is None:
+        moves = [chess.Move.from_uci(u) for u in payload["moves"]]
+        reviewer = PgnReviewer(engine, quick_mode=payload["quick_mode"], headless=True)
+        if payload["adaptive"]:
+            review_data = reviewer.review_moves_adaptive(moves, time_budget=payload["time_budget"])
+        else:
+            review_data = reviewer.review_moves(moves)
+        if cache and review_data:
+            cache.put(key, review_data)
+    return {
+        "review_data": review_data,
+        "stats": game_stats(review_data) if review_data else None,
+        "event": payload["event"],
+        "white": payload["white"],
+        "black": payload["black"],
+        "result": payload["result"],
+    }
+
+
+class ReviewWorker:
+    """Pulls review jobs from a JobQueue and runs them on one engine, in its own process.
+
+    Start as many as the host has cores for (`python main.py review-worker`);
+    workers share nothing but the queue and review cache files. The lease
+    is renewed every third of `lease_seconds` while a job runs, so a killed
+    worker's job is picked up by another one after at most one lease.
+    """
+
+    def __init__(self, queue: JobQueue, engine_factory: Callable, cache: Optional[ReviewCache] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, poll_interval: float = 1.0,
+                 worker_id: Optional[str] = None, engine_kind: str = "stockfish"):
+        self.queue = queue
+        self.engine_factory = engine_factory
+        self.engine_kind = engine_kind  # part of the review cache key
+        self.cache = cache
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stop_event = threading.Event()
+        self.completed = 0
+        self.failed = 0
+        self._engine = None
+        self._last_purge = 0.0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = self.engine_factory()
+        return self._engine
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.quit()
+            self._engine = None
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False when the queue had nothing runnable."""
+        job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease, args=(job["id"], done), daemon=True)
+        heartbeat.start()
+        started = time.monotonic()
+        try:
+            result = run_review_job(self.engine, job["payload"], self.cache, self.engine_kind)
+        except Exception as e:
+            self.failed += 1
+            print(f"Review job {job['id']} failed (attempt {job['attempts']}): {e}")
+            self.queue.fail(job["id"], self.worker_id, str(e), engine_ms=(time.monotonic() - started) * 1000)
+            self.close()  # the engine may be the problem; the next job gets a fresh one
+        else:
+            # Charged to the submitting client by the API (JobQueue.take_engine_time)
+            if self.queue.complete(job["id"], self.worker_id, result, engine_ms=(time.monotonic() - started) * 1000):
+                self.completed += 1
+            else:
+                print(f"Review job {job['id']} lost its lease before finishing; result discarded")
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def _renew_lease(self, job_id: int, done: threading.Event):
+        while not done.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                return
+
+    def run(self, max_jobs: Optional[int] = None):
+        """Work until `stop_event` is set (or `max_jobs` jobs ran); idles `poll_interval` between empty polls."""
+        jobs = 0
+        try:
+            while not self.stop_event.is_set() and (max_jobs is None or jobs < max_jobs):
+                if self.run_once():
+                    jobs += 1
+                    continue
+                now = time.monotonic()
+                if now - self._last_purge > PURGE_INTERVAL:
+                    self._last_purge = now
+                    self.queue.purge()
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            self.close()
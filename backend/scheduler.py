@@ -0,0 +1,332 @@
+import os
+import threading
+import itertools
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+import chess
+from .analysis_cache import AnalysisCache, position_key
+from .engine import DEFAULT_DEPTH
+from .shared_cache import shared_analysis_cache
+
+MAX_PREEMPTIONS = 2  # a search is stopped at most this many times before it is left alone
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # engine reply the user is waiting on
+    LIVE = 1         # evals for live games (state refresh, /analyze, WebSocket)
+    BATCH = 2        # PGN review and other bulk work
+
+
+class _Ticket:
+    __slots__ = ("engine", "priority", "owner", "seq", "granted", "preempted", "preemptions")
+
+    def __init__(self, engine, priority: Priority, owner, seq: int):
+        self.engine = engine
+        self.priority = priority
+        self.owner = owner
+        self.seq = seq
+        self.granted = False
+        self.preempted = False
+        self.preemptions = 0
+
+
+class EngineScheduler:
+    """Priority gate in front of every engine search.
+
+    At most `slots` searches run at once (roughly: one per core we want to
+    spend on engines) and an engine never runs two searches at the same time.
+    Waiting searches are granted strictly by priority class, round-robin across
+    owners (sessions) within a class so one busy session cannot starve others.
+    When interactive work arrives and nothing is free, the lowest-priority
+    running search is stopped and re-queued at the head of its owner's queue.
+
+    Identical concurrent requests (same position hash and depth) are
+    coalesced: the first caller searches, later callers wait on its result. A
+    higher-priority follower promotes the leader's queued search. Completed
+    results go into an AnalysisCache consulted before anything is queued,
+    followed by the host-wide SharedAnalysisCache when one is configured.
+    """
+
+    def __init__(self, slots: Optional[int] = None, cache: Optional[AnalysisCache] = None, shared_cache=None):
+        if slots is None:
+            slots = int(os.getenv("ENGINE_SLOTS", "0")) or (os.cpu_count() or 1)
+        self.slots = max(1, slots)
+        self._cond = threading.Condition()
+        self._waiting: Dict[Priority, "OrderedDict[object, Deque[_Ticket]]"] = {p: OrderedDict() for p in Priority}
+        self._running: Set[_Ticket] = set()
+        self._busy_engines: Set[int] = set()
+        self._seq = itertools.count()
+        self.cache = cache if cache is not None else AnalysisCache()
+        # None: the ANALYSIS_SHM_MB cache if configured; False: none
+        self.shared_cache = shared_analysis_cache() if shared_cache is None else (shared_cache or None)
+        self._inflight: Dict[Tuple[int, Optional[int]], Tuple[Future, _Ticket]] = {}
+        self.completed = 0
+        self.preempted = 0
+        self.coalesced = 0
+        # Called with (owner, seconds) after every engine search, including preempted ones
+        self.on_search: Optional[Callable[[object, float], None]] = None
+
+    # --- public API -----------------------------------------------------
+
+    def analyze(self, engine, board: chess.Board, depth: Optional[int] = None,
+                priority: Priority = Priority.LIVE, owner=None) -> Dict:
+        """Run one search on `engine` once the scheduler grants it a slot.
+
+        Cached results at least as deep are returned without queueing. If the
+        same position is already being searched to the same depth, wait for
+        that search instead and return a copy of its result.
+        """
+        priority = Priority(priority)
+        cached = self.cached(board, depth)
+        if cached is not None:
+            return cached
+        key = (position_key(board), depth)
+        to_stop = None
+        with self._cond:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                ticket = _Ticket(engine, priority, owner, next(self._seq))
+                future: Future = Future()
+                self._inflight[key] = (future, ticket)
+            else:
+                future, leader = inflight
+                self.coalesced += 1
+                if priority < leader.priority:
+                    to_stop = self._promote(leader, priority)
+        if to_stop is not None:
+            _stop_engine(to_stop)
+        if inflight is not None:
+            return _copy_result(future.result())
+
+        try:
+            result = self._search(ticket, board, depth)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            # Under the depth actually reached: a search stopped at its deadline returns a shallower
+            # result, and one stopped before the engine reported anything has no depth and isn't kept
+            reached = result.get("depth")
+            if depth is not None and reached is not None:
+                self.cache.put(key[0], reached, result)
+            future.set_result(result)
+            return _copy_result(result)
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    def cached(self, board: chess.Board, depth: Optional[int]) -> Optional[Dict]:
+        """Return a copy of a cached result at least `depth` deep, if any, without taking a slot or an engine."""
+        if depth is None:
+            return None
+        key = position_key(board)
+        hit = self.cache.get(key, depth)
+        if hit is None and self.shared_cache is not None:
+            # Searched by another process: keep it locally too
+            hit = self.shared_cache.get(key, depth)
+            if hit is not None:
+                self.cache.put(key, hit["depth"] if hit["depth"] is not None else depth, hit)
+        return _copy_result(hit) if hit is not None else None
+
+    def backlog(self) -> int:
+        """Searches waiting for a slot."""
+        with self._cond:
+            return sum(len(q) for queues in self._waiting.values() for q in queues.values())
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "running": len(self._running),
+                "waiting": {p.name.lower(): sum(len(q) for q in self._waiting[p].values()) for p in Priority},
+                "completed": self.completed,
+                "preempted": self.preempted,
+                "coalesced": self.coalesced,
+                "cache": self.cache.stats(),
+            }
+
+    # --- internals ------------------------------------------------------
+
+    def _search(self, ticket: _Ticket, board: chess.Board, depth: Optional[int]) -> Dict:
+        engine = ticket.engine
+        self._enqueue(ticket)
+        while True:
+            self._wait_for_grant(ticket)
+            try:
+                if ticket.preempted:
+                    result = None
+                else:
+                    engine.set_board(board)
+                    started = time.monotonic()
+                    try:
+                        result = engine.analyze_position(depth=depth)
+                    finally:
+                        if self.on_search is not None:
+                            self.on_search(ticket.owner, time.monotonic() - started)
+            except Exception:
+                self._release(ticket)
+                raise
+            if ticket.preempted:
+                self._requeue(ticket)
+                continue
+            self._release(ticket)
+            return result
+
+    def _promote(self, ticket: _Ticket, priority: Priority) -> Optional[_Ticket]:
+        """Move a still-waiting ticket to a higher priority class. Caller holds self._cond.
+
+        Returns a running search to stop, as _enqueue would for a new ticket.
+        """
+        queue = self._waiting[ticket.priority].get(ticket.owner)
+        if ticket.granted or not queue or ticket not in queue:
+            ticket.priority = min(ticket.priority, priority)
+            return None
+        queue.remove(ticket)
+        if not queue:
+            del self._waiting[ticket.priority][ticket.owner]
+        ticket.priority = priority
+        self._waiting[priority].setdefault(ticket.owner, deque()).append(ticket)
+        victim = self._pick_victim(ticket) if priority == Priority.INTERACTIVE else None
+        self._dispatch()
+        return victim
+
+    def _enqueue(self, ticket: _Ticket, front: bool = False):
+        to_stop = None
+        with self._cond:
+            queue = self._waiting[ticket.priority].setdefault(ticket.owner, deque())
+            if front:
+                queue.appendleft(ticket)
+            else:
+                queue.append(ticket)
+            if ticket.priority == Priority.INTERACTIVE:
+                to_stop = self._pick_victim(ticket)
+            self._dispatch()
+        if to_stop is not None:
+            _stop_engine(to_stop)
+
+    def _pick_victim(self, ticket: _Ticket) -> Optional[_Ticket]:
+        engine_busy = id(ticket.engine) in self._busy_engines
+        if not engine_busy and len(self._running) < self.slots:
+            return None
+        candidates = [
+            t for t in self._running
+            if t.priority > ticket.priority and not t.preempted and t.preemptions < MAX_PREEMPTIONS
+            and (not engine_busy or t.engine is ticket.engine)
+        ]
+        if not candidates:
+            return None
+        victim = max(candidates, key=lambda t: (t.priority, t.seq))
+        victim.preempted = True
+        victim.preemptions += 1
+        self.preempted += 1
+        return victim
+
+    def _dispatch(self):
+        """Grant slots to waiting tickets. Caller holds self._cond."""
+        granted = False
+        for priority in Priority:
+            ring = self._waiting[priority]
+            for owner in list(ring.keys()):
+                if len(self._running) >= self.slots:
+                    break
+                queue = ring[owner]
+                ticket = queue[0]
+                if id(ticket.engine) in self._busy_engines:
+                    continue
+                queue.popleft()
+                if queue:
+                    ring.move_to_end(owner)
+                else:
+                    del ring[owner]
+                ticket.granted = True
+                self._running.add(ticket)
+                self._busy_engines.add(id(ticket.engine))
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _wait_for_grant(self, ticket: _Ticket):
+        with self._cond:
+            while not ticket.granted:
+                self._cond.wait()
+
+    def _free(self, ticket: _Ticket):
+        self._running.discard(ticket)
+        self._busy_engines.discard(id(ticket.engine))
+        ticket.granted = False
+
+    def _release(self, ticket: _Ticket):
+        with self._cond:
+            self._free(ticket)
+            self.completed += 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    def _requeue(self, ticket: _Ticket):
+        with self._cond:
+            self._free(ticket)
+            ticket.preempted = False
+        self._enqueue(ticket, front=True)
+
+
+class ScheduledEngine:
+    """StockfishEngine facade whose searches are gated by an EngineScheduler.
+
+    Exposes the same set_position / set_depth / analyze_position interface so
+    PgnReviewer and the API can use it unchanged, plus analyze_moves for
+    callers that share the facade across threads.
+    """
+
+    def __init__(self, engine, scheduler: EngineScheduler, owner=None, priority: Priority = Priority.LIVE):
+        self.engine = engine
+        self.scheduler = scheduler
+        self.owner = owner
+        self.priority = priority
+        self.board = chess.Board()
+        self.depth: int = DEFAULT_DEPTH
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
+
+    def set_position(self, uci_moves: List[str]):
+        self.board = _board_from_moves(uci_moves)
+
+    def set_depth(self, depth: int):
+        self.depth = depth
+
+    def analyze_position(self, priority: Optional[Priority] = None) -> Dict:
+        return self.scheduler.analyze(self.engine, self.board, self.depth, self.priority if priority is None else priority, self.owner)
+
+    def analyze_moves(self, uci_moves: List[str], priority: Optional[Priority] = None) -> Dict:
+        board = _board_from_moves(uci_moves)
+        return self.scheduler.analyze(self.engine, board, self.depth, self.priority if priority is None else priority, self.owner)
+
+    def quit(self):
+        self.engine.quit()
+
+
+def _stop_engine(ticket: _Ticket):
+    try:
+        ticket.engine.stop()
+    except Exception:
+        pass
+
+
+def _copy_result(result: Dict) -> Dict:
+    copied = dict(result)
+    if isinstance(copied.get("pv"), list):
+        copied["pv"] = list(copied["pv"])
+    return copied
+
+
+def _board_from_moves(uci_moves: List[str]) -> chess.Board:
+    board = chess.Board()
+    for u in uci_moves:
+        board.push_uci(u)
+    return board
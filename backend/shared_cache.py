@@ -0,0 +1,196 @@
+import os
+import struct
+import threading
+import time
+from functools import reduce
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from operator import xor
+from typing import Dict, Optional
+from .wire import pack_move, unpack_move
+
+# Cross-process analysis cache, laid out like an engine transposition table.
+#
+# Header (64 bytes): magic, number of slots. Then `slots` entries of 64 bytes:
+#   uint64 check       Zobrist key XOR the seven data words (torn-write guard)
+#   int32  score       centipawns, or signed moves-to-mate when FLAG_MATE
+#   uint8  depth
+#   uint8  flags       FLAG_USED | FLAG_MATE | FLAG_HAS_DEPTH
+#   uint8  pv_len
+#   uint8  reserved
+#   uint16 * MAX_PV    PV moves packed as in backend.wire
+#
+# Readers and writers take no locks. A reader copies an entry, recomputes
+# key = check ^ data and only accepts it when that equals the key it is
+# looking for, so an entry torn by a concurrent write is read as a miss
+# (Hyatt's lockless hashing). Slots are grouped in buckets of BUCKET_SLOTS;
+# a new result replaces the same position if at least as deep, else an empty
+# slot, else the shallowest entry in the bucket.
+MAGIC = b"NOCHTT01"
+_HEADER = struct.Struct("<8sQ48x")
+_ENTRY = struct.Struct("<QiBBBx24H")
+_WORDS = struct.Struct("<8Q")
+ENTRY_SIZE = _ENTRY.size  # 64: one cache line
+MAX_PV = 24
+BUCKET_SLOTS = 4
+FLAG_USED = 0x01
+FLAG_MATE = 0x02
+FLAG_HAS_DEPTH = 0x04
+DEFAULT_NAME = "nochess-analysis"
+
+
+def _data_words(raw: bytes) -> int:
+    return reduce(xor, _WORDS.unpack(raw)[1:])
+
+
+def _attach(name: str, create: bool, size: int = 0) -> SharedMemory:
+    # The segment outlives any one process: uvicorn workers come and go, and
+    # Python's resource tracker would otherwise unlink it when its creator exits.
+    try:
+        return SharedMemory(name=name, create=create, size=size, track=False)  # Python 3.13+
+    except TypeError:
+        shm = SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedAnalysisCache:
+    """Engine results keyed by Zobrist hash in a named shared-memory table, shared by all processes on the host.
+
+    The first process to open `name` creates the table with `size_bytes`;
+    later ones attach to it at whatever size it was created with. The
+    segment persists until `unlink()` (or a reboot), so a restarted server
+    starts with a warm cache.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, size_bytes: int = 32 * 1024 * 1024):
+        self.name = name
+        slots = max(BUCKET_SLOTS, (size_bytes - _HEADER.size) // ENTRY_SIZE // BUCKET_SLOTS * BUCKET_SLOTS)
+        try:
+            self._shm = _attach(name, create=True, size=_HEADER.size + slots * ENTRY_SIZE)
+            _HEADER.pack_into(self._shm.buf, 0, MAGIC, slots)
+        except FileExistsError:
+            self._shm = _attach(name, create=False)
+            slots = self._wait_for_header()
+        self.slots = slots
+        self._buckets = slots // BUCKET_SLOTS
+        self._buf = self._shm.buf
+        self._lock = threading.Lock()  # guards this process' counters only
+        self.hits = 0
+        self.misses = 0
+
+    def _wait_for_header(self, timeout: float = 2.0) -> int:
+        # Another process may have created the segment but not written the header yet
+        deadline = time.monotonic() + timeout
+        while True:
+            magic, slots = _HEADER.unpack_from(self._shm.buf, 0)
+            if magic == MAGIC and slots:
+                return slots
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Shared memory {self.name!r} is not an analysis cache")
+            time.sleep(0.01)
+
+    def _offset(self, slot: int) -> int:
+        return _HEADER.size + slot * ENTRY_SIZE
+
+    def _bucket(self, key: int) -> range:
+        first = (key % self._buckets) * BUCKET_SLOTS
+        return range(first, first + BUCKET_SLOTS)
+
+    def _read(self, slot: int):
+        """(key, depth, raw entry) of a slot, or None if it is empty or torn."""
+        offset = self._offset(slot)
+        raw = bytes(self._buf[offset:offset + ENTRY_SIZE])
+        check, score, depth, flags = _ENTRY.unpack_from(raw)[:4]
+        if not flags & FLAG_USED:
+            return None
+        return check ^ _data_words(raw), depth, raw
+
+    def get(self, key: int, depth: int) -> Optional[Dict]:
+        """The stored analysis of the position if it was searched at least `depth` deep."""
+        for slot in self._bucket(key):
+            entry = self._read(slot)
+            if entry is not None and entry[0] == key and entry[1] >= depth:
+                with self._lock:
+                    self.hits += 1
+                return _decode(entry[2])
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: int, analysis: Dict):
+        depth = min(int(analysis.get("depth") or 0), 255)
+        victim = victim_depth = None
+        for slot in self._bucket(key):
+            entry = self._read(slot)
+            if entry is None:
+                if victim_depth is None or victim_depth >= 0:
+                    victim, victim_depth = slot, -1
+                continue
+            if entry[0] == key:
+                if entry[1] > depth:
+                    return  # keep the deeper result
+                victim = slot
+                break
+            if victim_depth is None or entry[1] < victim_depth:
+                victim, victim_depth = slot, entry[1]
+        data = _encode(analysis, depth)
+        check = key ^ _data_words(b"\0" * 8 + data)
+        offset = self._offset(victim)
+        self._buf[offset:offset + ENTRY_SIZE] = struct.pack("<Q", check) + data
+
+    def clear(self):
+        self._buf[_HEADER.size:] = bytes(len(self._buf) - _HEADER.size)
+
+    def stats(self) -> Dict:
+        return {"name": self.name, "slots": self.slots, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        """Remove the segment from the system; processes still attached keep their mapping."""
+        self._shm.unlink()
+
+
+def _encode(analysis: Dict, depth: int) -> bytes:
+    pv = list(analysis.get("pv") or [])[:MAX_PV]
+    if not pv and analysis.get("best_move") not in (None, "(none)"):
+        pv = [analysis["best_move"]]
+    flags = (FLAG_USED | (FLAG_MATE if analysis.get("is_mate") else 0)
+             | (FLAG_HAS_DEPTH if analysis.get("depth") is not None else 0))
+    packed = [pack_move(m) for m in pv] + [0] * (MAX_PV - len(pv))
+    return _ENTRY.pack(0, int(analysis.get("score") or 0), depth, flags, len(pv), *packed)[8:]
+
+
+def _decode(raw: bytes) -> Dict:
+    _, score, depth, flags, pv_len, *packed = _ENTRY.unpack(raw)
+    pv = [unpack_move(p) for p in packed[:pv_len]]
+    return {
+        "score": score,
+        "is_mate": bool(flags & FLAG_MATE),
+        "best_move": pv[0] if pv else None,
+        "pv": pv,
+        "depth": depth if flags & FLAG_HAS_DEPTH else None,
+    }
+
+
+_SHARED = None  # SharedAnalysisCache once opened, False if it could not be
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_analysis_cache() -> Optional[SharedAnalysisCache]:
+    """The host-wide cache configured by ANALYSIS_SHM_MB (0 or unset: disabled), opened on first use."""
+    global _SHARED
+    size_mb = float(os.getenv("ANALYSIS_SHM_MB", "0"))
+    if size_mb <= 0:
+        return None
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            try:
+                _SHARED = SharedAnalysisCache(os.getenv("ANALYSIS_SHM_NAME", DEFAULT_NAME), int(size_mb * 1024 * 1024))
+            except (OSError, RuntimeError) as e:
+                print(f"Shared analysis cache unavailable ({e}); continuing without it")
+                _SHARED = False
+        return _SHARED or None
@@ -1,45 +1,87 @@
-import os
+import sys
 import chess
-from typing import Dict
+from typing import Dict, List, Optional, TextIO
 from ..utils import format_score, get_evaluation_bar, get_piece_symbols, format_pv
 
+# ANSI control sequences (VT100); no shell is spawned to clear the screen
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_TO_END = "\x1b[J"
+CLEAR_LINE = "\x1b[K"
+
+
+def _cursor_to(row: int) -> str:
+    return f"\x1b[{row};1H"
+
+
 class TerminalUI:
-    def __init__(self, max_score: int = 500):
+    """Frame-buffered terminal renderer.
+
+    Each frame is built as a list of lines and written with a single write.
+    When the previous frame is still on screen, only the lines that changed
+    (board ranks with the eval bar, score, status) are redrawn in place.
+    """
+
+    def __init__(self, max_score: int = 500, out: Optional[TextIO] = None):
         self.max_score = max_score
+        self.out = out
+        self._frame: Optional[List[str]] = None  # lines currently on screen, top-left anchored
+        self._symbols = get_piece_symbols()
+
+    def _write(self, text: str):
+        out = self.out or sys.stdout
+        out.write(text)
+        out.flush()
 
     def clear_screen(self):
-        os.system('clear')
+        self._write(CLEAR_SCREEN)
+        self._frame = None
 
-    def display_board(self, board, analysis: Dict, clear: bool = True):
-        if clear:
-            self.clear_screen()
+    def render_board(self, board, analysis: Dict) -> List[str]:
+        """Board, eval bar and game state as a list of lines."""
         bar_height = 8
         score = analysis["score"]
         is_mate = analysis["is_mate"]
         streak = self._calculate_streak(score, is_mate, bar_height)
         eval_bar = get_evaluation_bar(streak, is_mate, bar_height)
         score_text = format_score(score, is_mate)
-        piece_symbols = get_piece_symbols()
+        symbols = self._symbols
 
-        print("            a  b  c  d  e  f  g  h")
-        print("          +------------------------+")
+        lines = ["            a  b  c  d  e  f  g  h", "          +------------------------+"]
         for rank in range(7, -1, -1):
             bar_segment = eval_bar[7 - rank]
-            if rank == 4:
-                print(f"{bar_segment} {score_text} | {rank+1}|", end=" ")
-            else:
-                print(f"{bar_segment}      | {rank+1}|", end=" ")
-            for file in range(8):
-                square = chess.square(file, rank)
-                piece = board.piece_at(square)
-                if piece:
-                    print(piece_symbols[piece.symbol()], end=" ")
-                else:
-                    print(piece_symbols['.'], end=" ")
-            print(f"|{rank+1}")
-        print("          +------------------------+")
-        print("            a  b  c  d  e  f  g  h")
-        self.display_game_state(board)
+            label = score_text if rank == 4 else "    "
+            squares = "".join(
+                (symbols[piece.symbol()] if (piece := board.piece_at(chess.square(file, rank))) else symbols["."]) + " "
+                for file in range(8)
+            )
+            lines.append(f"{bar_segment} {label} | {rank+1}| {squares}|{rank+1}")
+        lines.append("          +------------------------+")
+        lines.append("            a  b  c  d  e  f  g  h")
+        lines.extend(self._game_state_lines(board))
+        return lines
+
+    def display_frame(self, lines: List[str], clear: bool = True):
+        """Write a frame in one go, redrawing only the lines that changed since the last one."""
+        if not clear:
+            self._frame = None
+            self._write("\n".join(lines) + "\n")
+            return
+        previous = self._frame
+        if previous is None:
+            parts = [CLEAR_SCREEN, "\n".join(lines)]
+        else:
+            parts = [
+                _cursor_to(row) + line + CLEAR_LINE
+                for row, line in enumerate(lines, start=1)
+                if row > len(previous) or previous[row - 1] != line
+            ]
+        # Park the cursor below the frame and drop anything printed after the last one
+        parts.append(_cursor_to(len(lines) + 1) + CLEAR_TO_END)
+        self._frame = list(lines)
+        self._write("".join(parts))
+
+    def display_board(self, board, analysis: Dict, clear: bool = True):
+        self.display_frame(self.render_board(board, analysis), clear)
 
     def _calculate_streak(self, score: int, is_mate: bool, height: int) -> int:
         if is_mate:
@@ -47,18 +89,22 @@ class TerminalUI:
         capped_score = max(min(score, self.max_score), -self.max_score)
         return int((capped_score + self.max_score) * height / (2 * self.max_score))
 
-    def display_game_state(self, board):
+    def _game_state_lines(self, board) -> List[str]:
         turn = "White" if board.turn else "Black"
-        print(f"\nCurrent turn: {turn}")
+        lines = ["", f"Current turn: {turn}"]
         if board.is_checkmate():
-            print("Checkmate! Game over.")
+            lines.append("Checkmate! Game over.")
         elif board.is_stalemate():
-            print("Stalemate! Game over.")
+            lines.append("Stalemate! Game over.")
         elif board.is_insufficient_material():
-            print("Insufficient material! Game over.")
+            lines.append("Insufficient material! Game over.")
         elif board.is_check():
-            print("Check!")
-        print(f"Moves played: {len(board.move_stack)}")  # Use board.move_stack for count
+            lines.append("Check!")
+        lines.append(f"Moves played: {len(board.move_stack)}")  # Use board.move_stack for count
+        return lines
+
+    def display_game_state(self, board):
+        self._write("\n".join(self._game_state_lines(board)) + "\n")
 
     def display_analysis(self, board, analysis: Dict):
         score = analysis["score"]
@@ -79,10 +125,14 @@ class TerminalUI:
             else:
                 insight = f"Black has a {'slight' if score > -200 else 'strong'} advantage."
 
-        self.display_board(board, analysis, clear=True)
-        print("\nStockfish Analysis:")
-        print(f"Depth: {depth}")
-        print(f"Evaluation: {score_str}")
-        print(f"Best move: {best_move[:2]}{best_move[2:]}")
-        print(f"Line: {pv_str}")
-        print(f"Position: {insight}")
\ No newline at end of file
+        lines = self.render_board(board, analysis)
+        lines += [
+            "",
+            "Stockfish Analysis:",
+            f"Depth: {depth}",
+            f"Evaluation: {score_str}",
+            f"Best move: {best_move[:2]}{best_move[2:]}",
+            f"Line: {pv_str}",
+            f"Position: {insight}",
+        ]
+        self.display_frame(lines, clear=True)
@@ -0,0 +1,64 @@
+import struct
+from typing import Dict, List, Optional
+import chess
+
+# WebSocket subprotocols understood by /ws/{session_id}. Clients that request
+# none (or only unknown ones) get the original JSON stream.
+JSON_SUBPROTOCOL = "nochess.json.v1"
+BINARY_SUBPROTOCOL = "nochess.bin.v1"
+SUPPORTED_SUBPROTOCOLS = (BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL)
+
+# Frame layout (little endian):
+#   int32  score       centipawns, or signed moves-to-mate when FLAG_MATE
+#   uint8  flags       FLAG_MATE | FLAG_HAS_DEPTH
+#   uint8  depth       search depth (0 when FLAG_HAS_DEPTH is unset)
+#   uint8  pv_len      number of packed moves that follow
+#   uint16 * pv_len    from | to << 6 | promotion piece type << 12
+_HEADER = struct.Struct("<iBBB")
+FLAG_MATE = 0x01
+FLAG_HAS_DEPTH = 0x02
+MAX_PV = 255
+
+
+def negotiate_subprotocol(requested: List[str]) -> Optional[str]:
+    """Pick the first client-offered subprotocol we support, in client order."""
+    for proto in requested or []:
+        if proto in SUPPORTED_SUBPROTOCOLS:
+            return proto
+    return None
+
+
+def pack_move(uci: str) -> int:
+    move = chess.Move.from_uci(uci)
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(packed: int) -> str:
+    promotion = (packed >> 12) & 0x7
+    move = chess.Move(packed & 0x3F, (packed >> 6) & 0x3F, promotion=promotion or None)
+    return move.uci()
+
+
+def encode_analysis(analysis: Dict) -> bytes:
+    """Encode an analysis dict (as returned by StockfishEngine) into a binary frame."""
+    pv = list(analysis.get("pv") or [])[:MAX_PV]
+    if not pv and analysis.get("best_move") and analysis["best_move"] != "(none)":
+        pv = [analysis["best_move"]]
+    depth = analysis.get("depth")
+    flags = (FLAG_MATE if analysis.get("is_mate") else 0) | (FLAG_HAS_DEPTH if depth is not None else 0)
+    header = _HEADER.pack(int(analysis.get("score") or 0), flags, min(int(depth or 0), 255), len(pv))
+    return header + struct.pack(f"<{len(pv)}H", *(pack_move(m) for m in pv))
+
+
+def decode_analysis(frame: bytes) -> Dict:
+    """Inverse of encode_analysis; returns the same shape as AnalysisResponse."""
+    score, flags, depth, pv_len = _HEADER.unpack_from(frame)
+    packed = struct.unpack_from(f"<{pv_len}H", frame, _HEADER.size)
+    pv = [unpack_move(p) for p in packed]
+    return {
+        "score": score,
+        "is_mate": bool(flags & FLAG_MATE),
+        "best_move": pv[0] if pv else None,
+        "pv": pv,
+        "depth": depth if flags & FLAG_HAS_DEPTH else None,
+    }
@@ -1,30 +1,278 @@
 import argparse
+import importlib
+import json
 import os
-from backend.engine import StockfishEngine
-from backend.chess_game import ChessGame
-from backend.pgnReview import PgnReviewer
-from backend.game_runner import GameRunner
+import sys
+
+# Heavy modules (python-chess engine/PGN machinery, terminal UI) are imported
+# on first use so `--help` and short CLI runs start quickly.
+_LAZY = {
+    "StockfishEngine": "backend.engine",
+    "ChessGame": "backend.chess_game",
+    "PgnReviewer": "backend.pgnReview",
+    "GameRunner": "backend.game_runner",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _lazy(name):
+    return globals()[name] if name in globals() else __getattr__(name)
+
 
 def create_parser():
     parser = argparse.ArgumentParser(description="NoChess.com - Terminal Chess Game")
     parser.add_argument("--mode", choices=["beginner", "intermediate", "advanced"], default="intermediate", help="Difficulty mode")
     parser.add_argument("--pgn", type=str, help="Path to PGN file for review (skips interactive if provided)")
+    commands = parser.add_subparsers(dest="command")
+    review = commands.add_parser("review", help="Review PGN files/directories without a terminal UI (for batch jobs)")
+    review.add_argument("paths", nargs="+", help="PGN files or directories (searched recursively for *.pgn)")
+    review.add_argument("-o", "--output", help="Output file (default: stdout)")
+    review.add_argument("-f", "--format", choices=["json", "csv", "pgn"],
+                        help="json (one line per game), csv (one row per move) or annotated pgn; default from --output extension, else json")
+    review.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="Parallel engines (default: cpu count)")
+    review.add_argument("--depth", type=int, default=20, help="Search depth per position (default 20)")
+    review.add_argument("--quick", action="store_true", help="Quick review (depth 10)")
+    review.add_argument("--adaptive", action="store_true",
+                        help="Search every position shallow, then only critical plies at full depth")
+    review.add_argument("--budget", type=float, metavar="SECONDS", help="Engine time budget per game for --adaptive")
+    review.add_argument("--no-cache", action="store_true", help="Don't read or write the review cache")
+    review.add_argument("-q", "--quiet", action="store_true", help="No progress output on stderr")
+    review.add_argument("--stats", metavar="FILE", help="Write per-player ACPL/accuracy/blunder aggregates as JSON")
+    review.add_argument("--index", metavar="DIR", help="Also archive reviewed games into a position index (see POSITION_INDEX_DIR)")
+    explorer = commands.add_parser("build-explorer", help="Build an opening explorer index from PGN files/directories")
+    explorer.add_argument("output", help="Index file to write (serve it with EXPLORER_INDEX=<file>)")
+    explorer.add_argument("paths", nargs="+", help="PGN files or directories (searched recursively for *.pgn)")
+    explorer.add_argument("--max-plies", type=int, default=30, help="Index positions up to this many plies into each game (default 30)")
+    positions = commands.add_parser("index-positions", help="Archive PGN games into a position search index")
+    positions.add_argument("directory", help="Index directory (serve it with POSITION_INDEX_DIR=<dir>)")
+    positions.add_argument("paths", nargs="+", help="PGN files or directories (searched recursively for *.pgn)")
+    load = commands.add_parser("loadtest", help="Drive concurrent simulated players against the API and report latencies")
+    load.add_argument("--players", type=int, default=20, help="Concurrent simulated players (default 20)")
+    load.add_argument("--moves", type=int, default=20, help="Moves per player (default 20)")
+    load.add_argument("--url", help="Base URL of a running server (default: the app in-process)")
+    load.add_argument("--fake-engine", action="store_true", help="In-process only: use the fake engine instead of Stockfish")
+    load.add_argument("--no-ws", action="store_true", help="Skip the /ws first-frame check")
+    load.add_argument("--seed", type=int, help="Random seed for reproducible move choices")
+    load.add_argument("--json", metavar="FILE", help="Also write the report as JSON")
+    load.add_argument("--max-error-rate", type=float, default=0.0, help="Exit 1 above this error rate (default 0)")
+    load.add_argument("--max-p95-ms", type=float, help="Exit 1 if any operation's p95 latency exceeds this")
+    worker = commands.add_parser("review-worker", help="Run PGN review jobs queued by the API (POST /review_jobs)")
+    worker.add_argument("--queue", help="Queue database (default: REVIEW_QUEUE_PATH)")
+    worker.add_argument("--fake-engine", action="store_true", help="Use the fake engine instead of Stockfish")
+    worker.add_argument("--lease", type=float, default=120.0,
+                        help="Seconds a claimed job stays leased without a heartbeat (default 120)")
+    worker.add_argument("--poll", type=float, default=1.0, help="Seconds between polls of an empty queue (default 1)")
+    worker.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    worker.add_argument("--no-cache", action="store_true", help="Don't read or write the review cache")
+    replay = commands.add_parser("replay", help="Re-drive a recorded request trace (TRACE_FILE) and compare latencies")
+    replay.add_argument("trace", help="Trace file written by the API with TRACE_FILE set")
+    replay.add_argument("--url", help="Base URL of a running server (default: the app in-process)")
+    replay.add_argument("--fake-engine", action="store_true", help="In-process only: use the fake engine instead of Stockfish")
+    replay.add_argument("--speed", type=float, help="Keep recorded request timing, sped up by this factor (default: as fast as possible)")
+    replay.add_argument("--json", metavar="FILE", help="Also write the report as JSON (a --baseline for later runs)")
+    replay.add_argument("--baseline", metavar="FILE",
+                        help="Compare against an earlier --json report, or 'recorded' for the latencies in the trace")
+    replay.add_argument("--max-regression", type=float,
+                        help="Exit 1 if any operation's p95 is more than this many times the baseline's")
     return parser
 
 
+def run_loadtest(args) -> int:
+    if args.url:
+        from backend.loadtest import HttpTarget
+        target = HttpTarget(args.url)
+    else:
+        if args.fake_engine:
+            os.environ["NOCHESS_ENGINE"] = "fake"  # read when backend.app is imported
+        from backend.app import app
+        from backend.loadtest import InProcessTarget
+        target = InProcessTarget(app)
+    from backend.loadtest import format_report, run_load
+
+    with target:
+        report = run_load(target, players=max(1, args.players), moves=args.moves, use_ws=not args.no_ws, seed=args.seed)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    failed = report["error_rate"] > args.max_error_rate
+    if args.max_p95_ms is not None:
+        failed |= any(row["p95_ms"] > args.max_p95_ms for row in report["ops"].values())
+    return 1 if failed else 0
+
+
+def run_review_worker(args) -> int:
+    import signal
+    from backend.job_queue import JobQueue
+    from backend.review_cache import ReviewCache
+    from backend.review_worker import ReviewWorker
+
+    if args.fake_engine or os.getenv("NOCHESS_ENGINE", "").lower() == "fake":
+        from backend.fake_engine import FakeEngine
+        kind, factory = "fake", lambda: FakeEngine(profile="review")
+    else:
+        kind, factory = "stockfish", lambda: _lazy("StockfishEngine")(profile="review")
+    queue = JobQueue(args.queue)
+    worker = ReviewWorker(queue, factory, cache=None if args.no_cache else ReviewCache(),
+                          lease_seconds=args.lease, poll_interval=args.poll, engine_kind=kind)
+    # SIGTERM finishes the current job first; a hard kill leaves it to another worker once the lease expires
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop_event.set())
+    print(f"Review worker {worker.worker_id} polling {queue.path}", file=sys.stderr)
+    try:
+        if args.once:
+            while worker.run_once():
+                pass
+            worker.close()
+        else:
+            worker.run()
+    except KeyboardInterrupt:
+        worker.close()
+    print(f"Review worker {worker.worker_id}: {worker.completed} jobs done, {worker.failed} failed", file=sys.stderr)
+    return 0
+
+
+def run_replay(args) -> int:
+    from backend.replay import compare_reports, format_comparison, load_trace, recorded_report, regressions, replay
+    events = load_trace(args.trace)
+    baseline = None
+    if args.baseline == "recorded":
+        baseline = recorded_report(events)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    cache_dir = None
+    if args.url:
+        from backend.loadtest import HttpTarget
+        target = HttpTarget(args.url)
+    else:
+        import tempfile
+        if args.fake_engine:
+            os.environ["NOCHESS_ENGINE"] = "fake"  # read when backend.app is imported
+        # Cold caches, so that review_pgn latencies aren't those of reviews cached by an earlier replay
+        os.environ["ANALYSIS_SHM_MB"] = "0"
+        import backend.app as app_module
+        from backend.loadtest import InProcessTarget
+        from backend.review_cache import ReviewCache
+        cache_dir = tempfile.TemporaryDirectory(prefix="nochess-replay-")
+        app_module.REVIEW_CACHE = ReviewCache(os.path.join(cache_dir.name, "reviews.sqlite3"))
+        app_module.SCHEDULER.shared_cache = None
+        target = InProcessTarget(app_module.app)
+    from backend.loadtest import format_report
+
+    try:
+        with target:
+            report = replay(events, target, speed=args.speed)
+    finally:
+        if cache_dir is not None:
+            cache_dir.cleanup()
+    print(format_report(report))
+    print(f"{report['diverged']} moves substituted, {report['skipped']} events skipped")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline is None:
+        return 0
+    comparison = compare_reports(baseline, report)
+    print(format_comparison(comparison))
+    if args.max_regression is not None and regressions(comparison, args.max_regression):
+        return 1
+    return 0
+
+
+def run_index_positions(args) -> int:
+    from backend.pgnReview import collect_pgn_files, iter_games
+    from backend.position_index import PositionIndex
+
+    index = PositionIndex(args.directory)
+    try:
+        for path in collect_pgn_files(args.paths):
+            try:
+                for game, _ in iter_games(path):
+                    index.add_game(game)
+            except (OSError, UnicodeError, ValueError) as e:
+                print(f"Could not read {path}: {e}", file=sys.stderr)
+            print(f"{path}: {index.stats()['games']} games in index", file=sys.stderr)
+    finally:
+        index.close()
+    return 0
+
+
+def run_build_explorer(args) -> int:
+    from backend.explorer import build_explorer_index
+
+    summary = build_explorer_index(args.paths, args.output, max_plies=args.max_plies, progress=sys.stderr)
+    print(f"Indexed {summary['games']} games ({summary['records']} position/move records, "
+          f"{summary['skipped']} without a result) in {summary['seconds']:.1f}s", file=sys.stderr)
+    return 0
+
+
+def run_review(args) -> int:
+    """Headless `review` subcommand; returns the process exit code."""
+    from backend.batch_review import format_for, review_archive
+    from backend.review_cache import ReviewCache
+
+    depth = 10 if args.quick else args.depth
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    position_index = None
+    if getattr(args, "index", None):
+        from backend.position_index import PositionIndex
+        position_index = PositionIndex(args.index)
+    try:
+        summary = review_archive(
+            args.paths, out,
+            fmt=format_for(args.output, args.format),
+            workers=max(1, args.workers),
+            depth=depth,
+            cache=None if args.no_cache else ReviewCache(),
+            progress=None if args.quiet else sys.stderr,
+            position_index=position_index,
+            adaptive=getattr(args, "adaptive", False),
+            time_budget=getattr(args, "budget", None),
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if position_index is not None:
+            position_index.close()
+    if getattr(args, "stats", None):
+        with open(args.stats, "w") as f:
+            json.dump(summary["players"], f, indent=2)
+    if not args.quiet:
+        print(f"Reviewed {summary['games']} games ({summary['moves']} moves) from {summary['files']} files "
+              f"in {summary['seconds']:.1f}s; {summary['errors']} errors", file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
 def main():
-    parser = argparse.ArgumentParser(description="NoChess.com - Terminal Chess Game")
-    parser.add_argument("--mode", choices=["beginner", "intermediate", "advanced"], default="intermediate", help="Difficulty mode")
-    parser.add_argument("--pgn", type=str, help="Path to PGN file for review (skips interactive if provided)")
-    args = parser.parse_args()
+    args = create_parser().parse_args()
+    command = getattr(args, "command", None)
+    if command == "review":
+        sys.exit(run_review(args))
+    if command == "build-explorer":
+        sys.exit(run_build_explorer(args))
+    if command == "index-positions":
+        sys.exit(run_index_positions(args))
+    if command == "loadtest":
+        sys.exit(run_loadtest(args))
+    if command == "replay":
+        sys.exit(run_replay(args))
+    if command == "review-worker":
+        sys.exit(run_review_worker(args))
 
     print("Welcome to NoChess.com!")
     print(f"Selected mode: {args.mode.capitalize()}")
 
-    with StockfishEngine(args.mode) as engine:  # Auto-close engine
+    with _lazy("StockfishEngine")(profile=args.mode) as engine:  # Auto-close engine
         if args.pgn and os.path.exists(args.pgn):
             print(f"Importing and analyzing {args.pgn}...")
-            reviewer = PgnReviewer(engine)
+            reviewer = _lazy("PgnReviewer")(engine)
             data = reviewer.perform_review(args.pgn)
             print("\nPGN game review complete.")
             print(f"Reviewed {len(data)} moves.")  # Example use of returned data
@@ -35,8 +283,8 @@ def main():
             if args.pgn:
                 print(f"PGN file not found: {args.pgn}")
 
-        game = ChessGame()
-        runner = GameRunner(engine, game)
+        game = _lazy("ChessGame")()
+        runner = _lazy("GameRunner")(engine, game)
         runner.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+import chess
+from backend.analysis_cache import AnalysisCache, position_key
+
+ANALYSIS = {"score": 25, "is_mate": False, "best_move": "e2e4", "pv": ["e2e4"], "depth": 12}
+
+
+def test_deeper_entry_satisfies_shallower_lookup():
+    cache = AnalysisCache(capacity=10)
+    key = position_key(chess.Board())
+    cache.put(key, 12, ANALYSIS)
+    assert cache.get(key, 10) == ANALYSIS
+    assert cache.get(key, 12) == ANALYSIS
+    assert cache.get(key, 14) is None
+    # A shallower result never replaces a deeper one
+    cache.put(key, 8, dict(ANALYSIS, depth=8))
+    assert cache.get(key, 12)["depth"] == 12
+    assert cache.stats()["hits"] == 3
+
+
+def test_lru_capacity():
+    cache = AnalysisCache(capacity=2)
+    cache.put(1, 10, ANALYSIS)
+    cache.put(2, 10, ANALYSIS)
+    cache.get(1, 10)
+    cache.put(3, 10, ANALYSIS)
+    assert cache.get(2, 10) is None
+    assert cache.get(1, 10) is not None and cache.get(3, 10) is not None
+    assert len(cache) == 2
+
+
+def test_transpositions_share_a_key():
+    a, b = chess.Board(), chess.Board()
+    for m in ["g1f3", "g8f6", "b1c3"]:
+        a.push_uci(m)
+    for m in ["b1c3", "g8f6", "g1f3"]:
+        b.push_uci(m)
+    assert position_key(a) == position_key(b)
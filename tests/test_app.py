@@ -0,0 +1,446 @@
+import json
+import uuid
+import chess
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from backend.app import app, SESSIONS, SCHEDULER
+from backend.chess_game import ChessGame
+from backend.scheduler import ScheduledEngine
+from backend.wire import BINARY_SUBPROTOCOL, decode_analysis
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def clear_analysis_cache():
+    SCHEDULER.cache.clear()
+
+
+@pytest.fixture
+def session():
+    """A live session backed by a real ChessGame and a mocked engine."""
+    engine = MagicMock()
+    engine.analyze_position.return_value = {
+        "score": 20, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5"], "depth": 12
+    }
+    session_id = str(uuid.uuid4())
+    game = ChessGame()
+    scheduled = ScheduledEngine(engine, SCHEDULER, owner=session_id)
+    SESSIONS[session_id] = {"game": game, "engine": scheduled, "user_color": "white"}
+    yield session_id, game, engine
+    SESSIONS.pop(session_id, None)
+
+
+def test_state_etag_and_304(session):
+    session_id, game, _ = session
+    resp = client.get(f"/state/{session_id}")
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+    assert resp.json()["version"] == game.version
+
+    resp = client.get(f"/state/{session_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    game.apply_uci_move("e2e4")
+    resp = client.get(f"/state/{session_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_state_delta_since_version(session):
+    session_id, game, _ = session
+    since = game.version
+    game.apply_uci_move("e2e4")
+    game.set_analysis({"score": 30, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5"], "depth": 12})
+
+    data = client.get(f"/state/{session_id}", params={"since": since}).json()
+    assert data["since"] == since
+    assert data["moves"] == ["e2e4"]
+    assert "e7e5" in data["legal_moves"]
+    assert data["analysis"]["score"] == 30
+
+    # Only the eval changed: no moves, no legal move list resent
+    since = game.version
+    game.set_analysis({"score": 35, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5"], "depth": 14})
+    data = client.get(f"/state/{session_id}", params={"since": since}).json()
+    assert data["moves"] == []
+    assert "legal_moves" not in data
+    assert data["analysis"]["depth"] == 14
+
+    assert client.get(f"/state/{session_id}", params={"since": game.version}).status_code == 304
+
+
+def test_state_since_before_restart_returns_full_state(session):
+    session_id, game, _ = session
+    game.apply_uci_move("e2e4")
+    since = game.version
+    game.restart()
+    data = client.get(f"/state/{session_id}", params={"since": since}).json()
+    assert "session_id" in data and "legal_moves" in data and "since" not in data
+    assert len(data["legal_moves"]) == 20
+
+
+def test_websocket_binary_subprotocol(session):
+    session_id, _, _ = session
+    with client.websocket_connect(f"/ws/{session_id}", subprotocols=[BINARY_SUBPROTOCOL]) as ws:
+        assert ws.accepted_subprotocol == BINARY_SUBPROTOCOL
+        assert decode_analysis(ws.receive_bytes())["best_move"] == "e7e5"
+
+
+def test_websocket_defaults_to_json(session):
+    session_id, _, _ = session
+    with client.websocket_connect(f"/ws/{session_id}") as ws:
+        assert ws.receive_json()["best_move"] == "e7e5"
+
+
+def test_review_pgn_served_from_cache_on_reupload(tmp_path, monkeypatch):
+    from backend import app as app_module
+    from backend.review_cache import ReviewCache
+    monkeypatch.setattr(app_module, "REVIEW_CACHE", ReviewCache(str(tmp_path / "reviews.sqlite3")))
+    raw_engine = MagicMock()
+    raw_engine.analyze_position.return_value = {
+        "score": 20, "is_mate": False, "best_move": "e2e4", "pv": ["e2e4"], "depth": 10
+    }
+    pgn = '[Event "Cached"]\n\n1. e4 e5 *\n'
+    with patch("backend.app.StockfishEngine", return_value=raw_engine) as engine_cls:
+        first = client.post("/review_pgn?quick_mode=true", files={"pgn_file": ("cached.pgn", pgn)})
+        # Same mainline, different headers and formatting
+        second = client.post("/review_pgn?quick_mode=true",
+                             files={"pgn_file": ("again.pgn", '[Event "Cached"]\n[White "A"]\n\n1.e4 e5 *\n')})
+    assert first.status_code == 200 and second.status_code == 200
+    assert engine_cls.call_count == 1
+    assert second.json()["review_data"] == first.json()["review_data"]
+    assert len(first.json()["review_data"]) == 2
+    stats = first.json()["stats"]
+    assert stats["white"]["moves"] == 1 and stats["black"]["moves"] == 1
+
+
+class _EchoEngine:
+    """Engine double that reports how many pieces are on the board as its score."""
+
+    searches = 0
+
+    def set_board(self, board):
+        self.board = board
+
+    def analyze_position(self, depth=None):
+        type(self).searches += 1
+        return {"score": len(self.board.piece_map()), "is_mate": False, "best_move": None, "pv": [], "depth": depth}
+
+    def stop(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def batch_pool(monkeypatch):
+    from backend import app as app_module
+    from backend.engine_pool import EnginePool
+    _EchoEngine.searches = 0
+    pool = EnginePool(size=2, factory=_EchoEngine)
+    monkeypatch.setattr(app_module, "ENGINE_POOL", pool)
+    yield pool
+    pool.close()
+
+
+def _ndjson(resp):
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_evaluate_batch_json_in_order(batch_pool):
+    start = chess.STARTING_FEN
+    kings = "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    resp = client.post("/evaluate_batch", json={"fens": [start, "not a fen", kings, start], "depth": 8})
+    assert resp.status_code == 200
+    lines = _ndjson(resp)
+    assert [l["index"] for l in lines] == [0, 1, 2, 3]
+    assert lines[0]["analysis"]["score"] == 32
+    assert "error" in lines[1]
+    assert lines[2]["analysis"]["score"] == 2
+    # The repeated start position is served by the cache or coalesced
+    assert _EchoEngine.searches == 2
+
+
+def test_evaluate_batch_ndjson_stream(batch_pool):
+    body = "\n".join([json.dumps({"fen": chess.STARTING_FEN}), "4k3/8/8/8/8/8/8/4K3 w - - 0 1", ""])
+    resp = client.post("/evaluate_batch?depth=6&ordered=false", content=body,
+                       headers={"Content-Type": "application/x-ndjson"})
+    lines = sorted(_ndjson(resp), key=lambda l: l["index"])
+    assert [l["analysis"]["score"] for l in lines] == [32, 2]
+    assert lines[0]["analysis"]["depth"] == 6
+
+
+def test_evaluate_batch_reports_illegal_positions_and_engine_errors(batch_pool, monkeypatch):
+    search = _EchoEngine.analyze_position
+
+    def analyze_position(self, depth=None):
+        if len(self.board.piece_map()) == 3:
+            raise RuntimeError("engine crashed")
+        return search(self, depth)
+
+    monkeypatch.setattr(_EchoEngine, "analyze_position", analyze_position)
+    fens = ["8/8/8/8/8/8/8/4K3 w - - 0 1",      # no black king
+            "4k3/4R3/8/8/8/8/8/4K3 w - - 0 1",  # black, not to move, is in check
+            "4k3/8/8/8/8/8/8/3QK3 w - - 0 1",   # the engine fails on this one
+            chess.STARTING_FEN]
+    lines = _ndjson(client.post("/evaluate_batch", json={"fens": fens, "depth": 8}))
+    assert [l["index"] for l in lines] == [0, 1, 2, 3]
+    assert [l.get("error") for l in lines] == ["Illegal position", "Illegal position", "Engine error: engine crashed", None]
+    assert lines[3]["analysis"]["score"] == 32
+    assert _EchoEngine.searches == 1
+
+
+def test_evaluate_batch_rejects_bad_depth(batch_pool):
+    resp = client.post("/evaluate_batch", json={"fens": [chess.STARTING_FEN], "depth": 99})
+    assert resp.status_code == 422
+
+
+def test_health_reports_warmup(monkeypatch):
+    from backend import app as app_module
+    monkeypatch.setitem(app_module.WARMUP, "status", "warming")
+    resp = client.get("/health")
+    assert resp.status_code == 503
+    assert resp.json()["status"] == "warming"
+    monkeypatch.setitem(app_module.WARMUP, "status", "ready")
+    resp = client.get("/health")
+    assert resp.status_code == 200
+    assert "scheduler" in resp.json() and "session_engines" in resp.json()
+
+
+def test_explorer_endpoints(tmp_path, monkeypatch, session):
+    from backend import app as app_module
+    from backend.explorer import OpeningExplorer, build_explorer_index
+    session_id, game, _ = session
+    assert client.get("/explorer").status_code == 503
+
+    (tmp_path / "games.pgn").write_text('[Result "1-0"]\n\n1. e4 e5 1-0\n\n[Result "0-1"]\n\n1. e4 c5 0-1\n')
+    build_explorer_index([str(tmp_path)], str(tmp_path / "explorer.idx"))
+    monkeypatch.setattr(app_module, "_EXPLORER", OpeningExplorer(str(tmp_path / "explorer.idx")))
+
+    data = client.get("/explorer").json()
+    assert data["games"] == 2 and data["moves"][0]["san"] == "e4"
+    assert client.get("/explorer", params={"fen": "bad fen"}).status_code == 400
+
+    game.apply_uci_move("e2e4")
+    data = client.get(f"/explorer/{session_id}").json()
+    assert {m["san"] for m in data["moves"]} == {"e5", "c5"}
+
+
+def test_reviewed_games_are_position_searchable(tmp_path, monkeypatch):
+    from backend import app as app_module
+    from backend.position_index import PositionIndex
+    from backend.review_cache import ReviewCache
+    assert client.get("/positions/search", params={"fen": chess.STARTING_FEN}).status_code == 503
+
+    monkeypatch.setattr(app_module, "REVIEW_CACHE", ReviewCache(str(tmp_path / "reviews.sqlite3")))
+    monkeypatch.setattr(app_module, "_POSITION_INDEX", PositionIndex(str(tmp_path / "positions")))
+    raw_engine = MagicMock()
+    raw_engine.analyze_position.return_value = {"score": 0, "is_mate": False, "best_move": "e2e4", "pv": ["e2e4"], "depth": 10}
+    pgn = '[Event "Indexed"]\n[White "Ann"]\n\n1. d4 Nf6 2. c4 e6 *\n'
+    with patch("backend.app.StockfishEngine", return_value=raw_engine):
+        assert client.post("/review_pgn?quick_mode=true", files={"pgn_file": ("indexed.pgn", pgn)}).status_code == 200
+
+    board = chess.Board()
+    for uci in ("d2d4", "g8f6", "c2c4"):
+        board.push_uci(uci)
+    data = client.get("/positions/search", params={"fen": board.fen()}).json()
+    assert data["total"] == 1
+    match = data["games"][0]
+    assert match["ply"] == 3 and match["white"] == "Ann" and match["event"] == "Indexed"
+
+    resp = client.get(f"/positions/games/{match['game_id']}")
+    assert resp.status_code == 200 and "1. d4 Nf6 2. c4 e6" in resp.text
+    assert client.get(f"/positions/games/{match['game_id'] + 1}").status_code == 404
+    app_module._POSITION_INDEX.close()
+
+
+def _analysis(score, best):
+    return {"score": score, "is_mate": False, "best_move": best, "pv": [best], "depth": 12}
+
+
+def test_undo_restores_stored_analysis_without_search(session):
+    session_id, game, engine = session
+    game.set_analysis(_analysis(20, "e2e4"))
+    game.apply_uci_move("e2e4")
+    game.set_analysis(_analysis(-25, "e7e5"))
+    game.apply_uci_move("e7e5")
+    game.set_analysis(_analysis(30, "g1f3"))
+    assert game.analysis_history() == [_analysis(20, "e2e4"), _analysis(-25, "e7e5"), _analysis(30, "g1f3")]
+    since = game.version
+
+    # User (white) to move: takes back their move and the engine's reply
+    data = client.post(f"/undo/{session_id}").json()
+    assert data["fen"] == chess.STARTING_FEN and data["analysis"]["score"] == 20
+    engine.analyze_position.assert_not_called()
+    assert game.analysis_history() == [_analysis(20, "e2e4")]
+    # Moves were removed, so a delta is not possible
+    assert "since" not in client.get(f"/state/{session_id}", params={"since": since}).json()
+    assert client.post(f"/undo/{session_id}").status_code == 400
+
+
+def test_session_review_searches_only_missing_positions(session):
+    session_id, game, engine = session
+    # 1. a3 a6 2. h3: analyses stored for every position but the one after a6
+    for score, move in ((10, "a2a3"), (-5, "a7a6"), (None, "h2h3"), (-15, None)):
+        if score is not None:
+            game.set_analysis(_analysis(score, move or "h7h6"))
+        if move:
+            game.apply_uci_move(move)
+    data = client.get(f"/review/{session_id}").json()
+    assert engine.analyze_position.call_count == 1  # the position after 1... a6
+    assert [m["move"] for m in data["review_data"]] == ["a2a3", "a7a6", "h2h3"]
+    assert data["review_data"][0]["pre_eval"]["score"] == 10
+    assert data["review_data"][1]["post_eval"]["score"] == 20  # searched by the mocked engine
+    assert data["white"] == "You" and data["black"] == "Stockfish" and data["result"] == "*"
+    assert data["stats"]["white"]["moves"] == 2
+
+
+def test_review_pgn_streams_ndjson_gzip(tmp_path, monkeypatch):
+    from backend import app as app_module
+    from backend.review_cache import ReviewCache
+    monkeypatch.setattr(app_module, "REVIEW_CACHE", ReviewCache(str(tmp_path / "reviews.sqlite3")))
+    raw_engine = MagicMock()
+    raw_engine.analyze_position.return_value = {"score": 15, "is_mate": False, "best_move": "h2h3", "pv": ["h2h3"], "depth": 10}
+    pgn = '[Event "Streamed"]\n[White "Ann"]\n\n1. a3 a6 2. h3 h6 3. b3 b6 *\n'
+    with patch("backend.app.StockfishEngine", return_value=raw_engine):
+        resp = client.post("/review_pgn?quick_mode=true&stream=true", files={"pgn_file": ("s.pgn", pgn)},
+                           headers={"Accept-Encoding": "gzip"})
+        full = client.post("/review_pgn?quick_mode=true", files={"pgn_file": ("s.pgn", pgn)},
+                           headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert resp.headers["content-encoding"] == "gzip"
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines[0] == {"type": "game", "event": "Streamed", "white": "Ann", "black": "?", "result": "*", "moves": 6}
+    assert [line["type"] for line in lines[1:]] == ["move"] * 6 + ["summary"]
+    assert lines[-1]["stats"]["white"]["moves"] == 3 and lines[-1]["cached"] is False
+    # The buffered response carries the same entries (from the cache), gzipped by the middleware
+    assert full.headers["content-encoding"] == "gzip"
+    assert full.json()["review_data"] == [{k: v for k, v in line.items() if k != "type"} for line in lines[1:7]]
+
+
+def test_gzip_lines_flush_each_line():
+    import asyncio
+    import zlib
+    from backend.app import _gzip_lines
+
+    async def lines():
+        for i in range(3):
+            yield f'{{"index":{i}}}\n'
+
+    async def collect():
+        return [chunk async for chunk in _gzip_lines(lines())]
+
+    decompressor = zlib.decompressobj(31)
+    chunks = asyncio.run(collect())
+    # Every chunk decompresses to its whole line without needing the ones after it
+    assert [decompressor.decompress(chunk) for chunk in chunks[:3]] == [b'{"index":%d}\n' % i for i in range(3)]
+    decompressor.decompress(chunks[3])
+    assert decompressor.eof
+
+
+def test_quota_exhausted_returns_429_with_retry_after(session, monkeypatch):
+    import backend.app as app_module
+    from backend.quotas import EngineQuotas
+    session_id, _, _ = session
+    quotas = EngineQuotas(rate_ms=1000, burst_ms=1000)
+    monkeypatch.setattr(app_module, "QUOTAS", quotas)
+    quotas.register(session_id, "testclient")
+    quotas.charge(session_id, 5)
+    resp = client.get(f"/analyze/{session_id}")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 4
+    assert client.get("/usage").json()["owners"] == {session_id: 5000}
+    with client.websocket_connect(f"/ws/{session_id}") as ws:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_text()
+    assert closed.value.code == 1013
+
+
+def test_state_eval_not_stored_under_a_move_made_meanwhile(session):
+    from backend.app import _collect_state
+    session_id, game, engine = session
+    analysis = {"score": 20, "is_mate": False, "best_move": "e2e4", "pv": ["e2e4"], "depth": 12}
+
+    def search(*args, **kwargs):
+        game.apply_uci_move("e2e4")  # e.g. make_move from a second tab
+        return analysis
+
+    engine.analyze_position.side_effect = search
+    state = _collect_state(session_id, game, SESSIONS[session_id]["engine"], "white")
+    assert state.analysis.best_move == "e2e4"
+    # The start-position eval must not be recorded as the eval after 1. e4
+    assert game.analysis_history() == [None, None]
+
+
+def test_review_and_restart_respect_quota(session, monkeypatch):
+    import backend.app as app_module
+    from backend.quotas import EngineQuotas
+    session_id, _, _ = session
+    quotas = EngineQuotas(rate_ms=1000, burst_ms=1000)
+    monkeypatch.setattr(app_module, "QUOTAS", quotas)
+    quotas.register(session_id, "testclient")
+    quotas.charge(session_id, 5)
+    for resp in (client.get(f"/review/{session_id}"), client.post(f"/restart/{session_id}")):
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 4
+    monkeypatch.setattr(app_module, "QUOTAS", EngineQuotas(rate_ms=1000, burst_ms=1000))
+    monkeypatch.setattr(app_module, "ADMISSION_MAX_BACKLOG", 0)
+    assert client.post(f"/restart/{session_id}").status_code == 429
+
+
+def test_new_work_refused_while_scheduler_saturated(monkeypatch):
+    import backend.app as app_module
+    monkeypatch.setattr(app_module, "ADMISSION_MAX_BACKLOG", 0)
+    resp = client.post("/start_game", json={"mode": "beginner"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+
+
+def test_review_jobs_queue_round_trip(tmp_path, monkeypatch):
+    import backend.app as app_module
+    from backend.fake_engine import FakeEngine
+    from backend.job_queue import JobQueue
+    from backend.review_worker import ReviewWorker
+    assert client.get("/review_jobs/1").status_code == 503
+    monkeypatch.setattr(app_module, "REVIEW_QUEUE_PATH", str(tmp_path / "queue.sqlite3"))
+    monkeypatch.setattr(app_module, "_REVIEW_QUEUE", None)
+    resp = client.post("/review_jobs", files={"pgn_file": ("g.pgn", b"1. a3 a6 2. Nf3 Nc6 *\n")})
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+    assert client.get(f"/review_jobs/{job_id}").json()["status"] == "queued"
+    assert client.post("/review_jobs", files={"pgn_file": ("g.pgn", b"garbage")}).status_code == 422
+
+    ReviewWorker(JobQueue(str(tmp_path / "queue.sqlite3")), FakeEngine).run_once()
+    body = client.get(f"/review_jobs/{job_id}").json()
+    assert body["status"] == "done"
+    assert len(body["result"]["review_data"]) == 4
+    assert client.get("/review_jobs/999").status_code == 404
+
+
+def test_review_jobs_are_capped_and_charged_per_client(tmp_path, monkeypatch):
+    import backend.app as app_module
+    from backend.fake_engine import FakeEngine
+    from backend.job_queue import JobQueue
+    from backend.quotas import EngineQuotas
+    from backend.review_worker import ReviewWorker
+    monkeypatch.setattr(app_module, "REVIEW_QUEUE_PATH", str(tmp_path / "queue.sqlite3"))
+    monkeypatch.setattr(app_module, "_REVIEW_QUEUE", None)
+    monkeypatch.setattr(app_module, "REVIEW_QUEUE_MAX_PER_CLIENT", 1)
+    quotas = EngineQuotas(rate_ms=1000, burst_ms=1000)
+    monkeypatch.setattr(app_module, "QUOTAS", quotas)
+    pgn = {"pgn_file": ("g.pgn", b"1. a3 a6 2. Nf3 Nc6 *\n")}
+    assert client.post("/review_jobs", files=pgn).status_code == 202
+    resp = client.post("/review_jobs", files=pgn)
+    assert resp.status_code == 429 and resp.json()["detail"] == "Too many review jobs pending for this client"
+
+    worker = ReviewWorker(JobQueue(str(tmp_path / "queue.sqlite3")), lambda: FakeEngine(delay=0.01))
+    worker.run_once()
+    assert worker.queue.get(1)["payload"]["client"] == "testclient"
+    monkeypatch.setitem(app_module._REVIEW_CHARGES, "last", 0.0)
+    assert client.post("/review_jobs", files=pgn).status_code == 202  # the first one is done
+    assert quotas.usage("testclient")["engine_ms"] >= 40  # 4 plies x 2 searches x 10 ms, at least
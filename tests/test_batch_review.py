@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import chess.pgn
+from unittest.mock import Mock
+from backend.batch_review import collect_pgn_files, format_for, review_archive
+from backend.review_cache import ReviewCache
+
+GAME_A = '[Event "A"]\n[White "Ann"]\n[Black "Bob"]\n\n1. e4 e5 2. Nf3 Nc6 *\n\n[Event "Empty"]\n\n*\n\n[Event "B"]\n\n1. d4 d5 *\n'
+GAME_C = '[Event "C"]\n\n1. c4 *\n'
+
+
+def _engine():
+    engine = Mock()
+    engine.analyze_position.return_value = {"score": 25, "is_mate": False, "best_move": "g1f3", "pv": ["g1f3"], "depth": 8}
+    return engine
+
+
+def _archive(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.pgn").write_text(GAME_A)
+    (tmp_path / "sub" / "c.pgn").write_text(GAME_C)
+    (tmp_path / "notes.txt").write_text("not a pgn")
+    return tmp_path
+
+
+def test_collect_pgn_files_recurses_in_order(tmp_path):
+    root = _archive(tmp_path)
+    assert collect_pgn_files([str(root)]) == [str(root / "a.pgn"), str(root / "sub" / "c.pgn")]
+
+
+def test_format_for():
+    assert format_for("out.csv") == "csv"
+    assert format_for("out.csv", "pgn") == "pgn"
+    assert format_for(None) == "json"
+
+
+def test_review_archive_json_lines_in_input_order(tmp_path):
+    root = _archive(tmp_path)
+    out = io.StringIO()
+    summary = review_archive([str(root)], out, workers=3, depth=8, progress=None, factory=_engine)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["headers"]["Event"] for r in records] == ["A", "B", "C"]
+    assert [len(r["review_data"]) for r in records] == [4, 2, 1]
+    assert summary["games"] == 3 and summary["moves"] == 7 and summary["errors"] == 0
+    assert records[0]["stats"]["white"]["moves"] == 2
+    assert summary["players"]["Ann"]["games"] == 1 and summary["players"]["?"]["games"] == 2
+
+
+def test_review_archive_csv_and_annotated_pgn(tmp_path):
+    root = _archive(tmp_path)
+    out = io.StringIO()
+    review_archive([str(root / "a.pgn")], out, fmt="csv", workers=1, depth=8, progress=None, factory=_engine)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert len(rows) == 6
+    assert rows[0]["white"] == "Ann" and rows[0]["move"] == "e2e4" and rows[0]["comment"].startswith("Book")
+    # Book evals are carried back from the first position out of book (+0.25, White to move after 2...Nc6)
+    assert rows[0]["post_eval"] == "-0.25" and rows[3]["post_eval"] == "0.25"
+
+    out = io.StringIO()
+    review_archive([str(root / "sub")], out, fmt="pgn", workers=1, depth=8, progress=None, factory=_engine)
+    game = chess.pgn.read_game(io.StringIO(out.getvalue()))
+    node = game.next()
+    # +0.25 for Black to move after 1. c4 is -0.25 from White's view; c4 isn't the engine's g1f3
+    assert node.comment.startswith("[%eval -0.25]")
+    assert node.eval().white().score() == -25
+
+
+def test_review_archive_uses_review_cache(tmp_path):
+    root = _archive(tmp_path)
+    cache = ReviewCache(str(tmp_path / "cache.sqlite3"))
+    engines = []
+
+    def factory():
+        engines.append(_engine())
+        return engines[-1]
+
+    review_archive([str(root)], io.StringIO(), workers=1, depth=8, cache=cache, progress=None, factory=factory)
+    searches = sum(e.analyze_position.call_count for e in engines)
+    summary = review_archive([str(root)], io.StringIO(), workers=1, depth=8, cache=cache, progress=None, factory=factory)
+    assert summary["cached"] == 3
+    assert sum(e.analyze_position.call_count for e in engines) == searches
+
+
+def test_review_archive_reports_unreadable_file(tmp_path):
+    summary = review_archive([str(tmp_path / "missing.pgn")], io.StringIO(), workers=1, progress=None, factory=_engine)
+    assert summary["errors"] == 1 and summary["games"] == 0
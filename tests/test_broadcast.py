@@ -0,0 +1,71 @@
+import asyncio
+from backend.broadcast import AnalysisFrame, AnalysisHub
+from backend.wire import decode_analysis
+
+ANALYSIS = {"score": 12, "is_mate": False, "best_move": "e2e4", "pv": ["e2e4"], "depth": 10}
+
+
+def test_frame_encodes_once():
+    frame = AnalysisFrame(ANALYSIS)
+    assert frame.text is frame.text
+    assert decode_analysis(frame.binary) == ANALYSIS
+
+
+def test_single_producer_for_many_subscribers():
+    calls = []
+
+    async def analyze():
+        calls.append(1)
+        return dict(ANALYSIS, depth=len(calls))
+
+    async def scenario():
+        hub = AnalysisHub(analyze, interval=0.05)
+        queues = [hub.subscribe() for _ in range(3)]
+        frames = [await q.get() for q in queues]
+        assert len({id(f) for f in frames}) == 1
+        assert len(calls) == 1
+        # A late subscriber gets the latest frame immediately, no extra search
+        late = hub.subscribe()
+        assert late.get_nowait() is frames[0]
+        assert len(calls) == 1
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_drops_oldest_frames():
+    async def analyze():
+        return ANALYSIS
+
+    async def scenario():
+        hub = AnalysisHub(analyze, queue_size=2)
+        queue = hub.subscribe()
+        # Publish synchronously before the producer task gets a chance to run
+        for depth in range(5):
+            hub.publish(dict(ANALYSIS, depth=depth))
+        assert queue.qsize() == 2
+        assert queue.get_nowait().analysis["depth"] == 3
+        assert queue.get_nowait().analysis["depth"] == 4
+        assert hub.dropped == 3
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_producer_stops_without_subscribers():
+    async def analyze():
+        return ANALYSIS
+
+    async def scenario():
+        hub = AnalysisHub(analyze, interval=0.01)
+        queue = hub.subscribe()
+        await queue.get()
+        hub.unsubscribe(queue)
+        assert hub._task is None
+        assert hub.subscriber_count == 0
+        # Moves may be made over HTTP meanwhile: a returning subscriber waits for a fresh eval
+        assert hub.latest is None
+        assert hub.subscribe().empty()
+        await hub.close()
+
+    asyncio.run(scenario())
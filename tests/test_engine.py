@@ -1,4 +1,5 @@
 import pytest
+import os
 import subprocess
 from unittest.mock import Mock, patch
 from backend.engine import StockfishEngine  
@@ -57,4 +58,154 @@ def test_timeout(mocker, mock_popen):
     # Simulate no file descriptors ready
     mocker.patch('select.select', return_value=([], [], []))
     with pytest.raises(TimeoutError):
-        engine._wait_for_response('test', timeout=1)
\ No newline at end of file
+        engine._wait_for_response('test', timeout=1)
+
+def test_parse_cpu_list():
+    from backend.engine import parse_cpu_list
+    assert parse_cpu_list("0-3,6") == {0, 1, 2, 3, 6}
+    assert parse_cpu_list("2") == {2}
+    assert parse_cpu_list("") == set()
+
+
+def test_resolve_profile_env_overrides(monkeypatch):
+    from backend.engine import resolve_profile
+    monkeypatch.setenv("STOCKFISH_HASH", "256")
+    monkeypatch.setenv("STOCKFISH_REVIEW_THREADS", "6")
+    monkeypatch.setenv("STOCKFISH_REVIEW_CPUS", "4-5")
+    review = resolve_profile("review")
+    assert review["options"]["Threads"] == 6
+    assert review["options"]["Hash"] == 256
+    assert review["cpus"] == {4, 5}
+    beginner = resolve_profile("beginner")
+    assert beginner["options"]["Threads"] == 1
+    assert beginner["cpus"] is None
+    assert resolve_profile("unknown")["options"]["Hash"] == 256
+
+
+def test_engine_applies_profile_and_pins(mocker, monkeypatch):
+    from backend.engine import StockfishEngine
+    simple = Mock()
+    simple.options = {"Threads": None, "Hash": None, "Move Overhead": None}
+    simple.transport.get_pid.return_value = 4242
+    popen = mocker.patch('chess.engine.SimpleEngine.popen_uci', return_value=simple)
+    setaffinity = mocker.patch('os.sched_setaffinity', create=True)
+    mocker.patch('os.listdir', return_value=["4242", "4243"])  # /proc/4242/task: the UCI and a search thread
+    monkeypatch.setenv("STOCKFISH_EVALFILE", "missing.nnue")
+    StockfishEngine(profile="advanced", options={"move overhead": 50}, cpus=[1, 2])
+    # EvalFile is not advertised by this engine, so it is skipped
+    simple.configure.assert_called_once_with({"Threads": 2, "Hash": 64, "Move Overhead": 50})
+    # Pinned in the child before exec, then every existing thread once the options are applied
+    popen.call_args.kwargs["preexec_fn"]()
+    assert setaffinity.call_args_list == [mocker.call(4242, {1, 2}), mocker.call(4243, {1, 2}), mocker.call(0, {1, 2})]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Linux only")
+def test_engine_threads_inherit_cpu_pinning(tmp_path):
+    cpu = min(os.sched_getaffinity(0))
+    engine = StockfishEngine(_fake_uci(tmp_path), cpus=[cpu])
+    try:
+        pid = engine.engine.transport.get_pid()
+        assert all(os.sched_getaffinity(int(tid)) == {cpu} for tid in os.listdir(f"/proc/{pid}/task"))
+        engine.restart()
+        assert os.sched_getaffinity(engine.engine.transport.get_pid()) == {cpu}
+        engine.apply_profile(cpus=None)
+        assert os.sched_getaffinity(engine.engine.transport.get_pid()) == os.sched_getaffinity(0)
+    finally:
+        engine.quit()
+
+
+_FAKE_UCI = '''
+import os, sys, time
+hang = os.environ.get("HANG_MARKER")
+first = hang and not os.path.exists(hang)
+if first:
+    open(hang, "w").close()
+for line in sys.stdin:
+    cmd = line.strip()
+    if cmd == "uci":
+        print("id name Fake")
+        print("uciok")
+    elif cmd == "isready":
+        print("readyok")
+    elif cmd.startswith("go"):
+        print("info depth 1 score cp 7 pv e2e4")
+        sys.stdout.flush()
+        if first:
+            time.sleep(3600)  # hung: ignores stop
+        if os.environ.get("SEARCH_UNTIL_STOP"):
+            for line in sys.stdin:
+                if line.strip() == "stop":
+                    break
+        print("bestmove e2e4")
+    elif cmd == "quit":
+        break
+    sys.stdout.flush()
+'''
+
+
+def _fake_uci(tmp_path):
+    import sys
+    script = tmp_path / "fake_uci.py"
+    script.write_text(f"#!{sys.executable}\n{_FAKE_UCI}")
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_hung_engine_is_killed_and_search_retried(tmp_path, monkeypatch):
+    import backend.engine as engine_module
+    monkeypatch.setattr(engine_module, "STOP_GRACE", 0.2)
+    monkeypatch.setenv("HANG_MARKER", str(tmp_path / "hung-once"))
+    engine = StockfishEngine(_fake_uci(tmp_path), search_timeout=0.2)
+    try:
+        analysis = engine.analyze_position()
+        assert analysis["best_move"] == "e2e4" and analysis["score"] == 7
+        assert engine.restarts == 1
+        assert engine.analyze_position()["best_move"] == "e2e4" and engine.restarts == 1
+    finally:
+        engine.quit()
+
+
+def test_slow_search_is_stopped_at_deadline(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_UNTIL_STOP", "1")
+    engine = StockfishEngine(_fake_uci(tmp_path), search_timeout=0.2)
+    try:
+        # Answers stop: the partial result is returned, no respawn
+        assert engine.analyze_position()["score"] == 7
+        assert engine.restarts == 0
+    finally:
+        engine.quit()
+
+
+def test_search_stopped_at_deadline_is_cached_at_reached_depth(tmp_path, monkeypatch):
+    import chess
+    from backend.scheduler import EngineScheduler
+    monkeypatch.setenv("SEARCH_UNTIL_STOP", "1")
+    engine = StockfishEngine(_fake_uci(tmp_path), search_timeout=0.2)
+    scheduler = EngineScheduler(slots=1)
+    try:
+        assert scheduler.analyze(engine, chess.Board(), depth=12)["depth"] == 1
+        assert scheduler.cached(chess.Board(), 12) is None
+        assert scheduler.cached(chess.Board(), 1)["depth"] == 1
+    finally:
+        engine.quit()
+
+
+def test_shared_cache_serves_other_engines(tmp_path):
+    import uuid
+    from backend.shared_cache import SharedAnalysisCache
+    cache = SharedAnalysisCache(f"nochess-test-{uuid.uuid4().hex[:12]}", size_bytes=64 * 1024)
+    first = StockfishEngine(_fake_uci(tmp_path), shared_cache=cache)
+    second = StockfishEngine(_fake_uci(tmp_path), shared_cache=cache)  # e.g. in another worker process
+    try:
+        assert first.analyze_position(depth=1)["score"] == 7
+        second.engine.analysis = Mock(side_effect=AssertionError("searched despite a cached result"))
+        assert second.analyze_position(depth=1) == {"score": 7, "is_mate": False, "best_move": "e2e4",
+                                                    "pv": ["e2e4"], "depth": 1}
+        second.set_position(["e2e4"])
+        with pytest.raises(AssertionError):
+            second.analyze_position(depth=1)  # different position: a real search
+    finally:
+        first.quit()
+        second.quit()
+        cache.unlink()
+        cache.close()
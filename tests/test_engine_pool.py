@@ -0,0 +1,50 @@
+import time
+from backend.engine_pool import EnginePool
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.profile = "review"
+        self.pings = 0
+        self.closed = False
+
+    def ping(self):
+        self.pings += 1
+
+    def apply_profile(self, profile=None, options=None, cpus=None):
+        self.profile = profile
+
+    def quit(self):
+        self.closed = True
+
+
+def test_prewarm_spawns_and_pings_engines():
+    pool = EnginePool(size=3, factory=_FakeEngine)
+    assert pool.prewarm(2) == 2
+    assert pool.stats() == {"size": 3, "spawned": 2, "idle": 2, "warm_target": 2}
+    assert all(e.pings == 1 for e in pool._idle)
+    assert pool.prewarm(2) == 0
+    pool.close()
+
+
+def test_take_hands_over_warm_engine_and_refills():
+    pool = EnginePool(size=1, factory=_FakeEngine)
+    pool.prewarm()
+    warm = pool._idle[0]
+    engine = pool.take(profile="beginner")
+    assert engine is warm
+    assert engine.profile == "beginner"
+    deadline = time.monotonic() + 2
+    while pool.stats()["idle"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["idle"] == 1 and pool._idle[0] is not warm
+    pool.close()
+    assert not engine.closed
+
+
+def test_take_without_warm_engine_spawns_one():
+    pool = EnginePool(size=1, factory=_FakeEngine)
+    engine = pool.take()
+    assert isinstance(engine, _FakeEngine)
+    assert pool.stats()["spawned"] == 0
+    pool.close()
@@ -0,0 +1,48 @@
+import chess
+from backend.explorer import OpeningExplorer, build_explorer_index
+
+ARCHIVE = (
+    '[Result "1-0"]\n\n1. e4 { [%eval 0.3] } e5 { [%eval 0.2] } 2. Nf3 1-0\n\n'
+    '[Result "0-1"]\n\n1. e4 { [%eval 0.5] } c5 0-1\n\n'
+    '[Result "1/2-1/2"]\n\n1. d4 d5 1/2-1/2\n\n'
+    '[Result "*"]\n\n1. c4 *\n'
+)
+
+
+def _build(tmp_path, **kwargs):
+    (tmp_path / "games.pgn").write_text(ARCHIVE)
+    out = str(tmp_path / "explorer.idx")
+    summary = build_explorer_index([str(tmp_path)], out, **kwargs)
+    return out, summary
+
+
+def test_build_and_lookup_start_position(tmp_path):
+    path, summary = _build(tmp_path)
+    assert summary["games"] == 3 and summary["skipped"] == 1
+    explorer = OpeningExplorer(path)
+    stats = explorer.lookup(chess.Board())
+    assert (stats["white"], stats["draws"], stats["black"], stats["games"]) == (1, 1, 1, 3)
+    e4, d4 = stats["moves"]
+    assert e4["san"] == "e4" and e4["games"] == 2 and e4["avg_eval"] == 40
+    assert d4["san"] == "d4" and d4["draws"] == 1 and d4["avg_eval"] is None
+    explorer.close()
+
+
+def test_lookup_after_moves_and_unknown_position(tmp_path):
+    path, _ = _build(tmp_path, run_size=2)  # force several sorted runs
+    explorer = OpeningExplorer(path)
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert sorted(m["san"] for m in explorer.lookup(board)["moves"]) == ["c5", "e5"]
+    board.push_uci("a7a6")
+    assert explorer.lookup(board)["games"] == 0
+    explorer.close()
+
+
+def test_max_plies_limits_depth(tmp_path):
+    path, _ = _build(tmp_path, max_plies=1)
+    explorer = OpeningExplorer(path)
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert explorer.lookup(board)["moves"] == []
+    explorer.close()
@@ -0,0 +1,100 @@
+import time
+import chess
+import chess.pgn
+import backend.job_queue as job_queue
+from backend.fake_engine import FakeEngine
+from backend.job_queue import JobQueue
+from backend.review_cache import ReviewCache
+from backend.review_worker import ReviewWorker, payload_cache_key, review_job
+
+MOVES = [chess.Move.from_uci(u) for u in ("a2a3", "a7a6", "g1f3", "b8c6")]
+
+
+def test_claim_complete_across_instances(tmp_path):
+    api = JobQueue(str(tmp_path / "queue.sqlite3"))
+    worker = JobQueue(api.path)  # another process
+    first = api.submit({"n": 1})
+    second = api.submit({"n": 2})
+    job = worker.claim("w1")
+    assert (job["id"], job["payload"], job["status"], job["attempts"]) == (first, {"n": 1}, "running", 1)
+    assert worker.claim("w2")["id"] == second
+    assert worker.claim("w3") is None
+    assert worker.complete(first, "w1", {"ok": True})
+    assert not worker.complete(second, "w1", {})  # not w1's lease
+    assert api.get(first)["result"] == {"ok": True}
+    assert api.stats() == {"queued": 0, "running": 1, "done": 1, "failed": 0}
+
+
+def test_engine_time_is_collected_per_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "RETRY_DELAY", 0.0)
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    first = queue.submit({}, client="1.2.3.4")
+    second = queue.submit({}, client="1.2.3.4")
+    queue.submit({})  # no client: never charged
+    assert queue.active("1.2.3.4") == 2
+    queue.claim("w1")
+    queue.fail(first, "w1", "engine crashed", engine_ms=300)
+    assert queue.take_engine_time() == {"1.2.3.4": 300}
+    assert queue.take_engine_time() == {}
+    job = queue.claim("w1")  # the retry of `first` is due after `second`
+    queue.complete(job["id"], "w1", {}, engine_ms=500)
+    assert queue.take_engine_time() == {"1.2.3.4": 500}
+    assert queue.active("1.2.3.4") == 1 and queue.get(second)["status"] == "done"
+
+
+def test_expired_lease_is_reclaimed_then_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    job_id = queue.submit({}, max_attempts=2)
+    assert queue.claim("crashed", lease_seconds=0.01)["id"] == job_id
+    time.sleep(0.02)
+    job = queue.claim("w2", lease_seconds=0.01)
+    assert (job["id"], job["attempts"], job["worker"]) == (job_id, 2, "w2")
+    assert not queue.heartbeat(job_id, "crashed")
+    time.sleep(0.02)
+    assert queue.claim("w3") is None  # out of attempts
+    assert queue.get(job_id)["status"] == "failed"
+
+
+def test_fail_retries_with_backoff(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "RETRY_DELAY", 0.0)
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    job_id = queue.submit({}, max_attempts=2)
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "engine crashed")
+    assert queue.get(job_id)["status"] == "queued"
+    queue.claim("w1")
+    queue.fail(job_id, "w1", "engine crashed again")
+    job = queue.get(job_id)
+    assert (job["status"], job["error"]) == ("failed", "engine crashed again")
+    assert queue.purge(older_than=-1) == 1
+
+
+def test_worker_reviews_queued_game(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    cache = ReviewCache(str(tmp_path / "reviews.sqlite3"), max_bytes=1024 * 1024)
+    game = chess.pgn.Game()
+    game.headers["White"] = "Alice"
+    job_id = queue.submit(review_job(game, MOVES, quick_mode=True))
+    worker = ReviewWorker(queue, FakeEngine, cache=cache, poll_interval=0.01, engine_kind="fake")
+    worker.run(max_jobs=1)
+    job = queue.get(job_id)
+    assert job["status"] == "done", job["error"]
+    assert job["result"]["white"] == "Alice"
+    assert [m["move"] for m in job["result"]["review_data"]] == ["a2a3", "a7a6", "g1f3", "b8c6"]
+    assert cache.get(payload_cache_key(job["payload"], "stockfish")) is None  # FakeEngine reviews are kept apart
+    assert cache.get(payload_cache_key(job["payload"], "fake")) == job["result"]["review_data"]
+
+
+def test_worker_requeues_on_engine_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "RETRY_DELAY", 0.0)
+
+    class BrokenEngine(FakeEngine):
+        def analyze_position(self, depth=None):
+            raise RuntimeError("engine died")
+
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    job_id = queue.submit(review_job(None, MOVES), max_attempts=2)
+    worker = ReviewWorker(queue, BrokenEngine)
+    assert worker.run_once() and worker.run_once() and not worker.run_once()
+    assert queue.get(job_id)["status"] == "failed"
+    assert worker.failed == 2
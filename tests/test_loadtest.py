@@ -0,0 +1,51 @@
+import chess
+import backend.app as app_module
+from backend.engine_pool import EnginePool
+from backend.fake_engine import FakeEngine
+from backend.loadtest import InProcessTarget, LoadStats, format_report, percentile, run_load
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_load_stats_report():
+    stats = LoadStats()
+    for ms in (10, 20, 30, 40):
+        stats.record("make_move", ms / 1000, ok=True)
+    stats.record("make_move", 0.5, ok=False, error="HTTP 500")
+    report = stats.report(elapsed=2.0, players=1)
+    row = report["ops"]["make_move"]
+    assert (row["count"], row["errors"], row["p50_ms"], row["max_ms"]) == (5, 1, 30.0, 500.0)
+    assert report["throughput_rps"] == 2.5 and report["error_rate"] == 0.2
+    assert "start_game" not in report["ops"]
+    assert "make_move: HTTP 500" in format_report(report)
+
+
+def test_fake_engine_plays_legal_moves():
+    engine = FakeEngine()
+    engine.set_position(["e2e4", "d7d5"])
+    analysis = engine.analyze_position()
+    assert analysis["best_move"] == "e4d5"  # takes the pawn
+    assert analysis["score"] == 100
+    engine.set_board(chess.Board("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1"))
+    assert engine.analyze_position() == {"score": 0, "is_mate": True, "best_move": None, "pv": [], "depth": 0}
+
+
+def test_run_load_in_process_with_fake_engine(monkeypatch):
+    monkeypatch.setattr(app_module, "ENGINE_KIND", "fake")
+    monkeypatch.setattr(app_module, "ENGINE_PREWARM", 0)
+    monkeypatch.setattr(app_module, "PREWARM_CACHE_PLIES", 0)
+    monkeypatch.setattr(app_module, "SESSION_ENGINES", EnginePool(size=1, factory=FakeEngine))
+    monkeypatch.setattr(app_module, "ENGINE_POOL", EnginePool(size=1, factory=FakeEngine))
+    with InProcessTarget(app_module.app) as target:
+        report = run_load(target, players=4, moves=3, seed=7)
+    assert report["errors"] == 0, report["error_samples"]
+    assert report["ops"]["start_game"]["count"] == 4
+    assert report["ops"]["ws"]["count"] == 4
+    assert report["ops"]["make_move"]["count"] == report["ops"]["analyze"]["count"] == 12
+    assert report["ops"]["analyze"]["p99_ms"] >= report["ops"]["analyze"]["p50_ms"]
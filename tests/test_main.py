@@ -1,3 +1,5 @@
+import json
+import os
 import pytest
 from unittest.mock import patch
 from main import main
@@ -19,7 +21,7 @@ def test_main_no_pgn(arg_parser, monkeypatch):
          patch("main.ChessGame") as mock_game, \
          patch("main.GameRunner") as mock_runner:
         main()
-        mock_engine.assert_called_once_with("intermediate")
+        mock_engine.assert_called_once_with(profile="intermediate")
         mock_runner.return_value.run.assert_called_once()
 
 def test_main_with_pgn(arg_parser, monkeypatch):
@@ -58,4 +60,106 @@ def test_invalid_input(monkeypatch):
         runner = GameRunner(fake_engine, fake_game)
         # Call process_command with invalid input
         runner.process_command("invalid")
-        assert "Invalid move" in mock_stdout.getvalue()
\ No newline at end of file
+        assert "Invalid move" in mock_stdout.getvalue()
+
+def _import_times(module):
+    """Run `python -X importtime -c "import <module>"` and return {module: cumulative microseconds}."""
+    import subprocess
+    import sys
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_budget():
+    times = _import_times("main")
+    for heavy in ("chess", "chess.engine", "chess.pgn", "backend.pgnReview", "backend.ui.terminal_ui"):
+        assert heavy not in times
+    assert times["main"] < 200_000  # microseconds
+
+
+def test_api_import_skips_review_machinery():
+    times = _import_times("backend.app")
+    for heavy in ("chess.pgn", "backend.pgnReview", "backend.ui.terminal_ui"):
+        assert heavy not in times
+
+
+def test_main_review_subcommand_is_non_interactive(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "review", str(tmp_path), "-o", str(tmp_path / "out.csv"), "-j", "3", "--quick", "-q"])
+    monkeypatch.setattr("builtins.input", lambda _: pytest.fail("review must not prompt"))
+    summary = {"files": 1, "games": 2, "moves": 10, "cached": 0, "errors": 0, "seconds": 0.1}
+    with patch("backend.batch_review.review_archive", return_value=summary) as review, \
+         patch("main.StockfishEngine") as mock_engine:
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+    assert exit_info.value.code == 0
+    mock_engine.assert_not_called()
+    kwargs = review.call_args.kwargs
+    assert review.call_args.args[0] == [str(tmp_path)]
+    assert kwargs["fmt"] == "csv" and kwargs["workers"] == 3 and kwargs["depth"] == 10
+
+
+def test_main_loadtest_fails_on_latency_threshold(monkeypatch, tmp_path):
+    monkeypatch.setattr("sys.argv", ["main.py", "loadtest", "--url", "http://127.0.0.1:9", "--players", "2",
+                                     "--max-p95-ms", "100", "--json", str(tmp_path / "report.json")])
+    report = {"players": 2, "seconds": 1.0, "requests": 2, "errors": 0, "error_rate": 0.0, "throughput_rps": 2.0,
+              "error_samples": [], "ops": {"analyze": {"count": 2, "errors": 0, "error_rate": 0.0, "p50_ms": 50.0,
+                                                      "p95_ms": 250.0, "p99_ms": 250.0, "max_ms": 250.0}}}
+    with patch("backend.loadtest.run_load", return_value=report) as run:
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+    assert exit_info.value.code == 1
+    assert run.call_args.kwargs["players"] == 2
+    assert json.loads((tmp_path / "report.json").read_text())["ops"]["analyze"]["p95_ms"] == 250.0
+
+
+def test_main_replay_in_process_uses_cold_caches(monkeypatch, tmp_path):
+    import backend.app as app_module
+    from backend.review_cache import ReviewCache
+    trace = tmp_path / "trace.ndjson"
+    trace.write_text('{"trace":1,"started":0}\n')
+    warm = ReviewCache(str(tmp_path / "warm.sqlite3"))
+    monkeypatch.setattr(app_module, "REVIEW_CACHE", warm)
+    monkeypatch.setattr(app_module.SCHEDULER, "shared_cache", object())
+    monkeypatch.setenv("ANALYSIS_SHM_MB", "64")
+    monkeypatch.delenv("NOCHESS_ENGINE", raising=False)  # restored after main() sets it
+    monkeypatch.setattr("sys.argv", ["main.py", "replay", str(trace), "--fake-engine"])
+    seen = {}
+
+    def fake_replay(events, target, speed=None):
+        seen["cache"] = app_module.REVIEW_CACHE.path
+        seen["shared"] = app_module.SCHEDULER.shared_cache
+        seen["shm"] = os.environ["ANALYSIS_SHM_MB"]
+        return {"players": 0, "seconds": 0.0, "requests": 0, "errors": 0, "error_rate": 0.0, "throughput_rps": 0.0,
+                "error_samples": [], "diverged": 0, "skipped": 0, "ops": {}}
+
+    with patch("backend.replay.replay", side_effect=fake_replay), patch("backend.loadtest.InProcessTarget"):
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+    assert exit_info.value.code == 0
+    assert seen["cache"] != warm.path and not os.path.exists(seen["cache"])  # a fresh one, removed afterwards
+    assert seen["shared"] is None and seen["shm"] == "0"
+
+
+def test_main_replay_compares_with_baseline(monkeypatch, tmp_path):
+    trace = tmp_path / "trace.ndjson"
+    trace.write_text('{"trace":1,"started":0}\n')
+    baseline = {"ops": {"analyze": {"count": 2, "p50_ms": 10.0, "p95_ms": 10.0, "p99_ms": 10.0}}}
+    (tmp_path / "base.json").write_text(json.dumps(baseline))
+    monkeypatch.setattr("sys.argv", ["main.py", "replay", str(trace), "--url", "http://127.0.0.1:9",
+                                     "--baseline", str(tmp_path / "base.json"), "--max-regression", "1.5"])
+    report = {"players": 1, "seconds": 1.0, "requests": 2, "errors": 0, "error_rate": 0.0, "throughput_rps": 2.0,
+              "error_samples": [], "diverged": 0, "skipped": 0,
+              "ops": {"analyze": {"count": 2, "errors": 0, "error_rate": 0.0, "p50_ms": 12.0,
+                                  "p95_ms": 20.0, "p99_ms": 20.0, "max_ms": 20.0}}}
+    with patch("backend.replay.replay", return_value=report) as run:
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+    assert exit_info.value.code == 1
+    assert run.call_args.args[0] == []
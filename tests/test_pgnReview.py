@@ -62,4 +62,100 @@ def test_invalid_pgn(mock_engine, tmp_path):
 
 def test_quick_mode_depth(mock_engine):
     reviewer = PgnReviewer(mock_engine, quick_mode=True)
-    assert reviewer.review_depth == 10
\ No newline at end of file
+    assert reviewer.review_depth == 10
+
+class _DepthEngine:
+    """Scores positions by ply from a table; deep searches may disagree with shallow ones."""
+
+    def __init__(self, shallow, deep):
+        self.shallow, self.deep = shallow, deep
+        self.calls = []
+
+    def set_position(self, moves):
+        self.ply = len(moves)
+
+    def set_depth(self, depth):
+        self.depth = depth
+
+    def analyze_position(self):
+        self.calls.append((self.ply, self.depth))
+        table = self.deep if self.depth >= 20 else self.shallow
+        return {"score": table[self.ply], "is_mate": False, "best_move": "a2a3", "pv": ["a2a3"], "depth": self.depth}
+
+
+MOVES = [chess.Move.from_uci(u) for u in ("a2a3", "a7a6", "g1f3", "b8c6")]  # out of book from move one
+
+
+def test_adaptive_review_searches_each_position_once_then_only_critical_plies():
+    # Scores are for the side to move. Quiet except g1f3, where White drops 150cp at shallow depth
+    shallow = [180, -180, 180, -30, 30]
+    deep = [185, -185, 420, -40, 40]
+    engine = _DepthEngine(shallow, deep)
+    reviewer = PgnReviewer(engine, headless=True)
+    data = reviewer.review_moves_adaptive(MOVES)
+
+    shallow_calls = [c for c in engine.calls if c[1] == 8]
+    deep_calls = [c for c in engine.calls if c[1] == 20]
+    assert [ply for ply, _ in shallow_calls] == [0, 1, 2, 3, 4]
+    assert sorted(ply for ply, _ in deep_calls) == [2, 3]
+    assert reviewer.deep_plies == 1
+    # Deep pass turned the shallow "Mistake" into a blunder; other plies keep shallow evals
+    assert data[2]["pre_eval"]["score"] == 420 and data[2]["post_eval"]["score"] == -40
+    assert data[2]["comment"].startswith("Blunder")
+    assert data[0]["post_eval"]["score"] == -180
+
+
+def test_adaptive_review_respects_time_budget():
+    engine = _DepthEngine([180, -180, 180, -30, 30], [185, -185, 420, -40, 40])
+    reviewer = PgnReviewer(engine, headless=True)
+    data = reviewer.review_moves_adaptive(MOVES, time_budget=0)
+    assert all(depth == 8 for _, depth in engine.calls)
+    assert reviewer.deep_plies == 0
+    assert data[2]["comment"].startswith("Mistake")
+
+
+def test_full_review_unchanged_by_default(tmp_path):
+    engine = _DepthEngine([0] * 5, [0] * 5)
+    pgn_file = tmp_path / "g.pgn"
+    pgn_file.write_text("1. a3 a6 2. Nf3 Nc6 *")
+    PgnReviewer(engine, headless=True).perform_review(str(pgn_file))
+    assert len(engine.calls) == 8 and all(depth == 20 for _, depth in engine.calls)
+
+
+def _moves(*uci):
+    return [chess.Move.from_uci(u) for u in uci]
+
+
+def test_triage_skips_book_and_forced_positions():
+    # 1. e4 (book) f6 2. Qh5+ g6 (the only legal move)
+    engine = _DepthEngine([0, 30, -200, 250, -250], [0, 30, -200, 250, -250])
+    data = PgnReviewer(engine, headless=True).review_moves(_moves("e2e4", "f7f6", "d1h5", "g7g6"))
+    # The forced position 3 is derived from position 4, searched once
+    assert [ply for ply, _ in engine.calls] == [1, 2, 2, 4]
+    assert data[0]["comment"].startswith("Book")
+    # Book evals are carried back from the first position out of book
+    assert (data[0]["pre_eval"]["score"], data[0]["post_eval"]["score"]) == (-30, 30)
+    assert data[3]["comment"].startswith("Forced")
+    assert data[3]["pre_eval"]["score"] == 250 and data[3]["best_move"] == "g7g6"
+    assert data[2]["post_eval"] == data[3]["pre_eval"]
+
+    engine = _DepthEngine([0, 30, -200, 250, -250], [0, 30, -200, 250, -250])
+    PgnReviewer(engine, headless=True).review_moves_adaptive(_moves("e2e4", "f7f6", "d1h5", "g7g6"))
+    assert [ply for ply, depth in engine.calls if depth == 8] == [1, 2, 4]
+
+
+def test_triage_mate_needs_no_search():
+    # Fool's mate: 2...Qh4# is mate in 1 and the final position is exact
+    engine = _DepthEngine([0] * 5, [0] * 5)
+    data = PgnReviewer(engine, headless=True).review_moves(_moves("f2f3", "e7e5", "g2g4", "d8h4"))
+    assert [ply for ply, _ in engine.calls] == [0, 1, 1, 2, 2]  # neither the mating nor the final position
+    assert data[3]["comment"].startswith("Best: Delivers checkmate")
+    assert data[3]["pre_eval"] == {"score": 1, "is_mate": True, "formatted": "#1"}
+    assert data[3]["post_eval"]["is_mate"] and data[3]["post_eval"]["score"] == 0
+    assert data[2]["post_eval"] == data[3]["pre_eval"]
+
+
+def test_triage_off_searches_everything():
+    engine = _DepthEngine([0] * 5, [0] * 5)
+    PgnReviewer(engine, headless=True, triage=False).review_moves(_moves("f2f3", "e7e5", "g2g4", "d8h4"))
+    assert len(engine.calls) == 8
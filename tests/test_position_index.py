@@ -0,0 +1,110 @@
+import chess
+import chess.pgn
+from backend import position_index as position_index_module
+from backend.position_index import PositionIndex
+
+
+def _game(moves, event="Test"):
+    game = chess.pgn.Game()
+    game.headers["Event"] = event
+    node = game
+    for uci in moves.split():
+        node = node.add_variation(chess.Move.from_uci(uci))
+    return game
+
+
+def _board(moves):
+    board = chess.Board()
+    for uci in moves.split():
+        board.push_uci(uci)
+    return board
+
+
+def test_search_finds_games_through_transpositions(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    a = index.add_game(_game("e2e4 e7e5 g1f3 b8c6", "A"))
+    b = index.add_game(_game("g1f3 b8c6 e2e4 e7e5", "B"))
+    index.add_game(_game("d2d4 d7d5", "C"))
+
+    result = index.search(_board("e2e4 e7e5 g1f3 b8c6"))
+    assert result["total"] == 2
+    assert [(g["game_id"], g["ply"], g["event"]) for g in result["games"]] == [(a, 4, "A"), (b, 4, "B")]
+    assert index.search(_board("e2e4"))["total"] == 1
+    assert index.search(_board("a2a3"))["total"] == 0
+    assert index.search(_board("e2e4 e7e5 g1f3 b8c6"), limit=1, offset=1)["games"][0]["event"] == "B"
+    index.close()
+
+
+def test_start_position_is_indexed(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    a = index.add_game(_game("e2e4 e7e5", "A"))
+    b = index.add_game(_game("d2d4", "B"))
+    result = index.search(chess.Board())
+    assert result["total"] == 2
+    assert [(g["game_id"], g["ply"]) for g in result["games"]] == [(a, 0), (b, 0)]
+    index.close()
+
+
+def test_search_pages_across_segments_and_pending(tmp_path):
+    index = PositionIndex(str(tmp_path), flush_records=6)
+    ids = [index.add_game(_game(f"e2e4 {reply}", reply)) for reply in ("e7e5", "c7c5", "e7e6", "c7c6", "d7d5")]
+    assert index.stats()["segments"] >= 1 and index._pending
+    assert [gid for gid, _ in index.lookup(_board("e2e4"))] == ids
+    page = index.search(_board("e2e4"), limit=2, offset=2)
+    assert page["total"] == 5
+    assert [g["game_id"] for g in page["games"]] == ids[2:4]
+    index.close()
+
+
+def test_writers_sharing_a_directory(tmp_path):
+    first = PositionIndex(str(tmp_path), flush_records=4)
+    second = PositionIndex(str(tmp_path), flush_records=4)
+    lines = ["e2e4 e7e5", "d2d4 d7d5", "e2e4 c7c5", "c2c4 e7e5", "e2e4 e7e6", "g1f3 d7d5"]
+    ids = [(first if i % 2 else second).add_game(_game(line)) for i, line in enumerate(lines)]
+    assert len(set(ids)) == len(lines)
+    first.flush()
+    second.flush()
+    for index in (first, second):
+        assert index.stats()["games"] == len(lines)
+        assert [gid for gid, _ in index.lookup(_board("e2e4"))] == [ids[0], ids[2], ids[4]]
+        assert [index.read_game(gid).end().move.uci() for gid in ids] == [line.split()[-1] for line in lines]
+    assert first.add_game(_game("d2d4 d7d5")) == ids[1]
+    first.close()
+    second.close()
+
+
+def test_duplicate_mainline_is_not_archived_twice(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    first = index.add_game(_game("e2e4 e7e5", "A"))
+    assert index.add_game(_game("e2e4 e7e5", "Same moves")) == first
+    assert index.add_game(_game("", "Empty")) is None
+    assert index.stats()["games"] == 1
+    index.close()
+
+
+def test_segments_flush_merge_and_reopen(tmp_path, monkeypatch):
+    monkeypatch.setattr(position_index_module, "MAX_SEGMENTS", 3)
+    index = PositionIndex(str(tmp_path), flush_records=2)
+    lines = ["e2e4 e7e5", "d2d4 d7d5", "c2c4 c7c5", "g1f3 g8f6", "b1c3 b8c6", "e2e4 c7c5"]
+    ids = [index.add_game(_game(line)) for line in lines]
+    assert index.stats()["segments"] <= 3
+    index.close()
+
+    reopened = PositionIndex(str(tmp_path))
+    assert reopened.stats()["games"] == 6
+    assert [gid for gid, _ in reopened.lookup(_board("e2e4"))] == [ids[0], ids[5]]
+    assert reopened.read_game(ids[1]).headers["Event"] == "Test"
+    assert reopened.read_game(ids[1] + 1) is None
+    reopened.close()
+
+
+def test_unflushed_games_are_reindexed_on_open(tmp_path):
+    index = PositionIndex(str(tmp_path))
+    game_id = index.add_game(_game("e2e4 e7e5"))
+    # Simulate a crash: the archive is written but no segment was flushed
+    index._archive.close()
+    index._offsets_file.close()
+
+    reopened = PositionIndex(str(tmp_path))
+    assert reopened.lookup(_board("e2e4 e7e5")) == [(game_id, 2)]
+    reopened.close()
@@ -0,0 +1,76 @@
+from backend.quotas import EngineQuotas, TokenBucket, client_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_debt_and_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100, capacity=1000, clock=clock)
+    bucket.charge(600)
+    assert bucket.retry_after() == 0
+    bucket.charge(900)  # admitted while positive, may overdraw
+    assert bucket.tokens == -500
+    assert bucket.retry_after() == (1 + 500) / 100
+    clock.now = 6
+    assert bucket.retry_after() == 0
+    clock.now = 100
+    bucket.retry_after()
+    assert bucket.tokens == 1000  # capped at capacity
+
+
+def test_quotas_charge_registered_clients_only():
+    clock = FakeClock()
+    quotas = EngineQuotas(rate_ms=1000, burst_ms=2000, clock=clock)
+    quotas.register("s1", "1.2.3.4")
+    quotas.register("review:1", "1.2.3.4")
+    quotas.charge("s1", 1.5)
+    quotas.charge("warmup", 10)  # not attributed to anyone
+    assert quotas.check("1.2.3.4") == (True, 0.0)
+    quotas.charge("review:1", 1.0)
+    admitted, retry_after = quotas.check("1.2.3.4")
+    assert not admitted and retry_after > 0
+    assert quotas.check("5.6.7.8") == (True, 0.0)  # other clients are unaffected
+    usage = quotas.usage("1.2.3.4")
+    assert usage["engine_ms"] == 2500
+    assert usage["owners"] == {"s1": 1500, "review:1": 1000}
+    quotas.forget("review:1")
+    assert quotas.usage("1.2.3.4")["owners"] == {"s1": 1500}
+    assert quotas.stats()["rejected"] == 1
+    clock.now = 1
+    assert quotas.check("1.2.3.4")[0]
+
+
+def test_quotas_disabled():
+    quotas = EngineQuotas(rate_ms=0)
+    quotas.register("s1", "c")
+    quotas.charge("s1", 1000)
+    assert quotas.check("c") == (True, 0.0)
+    assert quotas.usage("c")["engine_ms"] == 1_000_000
+
+
+def test_idle_clients_are_evicted(monkeypatch):
+    import backend.quotas as quotas_module
+    monkeypatch.setattr(quotas_module, "MAX_TRACKED_CLIENTS", 2)
+    quotas = EngineQuotas(rate_ms=1000, burst_ms=2000, clock=FakeClock())
+    for client in ("a", "b", "c"):
+        quotas.register(client, client)
+    quotas.charge("a", 1)
+    quotas.charge("b", 1)
+    quotas.charge("a", 1)
+    quotas.charge("c", 1)  # "b" has been idle the longest
+    assert list(quotas.client_ms) == ["a", "c"]
+    assert quotas.usage("a")["engine_ms"] == 2000
+    assert quotas.stats()["clients"] == 2
+
+
+def test_client_id_header():
+    assert client_id({"X-Forwarded-For": "9.9.9.9, 10.0.0.1"}, "10.0.0.1", "X-Forwarded-For") == "9.9.9.9"
+    assert client_id({}, "10.0.0.1", "X-Forwarded-For") == "10.0.0.1"
+    assert client_id({"X-Forwarded-For": "9.9.9.9"}, "10.0.0.1") == "10.0.0.1"
+    assert client_id({}, None) == "unknown"
@@ -0,0 +1,43 @@
+import random
+import struct
+import pytest
+from backend.record_file import ExternalSorter, RecordFile, write_records
+
+RECORD = struct.Struct("<QI")
+MAGIC = b"TESTREC1"
+
+
+def test_lookup_finds_all_records_for_key(tmp_path):
+    path = str(tmp_path / "r.idx")
+    records = sorted((key, value) for key in (1, 5, 5, 9, 2**63 + 7) for value in (key % 100, key % 100 + 1))
+    assert write_records(path, records, RECORD, MAGIC) == 10
+    with RecordFile(path, RECORD, MAGIC) as index:
+        assert len(index) == 10
+        assert index.lookup(5) == [(5, 5), (5, 5), (5, 6), (5, 6)]
+        big = 2**63 + 7
+        assert index.lookup(big) == [(big, big % 100), (big, big % 100 + 1)]
+        assert index.lookup(3) == [] and index.lookup(0) == [] and index.lookup(2**64 - 1) == []
+        assert list(index) == records
+
+
+def test_empty_file_and_wrong_magic(tmp_path):
+    path = str(tmp_path / "r.idx")
+    write_records(path, [], RECORD, MAGIC)
+    with RecordFile(path, RECORD, MAGIC) as index:
+        assert index.lookup(1) == []
+    with pytest.raises(ValueError):
+        RecordFile(path, RECORD, b"OTHER001")
+
+
+def test_external_sorter_spills_merges_and_combines():
+    rng = random.Random(7)
+    items = [(rng.randrange(50), 1) for _ in range(1000)]
+    with ExternalSorter(RECORD, combine=lambda a, b: (a[0], a[1] + b[1]), run_size=64) as sorter:
+        for item in items:
+            sorter.add(item)
+        assert len(sorter._runs) > 1
+        merged = list(sorter.merged())
+    expected = {}
+    for key, count in items:
+        expected[key] = expected.get(key, 0) + count
+    assert merged == sorted(expected.items())
@@ -0,0 +1,71 @@
+import json
+import backend.app as app_module
+from backend.engine_pool import EnginePool
+from backend.fake_engine import FakeEngine
+from backend.loadtest import InProcessTarget, run_load
+from backend.replay import (TraceMiddleware, TraceRecorder, compare_reports, load_trace, recorded_report,
+                            regressions, replay, replayable_move)
+
+
+def _fake_app(monkeypatch):
+    monkeypatch.setattr(app_module, "ENGINE_KIND", "fake")
+    monkeypatch.setattr(app_module, "ENGINE_PREWARM", 0)
+    monkeypatch.setattr(app_module, "PREWARM_CACHE_PLIES", 0)
+    monkeypatch.setattr(app_module, "SESSION_ENGINES", EnginePool(size=1, factory=FakeEngine))
+    monkeypatch.setattr(app_module, "ENGINE_POOL", EnginePool(size=1, factory=FakeEngine))
+
+
+def test_record_and_replay_with_fake_engine(tmp_path, monkeypatch):
+    _fake_app(monkeypatch)
+    trace = tmp_path / "trace.ndjson"
+    recorder = TraceRecorder(str(trace))
+    with InProcessTarget(TraceMiddleware(app_module.app, recorder)) as target:
+        run_load(target, players=3, moves=3, use_ws=False, seed=1)
+        target.client.get("/health")  # not traced
+    recorder.close()
+
+    events = load_trace(str(trace))
+    assert [e["op"] for e in events].count("start_game") == 3
+    assert {e["op"] for e in events} == {"start_game", "make_move", "analyze"}
+    started = {e["session"] for e in events if e["op"] == "start_game"}
+    assert {e["session"] for e in events} == started
+    assert all(e["status"] == 200 and e["ms"] >= 0 for e in events)
+    assert json.loads(next(e for e in events if e["op"] == "make_move")["body"])["move"]
+
+    with InProcessTarget(app_module.app) as target:
+        report = replay(events, target)
+    assert report["errors"] == 0, report["error_samples"]
+    assert report["skipped"] == 0
+    for op in ("start_game", "make_move", "analyze"):
+        assert report["ops"][op]["count"] == recorded_report(events)["ops"][op]["count"]
+
+
+def test_replayable_move_substitutes_deterministically():
+    state = {"legal_moves": ["e2e4", "d2d4", "g1f3"]}
+    assert replayable_move("d2d4", state, "s:1") == ("d2d4", False)
+    move, diverged = replayable_move("e7e5", state, "s:1")
+    assert diverged and move in state["legal_moves"]
+    assert replayable_move("e7e5", state, "s:1") == (move, True)
+    assert replayable_move("e7e5", None, "s:1") == ("e7e5", False)
+
+
+def test_replay_skips_sessions_started_before_recording():
+    events = [{"t": 0.0, "op": "analyze", "method": "GET", "session": "old", "query": "", "content_type": "",
+               "body": "", "status": 200, "ms": 5.0}]
+
+    class NoTarget:
+        def send(self, *args):
+            raise AssertionError("nothing should be sent")
+
+    report = replay(events, NoTarget())
+    assert report["skipped"] == 1 and report["requests"] == 0
+
+
+def test_compare_reports_flags_p95_regressions():
+    def report(p95):
+        return {"ops": {"analyze": {"count": 10, "p50_ms": 10.0, "p95_ms": p95, "p99_ms": p95}}}
+
+    comparison = compare_reports(report(20.0), report(30.0))
+    assert comparison["analyze"]["p95_ratio"] == 1.5
+    assert regressions(comparison, 1.25) == ["analyze"]
+    assert regressions(comparison, 2.0) == []
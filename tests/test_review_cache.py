@@ -0,0 +1,42 @@
+import chess
+from backend.review_cache import ReviewCache, engine_tag, review_key
+
+ENTRY = {"move_number": 1, "move": "e2e4", "player": "White", "comment": "Best: Matches engine recommendation."}
+
+
+def test_review_key_depends_on_moves_and_depth():
+    moves = [chess.Move.from_uci("e2e4"), chess.Move.from_uci("e7e5")]
+    assert review_key(moves, 20) == review_key(["e2e4", "e7e5"], 20)
+    assert review_key(moves, 20) != review_key(moves, 10)
+    assert review_key(moves, 20) != review_key(moves[:1], 20)
+    assert review_key(moves, 20, engine=engine_tag("fake")) != review_key(moves, 20, engine=engine_tag("stockfish"))
+
+
+def test_get_put_roundtrip(tmp_path):
+    cache = ReviewCache(str(tmp_path / "reviews.sqlite3"), max_bytes=1024 * 1024)
+    key = review_key(["e2e4"], 20)
+    assert cache.get(key) is None
+    cache.put(key, [ENTRY])
+    assert cache.get(key) == [ENTRY]
+    # A second instance (another worker process) sees the same data
+    assert ReviewCache(cache.path, max_bytes=1024 * 1024).get(key) == [ENTRY]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ReviewCache(str(tmp_path / "reviews.sqlite3"), max_bytes=250)
+    keys = [review_key([str(i)], 20) for i in range(3)]
+    cache.put(keys[0], [ENTRY])
+    cache.put(keys[1], [ENTRY])
+    cache.get(keys[0])  # keys[1] is now least recently used
+    cache.put(keys[2], [ENTRY])
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == [ENTRY]
+    assert cache.get(keys[2]) == [ENTRY]
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_disabled_cache(tmp_path):
+    cache = ReviewCache(str(tmp_path / "reviews.sqlite3"), max_bytes=0)
+    cache.put("k", [ENTRY])
+    assert cache.get("k") is None
+    assert not (tmp_path / "reviews.sqlite3").exists()
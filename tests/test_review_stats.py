@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from backend.review_stats import MATE_CP, PlayerStats, game_stats, move_accuracy, review_arrays, win_percent
+
+
+def _move(player, pre, post, pre_mate=False, post_mate=False):
+    return {
+        "player": player,
+        "pre_eval": {"score": pre, "is_mate": pre_mate},
+        "post_eval": {"score": post, "is_mate": post_mate},
+    }
+
+
+# White: best move (loss 0), then a 400cp blunder. Black: 50cp inaccuracy, then a missed mate.
+GAME = [
+    _move("White", 30, -30),
+    _move("Black", -30, 80),                      # black goes from -30 to -80: loss 50
+    _move("White", 80, 320),                      # white goes from +80 to -320: loss 400
+    _move("Black", 3, -200, pre_mate=True),       # mate in 3 (clamped to +1000) to +200: loss 800
+]
+
+
+def test_review_arrays_mover_pov_and_mate_clamp():
+    arrays = review_arrays(GAME)
+    assert arrays["before"].tolist() == [30, -30, 80, MATE_CP]
+    assert arrays["after"].tolist() == [30, -80, -320, 200]
+    assert arrays["loss"].tolist() == [0, 50, 400, 800]
+    assert arrays["black"].tolist() == [False, True, False, True]
+
+
+def test_delivering_mate_loses_nothing():
+    # Mate in 1 for White, then Black (to move) is mated: "mate 0" for the side to move
+    arrays = review_arrays([_move("White", 1, 0, pre_mate=True, post_mate=True)])
+    assert arrays["before"][0] == MATE_CP and arrays["after"][0] == MATE_CP
+    assert arrays["loss"][0] == 0
+    # Getting mated in 2 from the mover's view clamps to -MATE_CP
+    assert review_arrays([_move("Black", -2, 5, pre_mate=True)])["before"][0] == -MATE_CP
+
+
+def test_accuracy_formula():
+    assert win_percent(np.array([0]))[0] == pytest.approx(50)
+    same = move_accuracy(np.array([120]), np.array([120]))[0]
+    assert same == pytest.approx(100, abs=0.01)
+    assert move_accuracy(np.array([500]), np.array([-500]))[0] < 10
+
+
+def test_game_stats_per_side():
+    stats = game_stats(GAME)
+    assert stats["white"]["moves"] == 2 and stats["white"]["acpl"] == 200.0
+    assert stats["white"]["blunders"] == 1 and stats["white"]["inaccuracies"] == 0
+    assert stats["black"]["acpl"] == 425.0
+    assert stats["black"]["blunders"] == 1 and stats["black"]["inaccuracies"] == 1
+    assert stats["white"]["accuracy"] > stats["black"]["accuracy"]
+
+
+def test_player_stats_across_games_match_per_game():
+    players = PlayerStats()
+    players.add_game("Ann", "Bob", GAME)
+    players.add_game("Bob", "Ann", GAME)
+    players.add_game("Cat", "Ann", [])
+    result = players.result()
+    single = game_stats(GAME)
+    ann = result["Ann"]
+    assert ann["games"] == 3 and ann["moves"] == 4
+    assert ann["acpl"] == pytest.approx((single["white"]["acpl"] + single["black"]["acpl"]) / 2)
+    assert ann["blunders"] == 2 and ann["inaccuracies"] == 1
+    assert result["Bob"] == {**ann, "games": 2}
+    assert result["Cat"]["moves"] == 0 and result["Cat"]["acpl"] is None
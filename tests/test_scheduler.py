@@ -0,0 +1,210 @@
+import itertools
+import threading
+import time
+import chess
+from backend.scheduler import EngineScheduler, Priority, ScheduledEngine
+
+
+class BlockingEngine:
+    """Engine double whose searches block until released (or stopped)."""
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.stops = 0
+        self.board = None
+
+    def set_board(self, board):
+        self.board = board
+
+    def analyze_position(self, depth=None):
+        self.log.append(self.name)
+        self.started.set()
+        self.release.wait(5)
+        return {"score": 0, "is_mate": False, "best_move": None, "pv": [], "depth": depth}
+
+    def stop(self):
+        self.stops += 1
+        self.release.set()
+
+    def quit(self):
+        pass
+
+
+_depths = itertools.count(1)
+
+
+def _run(scheduler, engine, priority, owner, results, depth=None):
+    # Distinct depths keep these searches from being coalesced
+    depth = depth or next(_depths)
+    t = threading.Thread(target=lambda: results.append(
+        (engine.name, scheduler.analyze(engine, chess.Board(), depth, priority, owner))))
+    t.start()
+    return t
+
+
+def _wait_waiting(scheduler, count):
+    deadline = time.time() + 5
+    while sum(scheduler.stats()["waiting"].values()) < count and time.time() < deadline:
+        time.sleep(0.005)
+
+
+def test_priority_order_and_round_robin():
+    log, results = [], []
+    scheduler = EngineScheduler(slots=1)
+    blocker = BlockingEngine("blocker", log)
+    threads = [_run(scheduler, blocker, Priority.LIVE, "x", results)]
+    blocker.started.wait(5)
+
+    engines = {}
+    for name, prio, owner in [("a1", Priority.BATCH, "a"), ("a2", Priority.BATCH, "a"),
+                              ("b1", Priority.BATCH, "b"), ("live", Priority.LIVE, "c")]:
+        engines[name] = BlockingEngine(name, log)
+        engines[name].release.set()
+        threads.append(_run(scheduler, engines[name], prio, owner, results))
+        _wait_waiting(scheduler, len(engines))
+    blocker.release.set()
+    for t in threads:
+        t.join(5)
+    # live first, then batch alternating between owners a and b
+    assert log == ["blocker", "live", "a1", "b1", "a2"]
+
+
+def test_interactive_preempts_batch_and_batch_reruns():
+    log, results = [], []
+    scheduler = EngineScheduler(slots=1)
+    batch = BlockingEngine("batch", log)
+    t1 = _run(scheduler, batch, Priority.BATCH, "review", results)
+    batch.started.wait(5)
+
+    reply = BlockingEngine("reply", log)
+    reply.release.set()
+    t2 = _run(scheduler, reply, Priority.INTERACTIVE, "game", results)
+    t2.join(5)
+    assert batch.stops == 1
+    t1.join(5)
+    assert log == ["batch", "reply", "batch"]
+    assert scheduler.stats()["preempted"] == 1
+
+
+def test_engine_never_runs_two_searches():
+    log, results = [], []
+    scheduler = EngineScheduler(slots=4)
+    shared = BlockingEngine("shared", log)
+    t1 = _run(scheduler, shared, Priority.LIVE, "s", results)
+    shared.started.wait(5)
+    t2 = _run(scheduler, shared, Priority.LIVE, "s", results)
+    _wait_waiting(scheduler, 1)
+    assert scheduler.stats()["running"] == 1
+    shared.release.set()
+    t1.join(5)
+    t2.join(5)
+    assert log == ["shared", "shared"]
+
+
+def test_scheduled_engine_facade():
+    log = []
+    scheduler = EngineScheduler(slots=1)
+    engine = BlockingEngine("e", log)
+    engine.release.set()
+    facade = ScheduledEngine(engine, scheduler, owner="s")
+    facade.set_position(["e2e4"])
+    facade.set_depth(9)
+    assert facade.analyze_position()["depth"] == 9
+    assert engine.board.fen() == chess.Board("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1").fen()
+    facade.analyze_moves(["d2d4"], priority=Priority.INTERACTIVE)
+    assert engine.board.move_stack == [chess.Move.from_uci("d2d4")]
+
+
+def test_identical_requests_are_coalesced():
+    log, results = [], []
+    scheduler = EngineScheduler(slots=4)
+    leader = BlockingEngine("leader", log)
+    t1 = _run(scheduler, leader, Priority.LIVE, "s1", results, depth=20)
+    leader.started.wait(5)
+    followers = [BlockingEngine(f"f{i}", log) for i in range(3)]
+    threads = [_run(scheduler, f, Priority.LIVE, f"s{i + 2}", results, depth=20) for i, f in enumerate(followers)]
+    deadline = time.time() + 5
+    while scheduler.stats()["coalesced"] < 3 and time.time() < deadline:
+        time.sleep(0.005)
+    leader.release.set()
+    for t in [t1] + threads:
+        t.join(5)
+    assert log == ["leader"]
+    assert len(results) == 4
+    assert all(r["depth"] == 20 for _, r in results)
+    # Followers get their own copy of the result
+    assert len({id(r) for _, r in results}) == 4
+
+
+def test_interactive_follower_promotes_waiting_leader():
+    log, results = [], []
+    scheduler = EngineScheduler(slots=1)
+    blocker = BlockingEngine("blocker", log)
+    threads = [_run(scheduler, blocker, Priority.LIVE, "x", results)]
+    blocker.started.wait(5)
+    batch_a = BlockingEngine("batch_a", log)
+    batch_b = BlockingEngine("batch_b", log)
+    for e in (batch_a, batch_b):
+        e.release.set()
+    threads.append(_run(scheduler, batch_a, Priority.BATCH, "a", results))
+    _wait_waiting(scheduler, 1)
+    threads.append(_run(scheduler, batch_b, Priority.BATCH, "b", results, depth=99))
+    _wait_waiting(scheduler, 2)
+    # Same position/depth as batch_b, but interactive: batch_b jumps the queue
+    # and preempts the running live search
+    threads.append(_run(scheduler, BlockingEngine("reply", log), Priority.INTERACTIVE, "c", results, depth=99))
+    for t in threads:
+        t.join(5)
+    assert log == ["blocker", "batch_b", "blocker", "batch_a"]
+    assert blocker.stops == 1
+
+
+def test_on_search_reports_owner_and_engine_time():
+    scheduler = EngineScheduler(slots=1)
+    charged = []
+    scheduler.on_search = lambda owner, seconds: charged.append((owner, seconds))
+    engine = BlockingEngine("e", [])
+    engine.release.set()
+    ScheduledEngine(engine, scheduler, owner="s1").analyze_moves(["e2e4"])
+    assert [owner for owner, _ in charged] == ["s1"]
+    assert charged[0][1] >= 0
+    assert scheduler.backlog() == 0
+
+
+def test_result_without_depth_is_not_cached():
+    # A search stopped before the engine reported any info: score 0, no move, no depth
+    engine = BlockingEngine("e", [])
+    engine.release.set()
+    engine.analyze_position = lambda depth=None: {"score": 0, "is_mate": False, "best_move": None, "pv": [], "depth": None}
+    scheduler = EngineScheduler(slots=1)
+    assert scheduler.analyze(engine, chess.Board(), 12)["best_move"] is None
+    assert scheduler.cached(chess.Board(), 0) is None
+
+
+def test_shared_cache_hit_needs_no_slot():
+    import uuid
+    from backend.analysis_cache import position_key
+    from backend.shared_cache import SharedAnalysisCache
+    shared = SharedAnalysisCache(f"nochess-test-{uuid.uuid4().hex[:12]}", size_bytes=64 * 1024)
+    try:
+        board = chess.Board()
+        board.push_uci("e2e4")
+        shared.put(position_key(board), {"score": 30, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5"], "depth": 18})
+        scheduler = EngineScheduler(slots=1, shared_cache=shared)
+        blocker = BlockingEngine("blocker", [])
+        thread = _run(scheduler, blocker, Priority.LIVE, "x", [])
+        blocker.started.wait(5)
+        # The only slot is busy: a result searched by another process must come back without queueing
+        idle = BlockingEngine("idle", [])
+        assert scheduler.analyze(idle, board, 12, Priority.BATCH, "y")["best_move"] == "e7e5"
+        assert idle.board is None
+        assert scheduler.cached(board, 18)["score"] == 30
+        assert scheduler.cache.get(position_key(board), 18) is not None
+        blocker.release.set()
+        thread.join(5)
+    finally:
+        shared.unlink()
+        shared.close()
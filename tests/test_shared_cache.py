@@ -0,0 +1,58 @@
+import uuid
+import chess
+import pytest
+from backend.analysis_cache import position_key
+from backend.shared_cache import BUCKET_SLOTS, ENTRY_SIZE, MAX_PV, SharedAnalysisCache, _HEADER
+
+ANALYSIS = {"score": 35, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5", "g1f3", "b8c6"], "depth": 18}
+
+
+@pytest.fixture
+def cache():
+    cache = SharedAnalysisCache(f"nochess-test-{uuid.uuid4().hex[:12]}", size_bytes=64 * 1024)
+    yield cache
+    cache.unlink()
+    cache.close()
+
+
+def test_round_trip_and_depth(cache):
+    key = position_key(chess.Board("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"))
+    assert cache.get(key, 1) is None
+    cache.put(key, ANALYSIS)
+    assert cache.get(key, 18) == ANALYSIS
+    assert cache.get(key, 19) is None  # not deep enough
+    cache.put(key, {**ANALYSIS, "score": 0, "depth": 10})  # shallower result doesn't replace
+    assert cache.get(key, 1)["score"] == 35
+    mate = {"score": -2, "is_mate": True, "best_move": "e7a7", "pv": ["e7a7"] + ["a1a2"] * 40, "depth": 30}
+    cache.put(key, mate)
+    stored = cache.get(key, 30)
+    assert stored["is_mate"] and stored["score"] == -2 and len(stored["pv"]) == MAX_PV
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_other_process_sees_entries(cache):
+    other = SharedAnalysisCache(cache.name, size_bytes=1024 * 1024)  # attaches at the creator's size
+    try:
+        assert other.slots == cache.slots
+        cache.put(42, ANALYSIS)
+        assert other.get(42, 18) == ANALYSIS
+    finally:
+        other.close()
+
+
+def test_replaces_shallowest_in_full_bucket(cache):
+    base = cache._buckets  # same bucket: keys congruent modulo the bucket count
+    keys = [7 + i * base for i in range(BUCKET_SLOTS + 1)]
+    for depth, key in enumerate(keys[:BUCKET_SLOTS], start=10):
+        cache.put(key, {**ANALYSIS, "depth": depth})
+    cache.put(keys[-1], {**ANALYSIS, "depth": 5})
+    assert cache.get(keys[0], 1) is None  # depth 10 was the shallowest
+    assert all(cache.get(key, 1) is not None for key in keys[1:])
+
+
+def test_torn_entry_reads_as_miss(cache):
+    cache.put(42, ANALYSIS)
+    slot = next(s for s in cache._bucket(42) if cache._read(s) is not None)
+    offset = _HEADER.size + slot * ENTRY_SIZE + 12  # inside the PV, as if a write were half done
+    cache._buf[offset] ^= 0xFF
+    assert cache.get(42, 1) is None
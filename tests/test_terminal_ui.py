@@ -0,0 +1,59 @@
+import io
+import chess
+from backend.ui.terminal_ui import CLEAR_SCREEN, TerminalUI
+
+ANALYSIS = {"score": 35, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5"], "depth": 12}
+
+
+def _ui():
+    out = io.StringIO()
+    return TerminalUI(out=out), out
+
+
+def test_first_frame_clears_with_ansi_in_one_write(monkeypatch):
+    monkeypatch.setattr("os.system", lambda *_: (_ for _ in ()).throw(AssertionError("shell spawned")))
+    ui, out = _ui()
+    writes = []
+    monkeypatch.setattr(out, "write", writes.append)
+    ui.display_board(chess.Board(), ANALYSIS)
+    assert len(writes) == 1
+    assert writes[0].startswith(CLEAR_SCREEN)
+    assert "Current turn: White" in writes[0]
+
+
+def test_next_frame_redraws_only_changed_lines():
+    ui, out = _ui()
+    board = chess.Board()
+    ui.display_board(board, ANALYSIS)
+    first = ui.render_board(board, ANALYSIS)
+    out.seek(0)
+    out.truncate()
+
+    board.push_uci("e2e4")
+    ui.display_board(board, ANALYSIS)
+    frame = out.getvalue()
+    second = ui.render_board(board, ANALYSIS)
+    changed = [i for i, (a, b) in enumerate(zip(first, second)) if a != b]
+    assert CLEAR_SCREEN not in frame
+    # ranks 4 and 2, side to move, move count
+    assert len(changed) == 4
+    for i in changed:
+        assert f"\x1b[{i + 1};1H{second[i]}" in frame
+    assert second[2] not in frame  # unchanged back rank is not redrawn
+
+
+def test_unchanged_frame_writes_only_cursor_parking():
+    ui, out = _ui()
+    ui.display_board(chess.Board(), ANALYSIS)
+    out.seek(0)
+    out.truncate()
+    ui.display_board(chess.Board(), ANALYSIS)
+    assert out.getvalue() == f"\x1b[{len(ui.render_board(chess.Board(), ANALYSIS)) + 1};1H\x1b[J"
+
+
+def test_display_analysis_is_a_single_frame():
+    ui, out = _ui()
+    ui.display_analysis(chess.Board(), ANALYSIS)
+    text = out.getvalue()
+    assert text.count(CLEAR_SCREEN) == 1
+    assert "Best move: e7e5" in text and "Position: The position is roughly equal." in text
@@ -0,0 +1,33 @@
+import json
+from backend.wire import (
+    BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL, decode_analysis, encode_analysis,
+    negotiate_subprotocol, pack_move, unpack_move,
+)
+
+
+def test_pack_move_roundtrip():
+    for uci in ["e2e4", "g1f3", "a7a8q", "h2h1n", "e1g1"]:
+        assert unpack_move(pack_move(uci)) == uci
+
+
+def test_encode_decode_roundtrip():
+    analysis = {"score": -135, "is_mate": False, "best_move": "e7e5", "pv": ["e7e5", "g1f3", "b8c6"], "depth": 18}
+    assert decode_analysis(encode_analysis(analysis)) == analysis
+
+
+def test_encode_mate_and_missing_depth():
+    analysis = {"score": -3, "is_mate": True, "best_move": None, "pv": [], "depth": None}
+    assert decode_analysis(encode_analysis(analysis)) == analysis
+
+
+def test_binary_frame_is_smaller_than_json():
+    analysis = {"score": 42, "is_mate": False, "best_move": "e2e4",
+                "pv": ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6"], "depth": 20}
+    assert len(encode_analysis(analysis)) < len(json.dumps(analysis)) / 4
+
+
+def test_negotiate_subprotocol():
+    assert negotiate_subprotocol([]) is None
+    assert negotiate_subprotocol(["unknown"]) is None
+    assert negotiate_subprotocol(["unknown", BINARY_SUBPROTOCOL]) == BINARY_SUBPROTOCOL
+    assert negotiate_subprotocol([JSON_SUBPROTOCOL, BINARY_SUBPROTOCOL]) == JSON_SUBPROTOCOL